@@ -51,7 +51,7 @@ CLASSIFIERS = (
 INSTALL_REQUIRES = (
     'setuptools',
     'numpy',
-    'scipy',
+    'scipy>=1.7',
     'syned>=1.0.11',
     'wofry>=1.0.17',
     'oasys1-srwlib>=1.0.14'
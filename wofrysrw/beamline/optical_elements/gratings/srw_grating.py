@@ -2,13 +2,15 @@ import numpy
 
 from syned.beamline.optical_elements.gratings.grating import Grating
 from syned.beamline.shape import Ellipse, Rectangle, Circle
+from wofry.propagator.wavefront2D.generic_wavefront import GenericWavefront2D
 
 from wofrysrw.beamline.optical_elements.srw_optical_element import SRWOpticalElementWithAcceptanceSlit
-from wofrysrw.propagator.wavefront2D.srw_wavefront import WavefrontPropagationParameters
+from wofrysrw.propagator.wavefront2D.srw_wavefront import WavefrontPropagationParameters, SRWWavefront, SRWLazyGenericWavefront2D
 from wofrysrw.beamline.optical_elements.absorbers.srw_aperture import SRWAperture
+from wofrysrw.beamline.optical_elements.srw_height_profile import get_height_errors_transmission, height_profile_data_to_python_code
 
 from srwlib import SRWLOptC, SRWLOptMir, SRWLOptG
-from srwlib import srwl, srwl_opt_setup_surf_height_1d, srwl_opt_setup_surf_height_2d, srwl_uti_read_data_cols
+from srwlib import srwl
 
 from wofrysrw.beamline.optical_elements.mirrors.srw_mirror import Orientation, TreatInputOutput, ApertureShape, SimulationMethod
 
@@ -69,6 +71,9 @@ class SRWGrating(Grating, SRWOpticalElementWithAcceptanceSlit):
         self.grooving_density_4 = grooving_density_4
         self.grooving_angle     = grooving_angle
 
+        self.__photon_energy_quantum = None
+        self.__deflection_angle_table = None
+
     def get_alpha_angle(self):
         return self.grazing_angle
 
@@ -80,6 +85,47 @@ class SRWGrating(Grating, SRWOpticalElementWithAcceptanceSlit):
     def get_deflection_angle(self, photon_energy):
         return self.get_alpha_angle() + self.get_beta_angle(photon_energy) + 1.57079632679 # Grating Deflection Angle
 
+    def set_photon_energy_quantum(self, photon_energy_quantum=None):
+        """
+        :param photon_energy_quantum: photon energies are rounded to its multiples [eV] when building the height
+                                      errors element, so that close energies share it (None: exact photon energies)
+        """
+        if not photon_energy_quantum is None and photon_energy_quantum <= 0: raise ValueError("Photon energy quantum should be > 0")
+
+        self.__photon_energy_quantum = photon_energy_quantum
+
+    def get_photon_energy_quantum(self):
+        return self.__photon_energy_quantum
+
+    def set_deflection_angle_table(self, photon_energies=None):
+        """
+        Precomputes the deflection angle on the given photon energies: the height errors element uses its linear
+        interpolation inside the table range (None: exact calculation)
+        """
+        if photon_energies is None:
+            self.__deflection_angle_table = None
+        else:
+            photon_energies = numpy.unique(numpy.asarray(photon_energies, dtype=float))
+
+            if len(photon_energies) < 2: raise ValueError("Deflection angle table needs at least 2 photon energies")
+
+            self.__deflection_angle_table = (photon_energies, self.get_deflection_angle(photon_energies))
+
+    def get_quantized_photon_energy(self, photon_energy):
+        if self.__photon_energy_quantum is None: return photon_energy
+        else: return round(photon_energy/self.__photon_energy_quantum)*self.__photon_energy_quantum
+
+    def get_height_errors_deflection_angle(self, photon_energy):
+        photon_energy = self.get_quantized_photon_energy(photon_energy)
+
+        if not self.__deflection_angle_table is None:
+            photon_energies, deflection_angles = self.__deflection_angle_table
+
+            if photon_energies[0] <= photon_energy <= photon_energies[-1]:
+                return float(numpy.interp(photon_energy, photon_energies, deflection_angles))
+
+        return self.get_deflection_angle(photon_energy)
+
     def get_output_orientation_vectors(self, photon_energy):
         deflection_angle = self.get_deflection_angle(photon_energy)
         tangent = 1.0 if not self.invert_tangent_component else -1.0
@@ -97,6 +143,10 @@ class SRWGrating(Grating, SRWOpticalElementWithAcceptanceSlit):
         raise NotImplementedError()
 
     def applyOpticalElement(self, wavefront=None, parameters=None, element_index=None):
+        is_generic_wavefront = isinstance(wavefront, GenericWavefront2D)
+
+        if is_generic_wavefront: wavefront = SRWWavefront._fromGenericWavefrontCopyOnWrite(wavefront)
+
         optical_elements, propagation_parameters = super(SRWGrating, self).create_propagation_elements()
 
         if not self.height_profile_data_file is None:
@@ -105,9 +155,12 @@ class SRWGrating(Grating, SRWOpticalElementWithAcceptanceSlit):
 
         optBL = SRWLOptC(optical_elements, propagation_parameters)
 
+        if isinstance(wavefront, SRWWavefront): wavefront.detach_buffers()
+
         srwl.PropagElecField(wavefront, optBL)
 
-        return wavefront
+        if is_generic_wavefront: return SRWLazyGenericWavefront2D(wavefront)
+        else: return wavefront
 
     def add_to_srw_native_array(self, oe_array = [], pp_array=[], parameters=None, wavefront=None):
         super(SRWGrating, self).add_to_srw_native_array(oe_array, pp_array, parameters)
@@ -116,6 +169,19 @@ class SRWGrating(Grating, SRWOpticalElementWithAcceptanceSlit):
             oe_array.append(self.get_optTrEr(wavefront))
             pp_array.append(WavefrontPropagationParameters().to_SRW_array())
 
+    def get_fingerprint_data(self, photon_energy=None):
+        fingerprint_data = super(SRWGrating, self).get_fingerprint_data(photon_energy)
+
+        # the height errors transmission element depends on the deflection angle, i.e. on the photon energy
+        if not self.height_profile_data_file is None:
+            fingerprint_data.append(self._get_file_fingerprint_data(self.height_profile_data_file))
+            fingerprint_data.append(None if photon_energy is None else self.get_height_errors_deflection_angle(photon_energy))
+
+        return fingerprint_data
+
+    def is_photon_energy_dependent(self):
+        return not self.height_profile_data_file is None # height errors transmission element, through the deflection angle
+
     def get_substrate_mirror(self):
         nvx, nvy, nvz, tvx, tvy = self.get_orientation_vectors()
         x, y = self.getXY()
@@ -167,31 +233,13 @@ class SRWGrating(Grating, SRWOpticalElementWithAcceptanceSlit):
         elif self.orientation_of_reflection_plane == Orientation.UP or self.orientation_of_reflection_plane == Orientation.DOWN:
             dim = 'y'
 
-        if self.height_profile_data_file_dimension == 1:
-            height_profile_data = srwl_uti_read_data_cols(self.height_profile_data_file,
-                                                          _str_sep='\t',
-                                                          _i_col_start=0,
-                                                          _i_col_end=1)
-
-            optTrEr = srwl_opt_setup_surf_height_1d(_height_prof_data=height_profile_data,
-                                                    _ang=self.grazing_angle,
-                                                    _ang_r=self.get_deflection_angle(wavefront.get_photon_energy()),
-                                                    _dim=dim,
-                                                    _amp_coef=self.height_amplification_coefficient)
-
-        elif self.height_profile_data_file_dimension == 2:
-            height_profile_data = srwl_uti_read_data_cols(self.height_profile_data_file,
-                                                          _str_sep='\t')
-
-            optTrEr = srwl_opt_setup_surf_height_2d(_height_prof_data=height_profile_data,
-                                                    _ang=self.grazing_angle,
-                                                    _ang_r=self.get_deflection_angle(wavefront.get_photon_energy()),
-                                                    _dim=dim,
-                                                    _amp_coef=self.height_amplification_coefficient)
-
-        return optTrEr
-
-
+        # the process-wide cache of height errors elements is keyed on the deflection angle, i.e. on the quantized photon energy
+        return get_height_errors_transmission(self.height_profile_data_file,
+                                              self.height_profile_data_file_dimension,
+                                              grazing_angle=self.grazing_angle,
+                                              dim=dim,
+                                              amplification_coefficient=self.height_amplification_coefficient,
+                                              deflection_angle=self.get_height_errors_deflection_angle(wavefront.get_photon_energy()))
 
     def to_python_code(self, data=None):
         oe_name = data[0]
@@ -244,30 +292,29 @@ class SRWGrating(Grating, SRWOpticalElementWithAcceptanceSlit):
         if not self.height_profile_data_file is None:
             text_code += "\n"
 
+            # same deflection angle as the height errors element used in the propagation (see get_optTrEr)
+            deflection_angle = self.get_height_errors_deflection_angle(wavefront.get_photon_energy())
+
             if self.orientation_of_reflection_plane == Orientation.LEFT or self.orientation_of_reflection_plane == Orientation.RIGHT:
                 dim = 'x'
             elif self.orientation_of_reflection_plane == Orientation.UP or self.orientation_of_reflection_plane == Orientation.DOWN:
                 dim = 'y'
 
             if self.height_profile_data_file_dimension == 1:
-                text_code += "height_profile_data = srwl_uti_read_data_cols('" + self.height_profile_data_file + "'," + "\n"
-                text_code += "                                              _str_sep='\\t'," + "\n"
-                text_code += "                                              _i_col_start=0," + "\n"
-                text_code += "                                              _i_col_end=1)" + "\n"
+                text_code += height_profile_data_to_python_code(self.height_profile_data_file, 1)
 
                 text_code += "optTrEr_" + oe_name + " = srwl_opt_setup_surf_height_1d(_height_prof_data=height_profile_data," + "\n"
                 text_code += "                                              _ang="+ str(self.grazing_angle) + "," + "\n"
-                text_code += "                                              _ang_r="+ str(self.get_deflection_angle(wavefront.get_photon_energy())) + "," + "\n"
+                text_code += "                                              _ang_r="+ str(deflection_angle) + "," + "\n"
                 text_code += "                                              _dim='"+ dim + "'," + "\n"
                 text_code += "                                              _amp_coef="+ str(self.height_amplification_coefficient) + ")" + "\n"
 
             elif self.height_profile_data_file_dimension == 2:
-                text_code += "height_profile_data = srwl_uti_read_data_cols('" + self.height_profile_data_file + "'," + "\n"
-                text_code += "                                              _str_sep=\'\\t\')" + "\n"
+                text_code += height_profile_data_to_python_code(self.height_profile_data_file, 2)
 
                 text_code += "optTrEr_" + oe_name + " = srwl_opt_setup_surf_height_2d(_height_prof_data=height_profile_data," + "\n"
                 text_code += "                                              _ang="+ str(self.grazing_angle) + "," + "\n"
-                text_code += "                                              _ang_r="+ str(self.get_deflection_angle(wavefront.get_photon_energy())) + "," + "\n"
+                text_code += "                                              _ang_r="+ str(deflection_angle) + "," + "\n"
                 text_code += "                                              _dim='"+ dim + "'," + "\n"
                 text_code += "                                              _amp_coef="+ str(self.height_amplification_coefficient) + ")" + "\n"
 
@@ -2,13 +2,15 @@ import numpy
 
 from syned.beamline.optical_elements.mirrors.mirror import Mirror
 from syned.beamline.shape import Rectangle, Ellipse, Circle
+from wofry.propagator.wavefront2D.generic_wavefront import GenericWavefront2D
 
 from wofrysrw.beamline.optical_elements.srw_optical_element import SRWOpticalElementWithAcceptanceSlit, Orientation
-from wofrysrw.propagator.wavefront2D.srw_wavefront import WavefrontPropagationParameters
+from wofrysrw.propagator.wavefront2D.srw_wavefront import WavefrontPropagationParameters, SRWWavefront, SRWLazyGenericWavefront2D
 from wofrysrw.beamline.optical_elements.absorbers.srw_aperture import SRWAperture
+from wofrysrw.beamline.optical_elements.srw_height_profile import get_height_errors_transmission, height_profile_data_to_python_code
 
 from srwlib import SRWLOptC, SRWLOptMir
-from srwlib import srwl, srwl_opt_setup_surf_height_1d, srwl_opt_setup_surf_height_2d, srwl_uti_read_data_cols
+from srwlib import srwl
 
 
 class ApertureShape:
@@ -94,6 +96,10 @@ class SRWMirror(Mirror, SRWOpticalElementWithAcceptanceSlit):
         raise NotImplementedError()
 
     def applyOpticalElement(self, wavefront=None, parameters=None, element_index=None):
+        is_generic_wavefront = isinstance(wavefront, GenericWavefront2D)
+
+        if is_generic_wavefront: wavefront = SRWWavefront._fromGenericWavefrontCopyOnWrite(wavefront)
+
         optical_elements, propagation_parameters = super(SRWMirror, self).create_propagation_elements()
 
         if not self.height_profile_data_file is None:
@@ -102,9 +108,12 @@ class SRWMirror(Mirror, SRWOpticalElementWithAcceptanceSlit):
 
         optBL = SRWLOptC(optical_elements, propagation_parameters)
 
+        if isinstance(wavefront, SRWWavefront): wavefront.detach_buffers()
+
         srwl.PropagElecField(wavefront, optBL)
 
-        return wavefront
+        if is_generic_wavefront: return SRWLazyGenericWavefront2D(wavefront)
+        else: return wavefront
 
     def add_to_srw_native_array(self, oe_array = [], pp_array=[], parameters=None, wavefront=None):
         super(SRWMirror, self).add_to_srw_native_array(oe_array, pp_array, parameters)
@@ -113,31 +122,25 @@ class SRWMirror(Mirror, SRWOpticalElementWithAcceptanceSlit):
             oe_array.append(self.get_optTrEr())
             pp_array.append(WavefrontPropagationParameters().to_SRW_array())
 
+    def get_fingerprint_data(self, photon_energy=None):
+        fingerprint_data = super(SRWMirror, self).get_fingerprint_data(photon_energy)
+
+        if not self.height_profile_data_file is None:
+            fingerprint_data.append(self._get_file_fingerprint_data(self.height_profile_data_file))
+
+        return fingerprint_data
+
     def get_optTrEr(self):
         if self.orientation_of_reflection_plane == Orientation.LEFT or self.orientation_of_reflection_plane == Orientation.RIGHT:
             dim = 'x'
         elif self.orientation_of_reflection_plane == Orientation.UP or self.orientation_of_reflection_plane == Orientation.DOWN:
             dim = 'y'
 
-        if self.height_profile_data_file_dimension == 1:
-            height_profile_data = srwl_uti_read_data_cols(self.height_profile_data_file,
-                                                          _str_sep='\t',
-                                                          _i_col_start=0,
-                                                          _i_col_end=1)
-
-            optTrEr = srwl_opt_setup_surf_height_1d(_height_prof_data=height_profile_data,
-                                                    _ang=self.grazing_angle,
-                                                    _dim=dim,
-                                                    _amp_coef=self.height_amplification_coefficient)
-        elif self.height_profile_data_file_dimension == 2:
-            height_profile_data = srwl_uti_read_data_cols(self.height_profile_data_file,
-                                                          _str_sep='\t')
-
-            optTrEr = srwl_opt_setup_surf_height_2d(_height_prof_data=height_profile_data,
-                                                    _ang=self.grazing_angle,
-                                                    _dim=dim,
-                                                    _amp_coef=self.height_amplification_coefficient)
-        return optTrEr
+        return get_height_errors_transmission(self.height_profile_data_file,
+                                              self.height_profile_data_file_dimension,
+                                              grazing_angle=self.grazing_angle,
+                                              dim=dim,
+                                              amplification_coefficient=self.height_amplification_coefficient)
 
     def toSRWLOpt(self):
         nvx, nvy, nvz, tvx, tvy = self.get_orientation_vectors()
@@ -263,10 +266,7 @@ class SRWMirror(Mirror, SRWOpticalElementWithAcceptanceSlit):
                 dim = 'y'
 
             if self.height_profile_data_file_dimension == 1:
-                text_code += "height_profile_data = srwl_uti_read_data_cols('" + self.height_profile_data_file + "'," + "\n"
-                text_code += "                                              _str_sep='\\t'," + "\n"
-                text_code += "                                              _i_col_start=0," + "\n"
-                text_code += "                                              _i_col_end=1)" + "\n"
+                text_code += height_profile_data_to_python_code(self.height_profile_data_file, 1)
 
                 text_code += "optTrEr_" + oe_name + " = srwl_opt_setup_surf_height_1d(_height_prof_data=height_profile_data," + "\n"
                 text_code += "                                                        _ang="+ str(self.grazing_angle) + "," + "\n"
@@ -274,8 +274,7 @@ class SRWMirror(Mirror, SRWOpticalElementWithAcceptanceSlit):
                 text_code += "                                                        _amp_coef="+ str(self.height_amplification_coefficient) + ")" + "\n"
 
             elif self.height_profile_data_file_dimension == 2:
-                text_code += "height_profile_data = srwl_uti_read_data_cols('" + self.height_profile_data_file + "'," + "\n"
-                text_code += "                                              _str_sep='\\t')" + "\n"
+                text_code += height_profile_data_to_python_code(self.height_profile_data_file, 2)
 
                 text_code += "optTrEr_" + oe_name + " = srwl_opt_setup_surf_height_2d(_height_prof_data=height_profile_data," + "\n"
                 text_code += "                                                        _ang="+ str(self.grazing_angle) + "," + "\n"
@@ -1,8 +1,22 @@
+import numpy
+
 from wofrysrw.beamline.optical_elements.srw_optical_element import SRWOpticalElement
+from wofrysrw.beamline.optical_elements.srw_refractive_transmission import CRL_to_SRWLOptT
+from wofrysrw.srw_cache import SRWLRUCache
 from syned.beamline.shape import Circle, Ellipse, Rectangle
 
 from srwlib import *
 
+# process-wide cache of the transmission grids (1001x1001 points by default)
+CRL_transmission_cache = SRWLRUCache(max_size=8)
+
+def clear_CRL_transmission_cache():
+    CRL_transmission_cache.clear()
+
+def _to_key(value):
+    if value is None or numpy.isscalar(value): return value
+    else: return tuple(numpy.ravel(value).tolist()) # arrays vs photon energy, void centers and radii
+
 class PlaneOfFocusing:
     HORIZONTAL=1
     VERTICAL=2
@@ -85,23 +99,48 @@ class SRWCRL(SRWOpticalElement):
         self.horizontal_points = horizontal_points
         self.vertical_points = vertical_points
 
+    def get_transmission_key(self):
+        """
+        All the parameters of the transmission grid: geometry, materials, energy range and sampling
+        """
+        return (self.plane_of_focusing,
+                _to_key(self.refractive_index),
+                _to_key(self.attenuation_length),
+                self.shape,
+                self.horizontal_aperture_size,
+                self.vertical_aperture_size,
+                self.radius_of_curvature,
+                self.number_of_lenses,
+                self.wall_thickness,
+                self.horizontal_center_coordinate,
+                self.vertical_center_coordinate,
+                _to_key(self.void_center_coordinates),
+                self.initial_photon_energy,
+                self.final_photon_energy,
+                self.horizontal_points,
+                self.vertical_points)
+
     def toSRWLOpt(self):
-        return srwl_opt_setup_CRL(_foc_plane=self.plane_of_focusing,
-                                  _delta=self.refractive_index,
-                                  _atten_len=self.attenuation_length,
-                                  _shape=self.shape,
-                                  _apert_h=self.horizontal_aperture_size,
-                                  _apert_v=self.vertical_aperture_size,
-                                  _r_min=self.radius_of_curvature,
-                                  _n=self.number_of_lenses,
-                                  _wall_thick=self.wall_thickness,
-                                  _xc=self.horizontal_center_coordinate,
-                                  _yc=self.vertical_center_coordinate,
-                                  _void_cen_rad=self.void_center_coordinates,
-                                  _e_start=self.initial_photon_energy,
-                                  _e_fin=self.final_photon_energy,
-                                  _nx=self.horizontal_points,
-                                  _ny=self.vertical_points)
+        # the transmission element is never modified by the propagation: identical CRLs share it
+        return CRL_transmission_cache.get_or_compute(self.get_transmission_key(), self.__setup_CRL)
+
+    def __setup_CRL(self):
+        return CRL_to_SRWLOptT(plane_of_focusing=self.plane_of_focusing,
+                               refractive_index=self.refractive_index,
+                               attenuation_length=self.attenuation_length,
+                               shape=self.shape,
+                               horizontal_aperture_size=self.horizontal_aperture_size,
+                               vertical_aperture_size=self.vertical_aperture_size,
+                               radius_of_curvature=self.radius_of_curvature,
+                               number_of_lenses=self.number_of_lenses,
+                               wall_thickness=self.wall_thickness,
+                               horizontal_center_coordinate=self.horizontal_center_coordinate,
+                               vertical_center_coordinate=self.vertical_center_coordinate,
+                               void_center_coordinates=self.void_center_coordinates,
+                               initial_photon_energy=self.initial_photon_energy,
+                               final_photon_energy=self.final_photon_energy,
+                               horizontal_points=self.horizontal_points,
+                               vertical_points=self.vertical_points)
 
     def fromSRWLOpt(self, srwlopt=None):
         if not srwlopt.input_params or not srwlopt.input_params["type"] == "crl":
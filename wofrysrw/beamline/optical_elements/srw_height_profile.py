@@ -0,0 +1,169 @@
+import os
+import numpy
+
+from wofrysrw.srw_cache import SRWLRUCache
+
+from srwlib import srwl_opt_setup_surf_height_1d, srwl_opt_setup_surf_height_2d, srwl_uti_read_data_cols
+
+class HeightProfileFileFormat:
+    TEXT = 0 # tab separated columns, as read by srwl_uti_read_data_cols
+    NPY = 1  # numpy .npy file, memory mapped
+    NPZ = 2  # numpy .npz archive, array "height_profile_data" or the first one
+    RAW = 3  # header of two little-endian int64 (rows, columns) followed by the table as little-endian float64, memory mapped
+
+    @classmethod
+    def from_file_name(cls, file_name):
+        extension = os.path.splitext(file_name)[1].lower()
+
+        if extension == ".npy": return cls.NPY
+        elif extension == ".npz": return cls.NPZ
+        elif extension in (".raw", ".bin"): return cls.RAW
+        else: return cls.TEXT
+
+RAW_HEADER_DTYPE = numpy.dtype('<i8')
+RAW_DATA_DTYPE = numpy.dtype('<f8')
+RAW_DATA_OFFSET = 2*RAW_HEADER_DTYPE.itemsize
+
+NPZ_ARRAY_NAME = "height_profile_data"
+
+# process-wide caches: parsing the height profile files and building the transmission elements dominate short propagations
+height_profile_data_cache = SRWLRUCache(max_size=8)
+height_errors_transmission_cache = SRWLRUCache(max_size=16)
+
+def get_height_profile_file_key(file_name):
+    stat = os.stat(file_name)
+
+    return os.path.abspath(file_name), stat.st_mtime_ns, stat.st_size
+
+def _read_raw_shape(file_name):
+    shape = numpy.fromfile(file_name, dtype=RAW_HEADER_DTYPE, count=2)
+
+    if len(shape) < 2: raise ValueError("File " + file_name + " is not a raw height profile")
+
+    return int(shape[0]), int(shape[1])
+
+def read_height_profile_table(file_name):
+    """
+    Height profile table (rows of the equivalent text file) from a binary file: .npy and raw files are memory mapped,
+    so that the processes reading the same file share one physical copy of it
+    """
+    file_format = HeightProfileFileFormat.from_file_name(file_name)
+
+    if file_format == HeightProfileFileFormat.NPY:
+        table = numpy.load(file_name, mmap_mode='r')
+    elif file_format == HeightProfileFileFormat.NPZ:
+        with numpy.load(file_name) as archive:
+            table = archive[NPZ_ARRAY_NAME] if NPZ_ARRAY_NAME in archive.files else archive[archive.files[0]]
+    elif file_format == HeightProfileFileFormat.RAW:
+        table = numpy.memmap(file_name, dtype=RAW_DATA_DTYPE, mode='r', offset=RAW_DATA_OFFSET, shape=_read_raw_shape(file_name))
+    else:
+        raise ValueError("File " + file_name + " is not a binary height profile")
+
+    if table.ndim != 2: raise ValueError("Height profile in " + file_name + " should be a 2D table")
+
+    return table
+
+def write_height_profile_table(file_name, table):
+    """
+    Writes a height profile table (rows of the equivalent text file) in the format given by the file extension
+    """
+    table = numpy.asarray(table, dtype=RAW_DATA_DTYPE)
+
+    if table.ndim != 2: raise ValueError("Height profile should be a 2D table")
+
+    file_format = HeightProfileFileFormat.from_file_name(file_name)
+
+    if file_format == HeightProfileFileFormat.NPY:
+        numpy.save(file_name, table)
+    elif file_format == HeightProfileFileFormat.NPZ:
+        numpy.savez(file_name, **{NPZ_ARRAY_NAME: table})
+    elif file_format == HeightProfileFileFormat.RAW:
+        with open(file_name, "wb") as file:
+            file.write(numpy.array(table.shape, dtype=RAW_HEADER_DTYPE).tobytes())
+            file.write(numpy.ascontiguousarray(table).tobytes())
+    else:
+        numpy.savetxt(file_name, table, delimiter='\t')
+
+def read_height_profile_data(file_name, dimension=1):
+    """
+    Height profile as list of columns, like srwl_uti_read_data_cols, cached on file path and modification time
+    :param dimension: 1 for a two columns profile, 2 for a 2D map
+    """
+    if not dimension in (1, 2): raise ValueError("Height profile dimension should be 1 or 2")
+
+    def read():
+        if HeightProfileFileFormat.from_file_name(file_name) == HeightProfileFileFormat.TEXT:
+            if dimension == 1:
+                return srwl_uti_read_data_cols(file_name,
+                                               _str_sep='\t',
+                                               _i_col_start=0,
+                                               _i_col_end=1)
+            else:
+                return srwl_uti_read_data_cols(file_name,
+                                               _str_sep='\t')
+        else:
+            columns = read_height_profile_table(file_name).T # view, no copy of the memory mapped data
+
+            return columns[:2] if dimension == 1 else columns
+
+    return height_profile_data_cache.get_or_compute((get_height_profile_file_key(file_name), dimension), read)
+
+def height_profile_data_to_python_code(file_name, dimension=1):
+    file_format = HeightProfileFileFormat.from_file_name(file_name)
+
+    if file_format == HeightProfileFileFormat.TEXT:
+        if dimension == 1:
+            text_code  = "height_profile_data = srwl_uti_read_data_cols('" + file_name + "'," + "\n"
+            text_code += "                                              _str_sep='\\t'," + "\n"
+            text_code += "                                              _i_col_start=0," + "\n"
+            text_code += "                                              _i_col_end=1)" + "\n"
+        else:
+            text_code  = "height_profile_data = srwl_uti_read_data_cols('" + file_name + "'," + "\n"
+            text_code += "                                              _str_sep='\\t')" + "\n"
+
+        return text_code
+
+    if file_format == HeightProfileFileFormat.NPY:
+        text_code = "height_profile_data = numpy.load('" + file_name + "', mmap_mode='r').T"
+    elif file_format == HeightProfileFileFormat.NPZ:
+        with numpy.load(file_name) as archive:
+            array_name = NPZ_ARRAY_NAME if NPZ_ARRAY_NAME in archive.files else archive.files[0]
+
+        text_code = "height_profile_data = numpy.load('" + file_name + "')['" + array_name + "'].T"
+    else:
+        text_code = "height_profile_data = numpy.memmap('" + file_name + "', dtype='" + RAW_DATA_DTYPE.str + "', mode='r', offset=" + str(RAW_DATA_OFFSET) + ", shape=" + str(_read_raw_shape(file_name)) + ").T"
+
+    if dimension == 1: text_code += "[:2]"
+
+    return text_code + "\n"
+
+def get_height_errors_transmission(file_name, dimension, grazing_angle, dim, amplification_coefficient=1.0, deflection_angle=None):
+    """
+    SRWLOptT of the height errors of a mirror (deflection_angle=None) or a grating: the returned object is shared
+    between all the callers with the same arguments and it must not be modified
+    """
+    key = (get_height_profile_file_key(file_name), dimension, grazing_angle, deflection_angle, dim, amplification_coefficient)
+
+    def build():
+        height_profile_data = read_height_profile_data(file_name, dimension)
+
+        if dimension == 1: setup_surf_height = srwl_opt_setup_surf_height_1d
+        else:              setup_surf_height = srwl_opt_setup_surf_height_2d
+
+        if deflection_angle is None:
+            return setup_surf_height(_height_prof_data=height_profile_data,
+                                     _ang=grazing_angle,
+                                     _dim=dim,
+                                     _amp_coef=amplification_coefficient)
+        else:
+            return setup_surf_height(_height_prof_data=height_profile_data,
+                                     _ang=grazing_angle,
+                                     _ang_r=deflection_angle,
+                                     _dim=dim,
+                                     _amp_coef=amplification_coefficient)
+
+    return height_errors_transmission_cache.get_or_compute(key, build)
+
+def clear_height_profile_caches():
+    height_profile_data_cache.clear()
+    height_errors_transmission_cache.clear()
@@ -1,10 +1,12 @@
 import numpy
+import os
 
 from syned.beamline.shape import Ellipse, Rectangle, Circle
 from wofry.beamline.decorators import OpticalElementDecorator
 
 from wofry.propagator.propagator import PropagationParameters
-from wofrysrw.propagator.wavefront2D.srw_wavefront import WavefrontPropagationParameters, WavefrontPropagationOptionalParameters
+from wofry.propagator.wavefront2D.generic_wavefront import GenericWavefront2D
+from wofrysrw.propagator.wavefront2D.srw_wavefront import WavefrontPropagationParameters, WavefrontPropagationOptionalParameters, SRWWavefront, SRWLazyGenericWavefront2D
 from wofrysrw.srw_object import SRWObject
 
 from srwlib import SRWLOptC, srwl, SRWLOptShift, SRWLOptAng
@@ -84,6 +86,10 @@ class SRWOpticalElement(SRWOpticalElementDecorator, OpticalElementDecorator):
             pp_array.append(self.get_default_propagation_parameters())
 
     def applyOpticalElement(self, wavefront=None, parameters=None, element_index=None):
+        is_generic_wavefront = isinstance(wavefront, GenericWavefront2D)
+
+        if is_generic_wavefront: wavefront = SRWWavefront._fromGenericWavefrontCopyOnWrite(wavefront)
+
         oe_array = []
         pp_array = []
 
@@ -99,9 +105,12 @@ class SRWOpticalElement(SRWOpticalElementDecorator, OpticalElementDecorator):
         optBL = SRWLOptC(oe_array,
                          pp_array)
 
+        if isinstance(wavefront, SRWWavefront): wavefront.detach_buffers()
+
         srwl.PropagElecField(wavefront, optBL)
 
-        return wavefront
+        if is_generic_wavefront: return SRWLazyGenericWavefront2D(wavefront)
+        else: return wavefront
 
     def add_to_srw_native_array(self, oe_array = [], pp_array=[], parameters=None, wavefront=None):
         if not self.displacement is None:
@@ -191,6 +200,27 @@ class SRWOpticalElement(SRWOpticalElementDecorator, OpticalElementDecorator):
     def get_default_propagation_parameters(self):
         return WavefrontPropagationParameters().to_SRW_array()
 
+    def get_fingerprint_data(self, photon_energy=None):
+        """
+        Data identifying the SRW native elements generated by this optical element, to be hashed by the beamline
+        :param photon_energy: photon energy of the wavefront, to be added by elements depending on it
+        """
+        return [self]
+
+    def is_photon_energy_dependent(self):
+        """
+        True if the SRW native elements generated by this optical element depend on the photon energy of the wavefront
+        """
+        return False
+
+    def _get_file_fingerprint_data(self, file_name):
+        try:
+            stat = os.stat(file_name)
+
+            return [os.path.abspath(file_name), stat.st_mtime_ns, stat.st_size]
+        except OSError:
+            return [file_name]
+
 from srwlib import SRWLOptA
 
 class SRWOpticalElementWithAcceptanceSlit(SRWOpticalElement):
@@ -0,0 +1,190 @@
+import numpy
+from array import array
+
+from srwlib import SRWLOptT
+
+# Vectorized setup of transmission (SRWLOptT) elements of refractive optics: same data as srwl_opt_setup_CRL,
+# computed with numpy on the whole grid and for all the photon energies at once
+
+def get_CRL_thickness(x, y, plane_of_focusing, shape, half_aperture, radius, wall_thickness):
+    """
+    Ray path in the material of a single lens, centered in (0, 0)
+    :param x, y: broadcastable arrays of transverse coordinates [m]
+    :param plane_of_focusing: 1- horizontal, 2- vertical, 3- both
+    :param shape: 1- parabolic, 2- circular (spherical)
+    :param radius: radius (on tip of parabola for parabolic shape) [m]
+    """
+    x, y = numpy.broadcast_arrays(numpy.asarray(x, dtype=float), numpy.asarray(y, dtype=float))
+
+    r2 = numpy.zeros_like(x)
+    if plane_of_focusing in (1, 3): r2 += x**2
+    if plane_of_focusing in (2, 3): r2 += y**2
+
+    half_aperture2 = half_aperture**2
+    radius2 = radius**2
+
+    if shape == 1:
+        return wall_thickness + numpy.minimum(r2, half_aperture2)/radius
+    elif shape == 2:
+        if half_aperture < radius:
+            return wall_thickness + 2*(radius - numpy.sqrt(radius2 - numpy.minimum(r2, half_aperture2)))
+        else:
+            return wall_thickness + 2*radius - 2*numpy.sqrt(numpy.maximum(radius2 - r2, 0.0))
+    else:
+        raise ValueError("CRL shape not recognized")
+
+def get_voids_thickness(x, y, void_center_coordinates):
+    """
+    Ray path in spherical voids
+    :param void_center_coordinates: flat array/list of void center coordinates and radii: [x1, y1, r1, x2, y2, r2,...]
+    """
+    x, y = numpy.broadcast_arrays(numpy.asarray(x, dtype=float), numpy.asarray(y, dtype=float))
+
+    thickness = numpy.zeros_like(x)
+
+    if not void_center_coordinates is None:
+        for x_void, y_void, radius in numpy.reshape(numpy.asarray(void_center_coordinates, dtype=float)[:3*(len(void_center_coordinates)//3)], (-1, 3)):
+            thickness += 2*numpy.sqrt(numpy.maximum(radius**2 - (x - x_void)**2 - (y - y_void)**2, 0.0))
+
+    return thickness
+
+def get_optical_constants(refractive_index, attenuation_length):
+    """
+    :param refractive_index: refractive index decrement, one number or array vs photon energy
+    :param attenuation_length: attenuation length [m], one number or array vs photon energy
+    :return: (refractive_index, attenuation_length) as arrays vs photon energy of the same length
+    """
+    refractive_index = numpy.ravel(numpy.asarray(refractive_index, dtype=float))
+    attenuation_length = numpy.ravel(numpy.asarray(attenuation_length, dtype=float))
+
+    if len(refractive_index) == 1:
+        refractive_index = numpy.full(len(attenuation_length), refractive_index[0])
+    elif len(attenuation_length) == 1:
+        attenuation_length = numpy.full(len(refractive_index), attenuation_length[0])
+    else:
+        number_of_energies = min(len(refractive_index), len(attenuation_length))
+
+        refractive_index = refractive_index[:number_of_energies]
+        attenuation_length = attenuation_length[:number_of_energies]
+
+    return refractive_index, attenuation_length
+
+def get_refractive_transmission_data(thickness, refractive_index, attenuation_length):
+    """
+    :param thickness: ray path in the material [m], array (vertical, horizontal)
+    :return: array (vertical, horizontal, energy, 2) of amplitude transmission and optical path difference, in SRW order
+    """
+    refractive_index, attenuation_length = get_optical_constants(refractive_index, attenuation_length)
+
+    thickness = numpy.asarray(thickness, dtype=float)[..., numpy.newaxis]
+
+    transmission_data = numpy.empty(thickness.shape[:-1] + (len(refractive_index), 2))
+    transmission_data[..., 0] = numpy.exp(-0.5*thickness/attenuation_length)
+    transmission_data[..., 1] = -refractive_index*thickness
+
+    return transmission_data
+
+def refractive_transmission_to_SRWLOptT(thickness,
+                                        refractive_index,
+                                        attenuation_length,
+                                        horizontal_range,
+                                        vertical_range,
+                                        horizontal_center_coordinate=0.0,
+                                        vertical_center_coordinate=0.0,
+                                        initial_photon_energy=0.0,
+                                        final_photon_energy=0.0,
+                                        horizontal_focal_length=1e23,
+                                        vertical_focal_length=1e23,
+                                        extended_transmission=0):
+    """
+    Generic refractive transmission element
+    :param thickness: ray path in the material [m], array (vertical, horizontal) on a regular grid covering the ranges
+    :param extended_transmission: transmission outside the grid is zero (0), or it is same as on boundary (1)
+    """
+    transmission_data = get_refractive_transmission_data(thickness, refractive_index, attenuation_length)
+
+    number_of_energies = transmission_data.shape[2]
+
+    return SRWLOptT(_nx=transmission_data.shape[1],
+                    _ny=transmission_data.shape[0],
+                    _rx=horizontal_range,
+                    _ry=vertical_range,
+                    _arTr=array('d', transmission_data.tobytes()),
+                    _extTr=extended_transmission,
+                    _Fx=horizontal_focal_length,
+                    _Fy=vertical_focal_length,
+                    _x=horizontal_center_coordinate,
+                    _y=vertical_center_coordinate,
+                    _ne=number_of_energies,
+                    _eStart=initial_photon_energy,
+                    _eFin=final_photon_energy)
+
+def CRL_to_SRWLOptT(plane_of_focusing,
+                    refractive_index,
+                    attenuation_length,
+                    shape,
+                    horizontal_aperture_size,
+                    vertical_aperture_size,
+                    radius_of_curvature,
+                    number_of_lenses,
+                    wall_thickness,
+                    horizontal_center_coordinate,
+                    vertical_center_coordinate,
+                    void_center_coordinates=None,
+                    initial_photon_energy=0,
+                    final_photon_energy=0,
+                    horizontal_points=1001,
+                    vertical_points=1001):
+    """
+    Vectorized equivalent of srwl_opt_setup_CRL (without rotations): same parameters, in the same order
+    """
+    horizontal_range = horizontal_aperture_size*1.1
+    vertical_range = vertical_aperture_size*1.1
+
+    half_aperture = 0.5*horizontal_aperture_size
+    if plane_of_focusing == 2: half_aperture = 0.5*vertical_aperture_size
+    elif plane_of_focusing == 3: half_aperture = min(half_aperture, 0.5*vertical_aperture_size)
+
+    # CRL is always centered on the grid, however grid can be shifted
+    x = numpy.linspace(-0.5*horizontal_range, 0.5*horizontal_range, horizontal_points)[numpy.newaxis, :]
+    y = numpy.linspace(-0.5*vertical_range, 0.5*vertical_range, vertical_points)[:, numpy.newaxis]
+
+    thickness = number_of_lenses*get_CRL_thickness(x, y, plane_of_focusing, shape, half_aperture, radius_of_curvature, wall_thickness)
+    if not void_center_coordinates is None: thickness = thickness - get_voids_thickness(x, y, void_center_coordinates)
+
+    refractive_index_array, attenuation_length_array = get_optical_constants(refractive_index, attenuation_length)
+
+    focal_length = 0.5*radius_of_curvature/(number_of_lenses*refractive_index_array[len(refractive_index_array)//2])
+
+    transmission = refractive_transmission_to_SRWLOptT(thickness,
+                                                       refractive_index_array,
+                                                       attenuation_length_array,
+                                                       horizontal_range,
+                                                       vertical_range,
+                                                       horizontal_center_coordinate,
+                                                       vertical_center_coordinate,
+                                                       initial_photon_energy,
+                                                       final_photon_energy,
+                                                       horizontal_focal_length=1e23 if plane_of_focusing == 2 else focal_length,
+                                                       vertical_focal_length=1e23 if plane_of_focusing == 1 else focal_length,
+                                                       extended_transmission=1)
+
+    transmission.input_parms = {"type": "crl",
+                                "focalPlane": plane_of_focusing,
+                                "refractiveIndex": refractive_index,
+                                "attenuationLength": attenuation_length,
+                                "shape": shape,
+                                "horizontalApertureSize": horizontal_aperture_size,
+                                "verticalApertureSize": vertical_aperture_size,
+                                "radius": radius_of_curvature,
+                                "numberOfLenses": number_of_lenses,
+                                "wallThickness": wall_thickness,
+                                "horizontalCenterCoordinate": horizontal_center_coordinate,
+                                "verticalCenterCoordinate": vertical_center_coordinate,
+                                "voidCenterCoordinates": void_center_coordinates,
+                                "initialPhotonEnergy": initial_photon_energy,
+                                "finalPhotonPnergy": final_photon_energy,
+                                "horizontalPoints": horizontal_points,
+                                "verticalPoints": vertical_points}
+
+    return transmission
@@ -1,4 +1,7 @@
 
+import hashlib
+import pickle
+
 from syned.beamline.beamline import Beamline
 
 from wofrysrw.srw_object import SRWObject
@@ -48,6 +51,43 @@ class SRWBeamline(Beamline, SRWObject):
 
         return self._wavefront_propagation_parameters_list[where][index]
 
+    def get_element_fingerprint(self, index, photon_energy=None):
+        """
+        Content hash of the beamline element at index: optical element, coordinates and propagation parameters
+        :param photon_energy: photon energy of the wavefront, relevant only for elements depending on it
+        :return: hex digest, or None if the element content cannot be hashed
+        """
+        beamline_element = self.get_beamline_element_at(index)
+
+        data = [beamline_element.get_optical_element().get_fingerprint_data(photon_energy),
+                beamline_element.get_coordinates()]
+
+        for where in Where.tuple():
+            if index < len(self._wavefront_propagation_parameters_list[where]):
+                data.append(self.get_wavefront_propagation_parameters_at(index, where))
+
+        try:
+            return hashlib.sha1(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()
+        except Exception:
+            return None
+
+    def get_fingerprint(self, photon_energy=None, number_of_elements=None):
+        """
+        Content hash of the first number_of_elements beamline elements (all of them if None)
+        :return: hex digest, or None if any element content cannot be hashed
+        """
+        if number_of_elements is None: number_of_elements = self.get_beamline_elements_number()
+
+        fingerprint = hashlib.sha1()
+
+        for index in range(number_of_elements):
+            element_fingerprint = self.get_element_fingerprint(index, photon_energy)
+
+            if element_fingerprint is None: return None
+            else: fingerprint.update(element_fingerprint.encode())
+
+        return fingerprint.hexdigest()
+
     def duplicate(self):
         beamline_elements_list = []
         for beamline_element in self._beamline_elements_list:
@@ -61,6 +101,21 @@ class SRWBeamline(Beamline, SRWObject):
 
         return new_beamline
 
+    def get_sub_beamline(self, start_index=0, end_index=None):
+        """
+        Beamline made of the elements from start_index to end_index (excluded), shared with this one together with
+        their propagation parameters
+        """
+        if end_index is None: end_index = self.get_beamline_elements_number()
+
+        new_beamline = SRWBeamline(light_source=self._light_source, beamline_elements_list=self._beamline_elements_list[start_index:end_index])
+
+        for where in Where.tuple():
+            for element in self.get_wavefront_propagation_parameters(where)[start_index:end_index]:
+                new_beamline.append_wavefront_propagation_parameters(element[0], element[1], where)
+
+        return new_beamline
+
     def to_python_code(self, data=None):
         wavefront = data[0]
         is_multi_electron = data[1] == True
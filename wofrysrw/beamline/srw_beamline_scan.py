@@ -0,0 +1,147 @@
+import copy
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from wofrysrw.propagator.wavefront2D.srw_wavefront import SRWWavefront
+from wofrysrw.propagator.propagators2D.srw_fresnel_native import SRWCompiledBeamline
+
+class SRWBeamlineScanParameter(object):
+    """
+    Scanned attribute of a beamline element, as a dotted path relative to the element: e.g.
+    "optical_element.grazing_angle", "optical_element.horizontal_gap", "coordinates.q".
+    Every name is resolved as a public attribute or, if missing, as the corresponding protected one (_name)
+    """
+    def __init__(self, element_index, attribute_path, display_name=None, unit=""):
+        self._element_index = element_index
+        self._attribute_path = attribute_path
+        self._display_name = attribute_path if display_name is None else display_name
+        self._unit = unit
+
+    def get_element_index(self):
+        return self._element_index
+
+    def get_scanned_beamline(self, srw_beamline, value):
+        """
+        :return: a duplicate of the beamline, with a deep copy of the scanned element carrying the value
+        """
+        if self._element_index >= srw_beamline.get_beamline_elements_number():
+            raise IndexError("Index " + str(self._element_index) + " out of bounds")
+
+        beamline_element = copy.deepcopy(srw_beamline.get_beamline_element_at(self._element_index))
+
+        names = self._attribute_path.split(".")
+
+        target = beamline_element
+        for name in names[:-1]: target = getattr(target, self.__get_attribute_name(target, name))
+        setattr(target, self.__get_attribute_name(target, names[-1]), value)
+
+        scanned_beamline = srw_beamline.duplicate()
+        scanned_beamline._beamline_elements_list[self._element_index] = beamline_element
+
+        return scanned_beamline
+
+    def get_scanning_data(self, value):
+        return SRWWavefront.ScanningData(self._attribute_path, value, self._display_name, self._unit)
+
+    @classmethod
+    def __get_attribute_name(cls, target, name):
+        if hasattr(target, name) and not callable(getattr(target, name)): return name
+        elif hasattr(target, "_" + name): return "_" + name
+        else: raise ValueError("Attribute " + name + " not found in " + type(target).__name__)
+
+class SRWBeamlineScan(object):
+    """
+    Propagation of a wavefront through a beamline for all the values of a scanned parameter: the elements shared by
+    all the scanned beamlines (same content fingerprint) are propagated once, then the different suffixes are
+    propagated on a local process pool (runs giving identical beamlines are propagated only once).
+    """
+    def __init__(self, srw_beamline, scan_parameter, values, number_of_processes=None):
+        """
+        :param scan_parameter: SRWBeamlineScanParameter
+        :param number_of_processes: None: one per CPU, 1: serial calculation
+        """
+        self._srw_beamline = srw_beamline
+        self._scan_parameter = scan_parameter
+        self._values = list(values)
+        self._number_of_processes = number_of_processes
+
+    def get_scanned_beamlines(self):
+        return [self._scan_parameter.get_scanned_beamline(self._srw_beamline, value) for value in self._values]
+
+    def run(self, wavefront):
+        """
+        Generator: yields the propagated wavefronts, tagged with SRWWavefront.ScanningData, as soon as they are ready
+        (not necessarily in the order of the values). The input wavefront is left unchanged.
+        """
+        if len(self._values) == 0: return
+
+        scanned_beamlines = self.get_scanned_beamlines()
+
+        prefix_length, groups = self.__get_prefix_and_groups(scanned_beamlines, wavefront.get_photon_energy())
+
+        prefix_wavefront = wavefront.duplicate(copy_on_write=True)
+        SRWCompiledBeamline().propagate(scanned_beamlines[0].get_sub_beamline(0, prefix_length), prefix_wavefront)
+
+        suffix_beamlines = [scanned_beamlines[group[0]].get_sub_beamline(prefix_length) for group in groups]
+
+        number_of_processes = self._number_of_processes
+        if number_of_processes is None: number_of_processes = os.cpu_count()
+        number_of_processes = min(number_of_processes, len(groups))
+
+        if number_of_processes <= 1:
+            _initialize_worker(prefix_wavefront)
+
+            try:
+                for group, suffix_beamline in zip(groups, suffix_beamlines):
+                    for scanned_wavefront in self.__tag(group, _propagate_suffix(suffix_beamline)): yield scanned_wavefront
+            finally:
+                _worker_data.clear()
+        else:
+            with ProcessPoolExecutor(max_workers=number_of_processes,
+                                     initializer=_initialize_worker,
+                                     initargs=(prefix_wavefront,)) as executor:
+                futures = {executor.submit(_propagate_suffix, suffix_beamline): group for group, suffix_beamline in zip(groups, suffix_beamlines)}
+
+                for future in as_completed(futures):
+                    for scanned_wavefront in self.__tag(futures[future], future.result()): yield scanned_wavefront
+
+    def __get_prefix_and_groups(self, scanned_beamlines, photon_energy):
+        number_of_elements = self._srw_beamline.get_beamline_elements_number()
+
+        fingerprints = [[beamline.get_element_fingerprint(index, photon_energy) for index in range(number_of_elements)] for beamline in scanned_beamlines]
+
+        prefix_length = 0
+        while prefix_length < number_of_elements and \
+                not fingerprints[0][prefix_length] is None and \
+                all([element_fingerprints[prefix_length] == fingerprints[0][prefix_length] for element_fingerprints in fingerprints]):
+            prefix_length += 1
+
+        groups = {}
+        for value_index, element_fingerprints in enumerate(fingerprints):
+            key = tuple(element_fingerprints) if not None in element_fingerprints else value_index # not hashable: never grouped
+            groups.setdefault(key, []).append(value_index)
+
+        return prefix_length, list(groups.values())
+
+    def __tag(self, group, wavefront):
+        # the results are returned to the caller, who may modify them with direct SRW calls: they share no buffers,
+        # and the copies are taken before any of them is yielded
+        wavefront.detach_buffers()
+
+        scanned_wavefronts = [wavefront] + [wavefront.duplicate() for _ in group[1:]]
+
+        for value_index, scanned_wavefront in zip(group, scanned_wavefronts):
+            scanned_wavefront.setScanningData(self._scan_parameter.get_scanning_data(self._values[value_index]))
+
+            yield scanned_wavefront
+
+###################################################################
+# WORKERS
+
+_worker_data = {}
+
+def _initialize_worker(prefix_wavefront):
+    _worker_data["prefix_wavefront"] = prefix_wavefront
+
+def _propagate_suffix(suffix_beamline):
+    return SRWCompiledBeamline().propagate(suffix_beamline, _worker_data["prefix_wavefront"].duplicate(copy_on_write=True))
@@ -0,0 +1,138 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from srwlib import srwl, SRWLOptC
+
+from wofrysrw.propagator.wavefront2D.srw_wavefront import SRWWavefront, PolarizationComponent
+from wofrysrw.propagator.propagators2D.srw_fresnel_native import FresnelSRWNative
+
+class SRWEnergyScan(object):
+    """
+    Propagation of monochromatic source wavefronts through a beamline (whole beamline mode) at many photon energies:
+    the SRW native elements not depending on the photon energy (see SRWOpticalElement.is_photon_energy_dependent)
+    are built once per process, only the others are regenerated at every energy.
+    Photon energies are distributed on a local process pool.
+    """
+    def __init__(self,
+                 srw_beamline,
+                 source_wavefront_parameters,
+                 photon_energies,
+                 number_of_processes=None, # None: one per CPU, 1: serial calculation
+                 multi_electron=True,
+                 polarization_component_to_be_extracted=PolarizationComponent.TOTAL,
+                 calculate_intensity=True):
+        self._srw_beamline = srw_beamline
+        self._source_wavefront_parameters = source_wavefront_parameters
+        self._photon_energies = list(photon_energies)
+        self._number_of_processes = number_of_processes
+        self._multi_electron = multi_electron
+        self._polarization_component_to_be_extracted = polarization_component_to_be_extracted
+        self._calculate_intensity = calculate_intensity
+
+    def get_photon_energy_dependent_elements(self):
+        """
+        :return: list of booleans, one per beamline element
+        """
+        return [self._srw_beamline.get_beamline_element_at(index).get_optical_element().is_photon_energy_dependent()
+                for index in range(self._srw_beamline.get_beamline_elements_number())]
+
+    def run(self):
+        """
+        Generator: yields (photon_energy, flux, intensity) as soon as calculated (not necessarily in the order of the
+        photon energies), with intensity = (h_array, v_array, intensity_array[horizontal, vertical]) or None if not requested
+        """
+        if len(self._photon_energies) == 0: return
+
+        initargs = (self._srw_beamline,
+                    self._source_wavefront_parameters,
+                    self.get_photon_energy_dependent_elements(),
+                    self._multi_electron,
+                    self._polarization_component_to_be_extracted,
+                    self._calculate_intensity)
+
+        number_of_processes = self._number_of_processes
+        if number_of_processes is None: number_of_processes = os.cpu_count()
+        number_of_processes = min(number_of_processes, len(self._photon_energies))
+
+        if number_of_processes <= 1:
+            _initialize_worker(*initargs)
+
+            try:
+                for photon_energy in self._photon_energies: yield _calculate_at_photon_energy(photon_energy)
+            finally:
+                _worker_data.clear()
+        else:
+            with ProcessPoolExecutor(max_workers=number_of_processes, initializer=_initialize_worker, initargs=initargs) as executor:
+                futures = [executor.submit(_calculate_at_photon_energy, photon_energy) for photon_energy in self._photon_energies]
+
+                for future in as_completed(futures): yield future.result()
+
+###################################################################
+# WORKERS
+
+_worker_data = {}
+
+def _initialize_worker(srw_beamline, source_wavefront_parameters, photon_energy_dependent_elements, multi_electron, polarization_component, calculate_intensity):
+    propagator = FresnelSRWNative()
+
+    # SRW native elements of each beamline element (drifts included), None if depending on the photon energy
+    native_elements = []
+
+    for index, is_photon_energy_dependent in enumerate(photon_energy_dependent_elements):
+        if is_photon_energy_dependent:
+            native_elements.append(None)
+        else:
+            srw_oe_array = []
+            srw_pp_array = []
+
+            propagator.add_optical_element_from_beamline(srw_beamline, index, srw_oe_array, srw_pp_array, None)
+
+            native_elements.append((srw_oe_array, srw_pp_array))
+
+    _worker_data["arguments"] = (srw_beamline, source_wavefront_parameters, multi_electron, polarization_component, calculate_intensity)
+    _worker_data["native_elements"] = native_elements
+    _worker_data["propagator"] = propagator
+
+def _calculate_at_photon_energy(photon_energy):
+    srw_beamline, source_wavefront_parameters, multi_electron, polarization_component, calculate_intensity = _worker_data["arguments"]
+    propagator = _worker_data["propagator"]
+
+    light_source = srw_beamline.get_light_source()
+
+    mesh = source_wavefront_parameters.to_SRWRadMesh()
+    mesh.eStart = photon_energy
+    mesh.eFin = photon_energy
+    mesh.ne = 1
+
+    wfr = SRWWavefront()
+    wfr.allocate(mesh.ne, mesh.nx, mesh.ny)
+    wfr.mesh = mesh
+    wfr.partBeam = light_source.get_electron_beam().to_SRWLPartBeam()
+
+    srwl.CalcElecFieldSR(wfr,
+                         0,
+                         light_source.get_magnetic_structure().get_SRWLMagFldC(),
+                         source_wavefront_parameters._wavefront_precision_parameters.to_SRW_array())
+
+    srw_oe_array = []
+    srw_pp_array = []
+
+    for index, native_element in enumerate(_worker_data["native_elements"]):
+        if native_element is None: # built with the source wavefront, as in whole beamline mode
+            propagator.add_optical_element_from_beamline(srw_beamline, index, srw_oe_array, srw_pp_array, wfr)
+        else:
+            srw_oe_array.extend(native_element[0])
+            srw_pp_array.extend(native_element[1])
+
+    if len(srw_oe_array) > 0: srwl.PropagElecField(wfr, SRWLOptC(srw_oe_array, srw_pp_array))
+
+    flux = float(wfr.get_flux(multi_electron, polarization_component)[1][0])
+
+    if calculate_intensity:
+        _, h_array, v_array, intensity_array = wfr.get_intensity(multi_electron, polarization_component)
+
+        intensity = (h_array, v_array, intensity_array[0])
+    else:
+        intensity = None
+
+    return photon_energy, flux, intensity
@@ -0,0 +1,271 @@
+import copy
+import numpy
+
+from wofrysrw.beamline.srw_beamline import Where
+
+class OverBudgetAction:
+    REPORT = 0    # the plan shows the steps exceeding the budget
+    REFUSE = 1    # ValueError at the first step exceeding the budget
+    DOWNSCALE = 2 # the resolution factors of the steps exceeding the budget are reduced
+
+class SRWMemoryPlanStep(object):
+    """
+    Predicted wavefront after a propagation step (drift before, optical element or drift after of a beamline element)
+    """
+    def __init__(self,
+                 index,
+                 where,
+                 nx,
+                 ny,
+                 horizontal_range,
+                 vertical_range,
+                 field_memory,
+                 fft_memory,
+                 peak_memory,
+                 resolution_scaling_factor=1.0,
+                 auto_resize=False):
+        self._index = index
+        self._where = where
+        self._nx = nx
+        self._ny = ny
+        self._horizontal_range = horizontal_range
+        self._vertical_range = vertical_range
+        self._field_memory = field_memory
+        self._fft_memory = fft_memory
+        self._peak_memory = peak_memory
+        self._resolution_scaling_factor = resolution_scaling_factor # applied by the planner to the resolution factors
+        self._auto_resize = auto_resize # SRW automatic resizing: the prediction is a lower bound
+
+    def get_index(self):
+        return self._index
+
+    def get_where(self):
+        return self._where
+
+    def get_dimension(self):
+        return self._nx, self._ny
+
+    def get_ranges(self):
+        return self._horizontal_range, self._vertical_range
+
+    def get_field_memory(self):
+        return self._field_memory
+
+    def get_fft_memory(self):
+        return self._fft_memory
+
+    def get_peak_memory(self):
+        return self._peak_memory
+
+    def get_resolution_scaling_factor(self):
+        return self._resolution_scaling_factor
+
+    def is_auto_resize(self):
+        return self._auto_resize
+
+class SRWMemoryPlan(object):
+    def __init__(self, memory_budget, initial_field_memory, steps, srw_beamline):
+        self._memory_budget = memory_budget
+        self._initial_field_memory = initial_field_memory
+        self._steps = steps
+        self._srw_beamline = srw_beamline
+
+    def get_steps(self):
+        return self._steps
+
+    def get_srw_beamline(self):
+        """
+        :return: the planned beamline (a duplicate with new propagation parameters, if downscaled)
+        """
+        return self._srw_beamline
+
+    def get_peak_memory(self):
+        return max([self._initial_field_memory] + [step.get_peak_memory() for step in self._steps])
+
+    def is_within_budget(self):
+        return self.get_peak_memory() <= self._memory_budget
+
+    def is_downscaled(self):
+        return any([step.get_resolution_scaling_factor() < 1.0 for step in self._steps])
+
+    def to_info(self):
+        info = 'Memory plan (budget: ' + str(round(self._memory_budget/1024**3, 3)) + ' GB): \n'
+
+        for step in self._steps:
+            info += '   Element ' + str(step.get_index()) + ' (' + step.get_where() + '): ' + \
+                    'nx x ny = ' + str(step.get_dimension()[0]) + ' x ' + str(step.get_dimension()[1]) + ', ' + \
+                    'field/FFT/peak [GB] = ' + str(round(step.get_field_memory()/1024**3, 3)) + ' / ' + \
+                    str(round(step.get_fft_memory()/1024**3, 3)) + ' / ' + str(round(step.get_peak_memory()/1024**3, 3))
+
+            if step.get_resolution_scaling_factor() < 1.0: info += ', resolution downscaled by ' + str(round(step.get_resolution_scaling_factor(), 4))
+            if step.is_auto_resize(): info += ', auto-resize (lower bound)'
+
+            info += '\n'
+
+        return info
+
+class SRWMemoryPlanner(object):
+    """
+    Predicts the wavefront dimensions and memory after each propagation step of a SRWBeamline, from the range and
+    resolution modification factors of the propagation parameters, without running the propagation.
+    Model: the field is two components (Ex, Ey) of complex float32 per photon energy, point counts are rounded up to
+    the FFT-friendly sizes (2^a 3^b 5^c, even) used by SRW, resizing keeps old and new fields in memory at the same
+    time and FFT-based steps (drifts, resizing on the Fourier side) need a complex buffer per component.
+    Automatic resizing (decided by SRW at run time) cannot be predicted: those steps are lower bounds.
+    """
+    FIELD_BYTES_PER_POINT = 2*2*4 # Ex, Ey - real and imaginary parts - float32
+    FFT_BYTES_PER_POINT = 2*2*4   # complex float32 buffer for each component
+
+    MAXIMUM_DOWNSCALING_ITERATIONS = 100
+
+    def __init__(self, memory_budget, over_budget_action=OverBudgetAction.REFUSE):
+        """
+        :param memory_budget: maximum memory [bytes] for the wavefront propagation
+        :param over_budget_action: one of OverBudgetAction
+        """
+        if memory_budget <= 0: raise ValueError("Memory budget should be > 0")
+        if not over_budget_action in (OverBudgetAction.REPORT, OverBudgetAction.REFUSE, OverBudgetAction.DOWNSCALE):
+            raise ValueError("Over budget action not recognized")
+
+        self._memory_budget = memory_budget
+        self._over_budget_action = over_budget_action
+
+    def plan(self, srw_beamline, mesh):
+        """
+        :param mesh: SRWLRadMesh of the initial wavefront
+        :return: SRWMemoryPlan
+        """
+        number_of_energies = max(int(mesh.ne), 1)
+        nx = int(mesh.nx)
+        ny = int(mesh.ny)
+        horizontal_range = mesh.xFin - mesh.xStart
+        vertical_range = mesh.yFin - mesh.yStart
+
+        initial_field_memory = self.get_field_memory(number_of_energies, nx, ny)
+
+        if initial_field_memory > self._memory_budget and self._over_budget_action != OverBudgetAction.REPORT:
+            raise ValueError("Initial wavefront (" + self.__to_GB(initial_field_memory) + " GB) exceeds the memory budget")
+
+        if self._over_budget_action == OverBudgetAction.DOWNSCALE: planned_beamline = srw_beamline.duplicate()
+        else: planned_beamline = srw_beamline
+
+        steps = []
+
+        for index in range(srw_beamline.get_beamline_elements_number()):
+            coordinates = srw_beamline.get_beamline_element_at(index).get_coordinates()
+
+            for where in Where.tuple():
+                if where == Where.DRIFT_BEFORE and coordinates.p() == 0.0: continue
+                if where == Where.DRIFT_AFTER and coordinates.q() == 0.0: continue
+
+                wavefront_propagation_parameters = planned_beamline.get_wavefront_propagation_parameters_at(index, where)[0]
+
+                if wavefront_propagation_parameters is None: continue # screen
+
+                is_fft_step = where != Where.OE or wavefront_propagation_parameters._do_any_resizing_on_fourier_side_using_fft == 1
+
+                step = self.__plan_step(index, where, wavefront_propagation_parameters, is_fft_step, number_of_energies, nx, ny, horizontal_range, vertical_range)
+
+                if step.get_peak_memory() > self._memory_budget:
+                    if self._over_budget_action == OverBudgetAction.REFUSE:
+                        raise ValueError("Element " + str(index) + " (" + where + "): predicted peak memory " + self.__to_GB(step.get_peak_memory()) +
+                                         " GB exceeds the memory budget of " + self.__to_GB(self._memory_budget) + " GB")
+                    elif self._over_budget_action == OverBudgetAction.DOWNSCALE:
+                        step = self.__downscale_step(step, wavefront_propagation_parameters, is_fft_step, number_of_energies, nx, ny, horizontal_range, vertical_range)
+
+                        downscaled_parameters = copy.deepcopy(wavefront_propagation_parameters)
+                        downscaled_parameters._horizontal_resolution_modification_factor_at_resizing *= step.get_resolution_scaling_factor()
+                        downscaled_parameters._vertical_resolution_modification_factor_at_resizing *= step.get_resolution_scaling_factor()
+
+                        planned_beamline.get_wavefront_propagation_parameters(where)[index][0] = downscaled_parameters
+
+                steps.append(step)
+
+                nx, ny = step.get_dimension()
+                horizontal_range, vertical_range = step.get_ranges()
+
+        return SRWMemoryPlan(self._memory_budget, initial_field_memory, steps, planned_beamline)
+
+    @classmethod
+    def get_field_memory(cls, number_of_energies, nx, ny):
+        return cls.FIELD_BYTES_PER_POINT*number_of_energies*nx*ny
+
+    @classmethod
+    def get_fft_memory(cls, nx, ny):
+        return cls.FFT_BYTES_PER_POINT*nx*ny # photon energies are transformed one at a time
+
+    @classmethod
+    def get_fft_size(cls, number_of_points):
+        """
+        Smallest even number >= number_of_points with no prime factors other than 2, 3, 5
+        """
+        size = max(2, int(numpy.ceil(number_of_points - 1e-6)))
+
+        while True:
+            if size % 2 == 0:
+                remainder = size
+                for factor in (2, 3, 5):
+                    while remainder % factor == 0: remainder //= factor
+
+                if remainder == 1: return size
+
+            size += 1
+
+    def __plan_step(self, index, where, wavefront_propagation_parameters, is_fft_step, number_of_energies, nx, ny, horizontal_range, vertical_range, resolution_scaling_factor=1.0):
+        horizontal_range_factor = wavefront_propagation_parameters._horizontal_range_modification_factor_at_resizing
+        vertical_range_factor = wavefront_propagation_parameters._vertical_range_modification_factor_at_resizing
+        horizontal_resolution_factor = wavefront_propagation_parameters._horizontal_resolution_modification_factor_at_resizing*resolution_scaling_factor
+        vertical_resolution_factor = wavefront_propagation_parameters._vertical_resolution_modification_factor_at_resizing*resolution_scaling_factor
+
+        if horizontal_range_factor == 1.0 and horizontal_resolution_factor == 1.0: new_nx = nx # no resizing
+        else: new_nx = self.get_fft_size(nx*horizontal_range_factor*horizontal_resolution_factor)
+
+        if vertical_range_factor == 1.0 and vertical_resolution_factor == 1.0: new_ny = ny
+        else: new_ny = self.get_fft_size(ny*vertical_range_factor*vertical_resolution_factor)
+
+        field_memory = self.get_field_memory(number_of_energies, new_nx, new_ny)
+        fft_memory = self.get_fft_memory(new_nx, new_ny) if is_fft_step else 0
+
+        if (new_nx, new_ny) != (nx, ny): peak_memory = max(self.get_field_memory(number_of_energies, nx, ny) + field_memory, field_memory + fft_memory)
+        else: peak_memory = field_memory + fft_memory
+
+        return SRWMemoryPlanStep(index,
+                                 where,
+                                 new_nx,
+                                 new_ny,
+                                 horizontal_range*horizontal_range_factor,
+                                 vertical_range*vertical_range_factor,
+                                 field_memory,
+                                 fft_memory,
+                                 peak_memory,
+                                 resolution_scaling_factor=resolution_scaling_factor,
+                                 auto_resize=wavefront_propagation_parameters._auto_resize_before_propagation == 1 or \
+                                             wavefront_propagation_parameters._auto_resize_after_propagation == 1)
+
+    def __downscale_step(self, step, wavefront_propagation_parameters, is_fft_step, number_of_energies, nx, ny, horizontal_range, vertical_range):
+        # maximum number of points of the new wavefront, from the resizing peak (old + new field) and from the FFT peak
+        old_field_memory = self.get_field_memory(number_of_energies, nx, ny)
+        bytes_per_point = self.FIELD_BYTES_PER_POINT*number_of_energies + (self.FFT_BYTES_PER_POINT if is_fft_step else 0)
+
+        maximum_number_of_points = min((self._memory_budget - old_field_memory)/(self.FIELD_BYTES_PER_POINT*number_of_energies),
+                                       self._memory_budget/bytes_per_point)
+
+        if maximum_number_of_points <= 0:
+            raise ValueError("Element " + str(step.get_index()) + " (" + step.get_where() + "): the incoming wavefront exceeds the memory budget, downscaling not possible")
+
+        new_nx, new_ny = step.get_dimension()
+        resolution_scaling_factor = min(1.0, float(numpy.sqrt(maximum_number_of_points/(new_nx*new_ny))))
+
+        for _ in range(self.MAXIMUM_DOWNSCALING_ITERATIONS): # FFT-friendly rounding can increase the number of points
+            downscaled_step = self.__plan_step(step.get_index(), step.get_where(), wavefront_propagation_parameters, is_fft_step,
+                                               number_of_energies, nx, ny, horizontal_range, vertical_range, resolution_scaling_factor)
+
+            if downscaled_step.get_peak_memory() <= self._memory_budget: return downscaled_step
+
+            resolution_scaling_factor *= 0.95
+
+        raise ValueError("Element " + str(step.get_index()) + " (" + step.get_where() + "): downscaling to the memory budget not possible")
+
+    @classmethod
+    def __to_GB(cls, memory):
+        return str(round(memory/1024**3, 3))
@@ -0,0 +1,498 @@
+import numpy
+import os
+import pickle
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import warnings
+
+from scipy.interpolate import RegularGridInterpolator
+from scipy.stats import qmc, norm
+
+from srwlib import srwl
+
+from wofrysrw.propagator.wavefront2D.srw_wavefront import SRWWavefront, PolarizationComponent
+from wofrysrw.propagator.propagators2D.srw_fresnel_native import SRWCompiledBeamline
+from wofrysrw.storage_ring.srw_wavefront_cache import SRWWavefrontDiskCache
+
+class SamplingMode:
+    PSEUDO_RANDOM = 0
+    SOBOL = 1  # scrambled Sobol' sequence
+    HALTON = 2 # scrambled Halton sequence
+
+class MacroElectronSampler(object):
+    """
+    Gaussian sampling of the electron beam phase space from the SRWElectronBeam moments: each macro-electron is
+    a row (x, x', y, y', gamma) of first order moments, as in srwl_wfr_emit_prop_multi_e.
+    Quasi-random sequences are mapped to normal deviates by the inverse CDF; with antithetic sampling every deviate
+    is followed by its opposite, so the first moments of the beam are exact on each pair.
+    """
+    def __init__(self, electron_beam, seed=None, sampling_mode=SamplingMode.PSEUDO_RANDOM, antithetic=False):
+        if not sampling_mode in (SamplingMode.PSEUDO_RANDOM, SamplingMode.SOBOL, SamplingMode.HALTON):
+            raise ValueError("Sampling mode not recognized")
+
+        self._electron_beam = electron_beam
+        self._seed = seed
+        self._sampling_mode = sampling_mode
+        self._antithetic = antithetic
+
+        self.__initialize_generator()
+
+    def __initialize_generator(self):
+        if self._sampling_mode == SamplingMode.PSEUDO_RANDOM:
+            self._random_generator = numpy.random.default_rng(self._seed)
+        elif self._sampling_mode == SamplingMode.SOBOL:
+            self._random_generator = qmc.Sobol(d=5, scramble=True, seed=self._seed)
+        elif self._sampling_mode == SamplingMode.HALTON:
+            self._random_generator = qmc.Halton(d=5, scramble=True, seed=self._seed)
+
+        self._number_of_points = 0      # points drawn from the sequence
+        self._pending_antithetic = None # opposite of the last deviate, when an odd number was sampled
+
+    def get_normal_deviates(self, number_of_macro_electrons):
+        if not self._antithetic: return self.__draw_normal_deviates(number_of_macro_electrons)
+
+        deviates = numpy.empty((number_of_macro_electrons, 5))
+
+        start = 0
+        if not self._pending_antithetic is None and number_of_macro_electrons > 0:
+            deviates[0] = self._pending_antithetic
+            self._pending_antithetic = None
+            start = 1
+
+        number_of_pairs = (number_of_macro_electrons - start + 1)//2
+
+        if number_of_pairs > 0:
+            pairs = self.__draw_normal_deviates(number_of_pairs)
+
+            deviates[start::2]   = pairs[:len(deviates[start::2])]
+            deviates[start+1::2] = -pairs[:len(deviates[start+1::2])]
+
+            if (number_of_macro_electrons - start) % 2 == 1: self._pending_antithetic = -pairs[-1]
+
+        return deviates
+
+    def __draw_normal_deviates(self, number_of_points):
+        self._number_of_points += number_of_points
+
+        if self._sampling_mode == SamplingMode.PSEUDO_RANDOM:
+            return self._random_generator.standard_normal((number_of_points, 5))
+        else:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", UserWarning) # Sobol' balance properties warning for n not power of 2
+
+                points = self._random_generator.random(number_of_points)
+
+            return norm.ppf(numpy.clip(points, 1e-16, 1 - 1e-16))
+
+    def has_independent_samples(self):
+        """
+        Antithetic pairs and quasi-random sequences are correlated: the standard error of their average cannot
+        be estimated from the sample variance
+        """
+        return self._sampling_mode == SamplingMode.PSEUDO_RANDOM and not self._antithetic
+
+    def get_state(self):
+        if self._sampling_mode == SamplingMode.PSEUDO_RANDOM:
+            generator_state = self._random_generator.bit_generator.state
+        else:
+            generator_state = None # sequences are deterministic: the position is enough
+
+        return {"sampling_mode": self._sampling_mode,
+                "antithetic": self._antithetic,
+                "number_of_points": self._number_of_points,
+                "pending_antithetic": self._pending_antithetic,
+                "generator_state": generator_state}
+
+    def set_state(self, state):
+        if state["sampling_mode"] != self._sampling_mode or state["antithetic"] != self._antithetic:
+            raise ValueError("Sampler state not compatible with sampling mode")
+
+        self.__initialize_generator()
+
+        if self._sampling_mode == SamplingMode.PSEUDO_RANDOM:
+            self._random_generator.bit_generator.state = state["generator_state"]
+        else:
+            self._random_generator.fast_forward(state["number_of_points"])
+
+        self._number_of_points = state["number_of_points"]
+        self._pending_antithetic = state["pending_antithetic"]
+
+    def sample(self, number_of_macro_electrons):
+        deviates = self.get_normal_deviates(number_of_macro_electrons)
+
+        electron_beam = self._electron_beam
+
+        macro_electrons = numpy.empty((number_of_macro_electrons, 5))
+
+        macro_electrons[:, 0], macro_electrons[:, 1] = self.__correlated_pair(deviates[:, 0], deviates[:, 1],
+                                                                              electron_beam._moment_xx, electron_beam._moment_xxp, electron_beam._moment_xpxp)
+        macro_electrons[:, 2], macro_electrons[:, 3] = self.__correlated_pair(deviates[:, 2], deviates[:, 3],
+                                                                              electron_beam._moment_yy, electron_beam._moment_yyp, electron_beam._moment_ypyp)
+        macro_electrons[:, 0] += electron_beam._moment_x
+        macro_electrons[:, 1] += electron_beam._moment_xp
+        macro_electrons[:, 2] += electron_beam._moment_y
+        macro_electrons[:, 3] += electron_beam._moment_yp
+        macro_electrons[:, 4] = electron_beam.gamma()*(1 + electron_beam._energy_spread*deviates[:, 4])
+
+        return macro_electrons
+
+    @classmethod
+    def to_SRWLPartBeam(cls, electron_beam, macro_electron):
+        """
+        :param macro_electron: row (x, x', y, y', gamma) of the array returned by sample
+        :return: SRWLPartBeam of the electron beam, centered on the macro-electron
+        """
+        part_beam = electron_beam.to_SRWLPartBeam()
+        part_beam.partStatMom1.x     = float(macro_electron[0])
+        part_beam.partStatMom1.xp    = float(macro_electron[1])
+        part_beam.partStatMom1.y     = float(macro_electron[2])
+        part_beam.partStatMom1.yp    = float(macro_electron[3])
+        part_beam.partStatMom1.gamma = float(macro_electron[4])
+
+        return part_beam
+
+    @classmethod
+    def __correlated_pair(cls, deviate_1, deviate_2, moment_xx, moment_xxp, moment_xpxp):
+        # Cholesky factor of the covariance matrix [[<xx>, <xx'>], [<xx'>, <x'x'>]], robust to zero emittance
+        if moment_xx > 0:
+            sigma = numpy.sqrt(moment_xx)
+
+            return sigma*deviate_1, (moment_xxp/sigma)*deviate_1 + numpy.sqrt(max(moment_xpxp - moment_xxp**2/moment_xx, 0.0))*deviate_2
+        else:
+            return numpy.zeros_like(deviate_1), numpy.sqrt(max(moment_xpxp, 0.0))*deviate_2
+
+class MultiElectronParameters(object):
+    def __init__(self,
+                 number_of_macro_electrons=1000, # maximum number, if convergence_tolerance is given
+                 macro_electrons_per_task=10,
+                 number_of_processes=None, # None: one per CPU
+                 polarization_component_to_be_extracted=PolarizationComponent.TOTAL,
+                 seed=None,
+                 sampling_mode=SamplingMode.PSEUDO_RANDOM,
+                 antithetic=False,
+                 convergence_tolerance=None, # relative standard error of the average intensity (see MultiElectronIntensityAccumulator), pseudo-random non-antithetic sampling only
+                 minimum_number_of_macro_electrons=50,
+                 checkpoint_file=None,
+                 checkpoint_period=100): # macro-electrons
+        self._number_of_macro_electrons = number_of_macro_electrons
+        self._macro_electrons_per_task = macro_electrons_per_task
+        self._number_of_processes = number_of_processes
+        self._polarization_component_to_be_extracted = polarization_component_to_be_extracted
+        self._seed = seed
+        self._sampling_mode = sampling_mode
+        self._antithetic = antithetic
+        self._convergence_tolerance = convergence_tolerance
+        self._minimum_number_of_macro_electrons = minimum_number_of_macro_electrons
+        self._checkpoint_file = checkpoint_file
+        self._checkpoint_period = checkpoint_period
+
+class MultiElectronIntensityAccumulator(object):
+    """
+    Running mean and variance of the single-electron intensities (Chan et al. pairwise update of batches).
+    Standard errors assume independent intensities, i.e. pseudo-random non-antithetic sampling.
+    """
+    def __init__(self):
+        self._count = 0
+        self._mean = None
+        self._m2 = None # sum of squared deviations from the mean
+
+    def get_count(self):
+        return self._count
+
+    def add_batch(self, count, mean, m2):
+        if count == 0: return
+
+        if self._count == 0:
+            self._count = count
+            self._mean = numpy.array(mean, dtype=float)
+            self._m2 = numpy.array(m2, dtype=float)
+        else:
+            total = self._count + count
+            delta = mean - self._mean
+
+            self._mean += delta*(count/total)
+            self._m2 += m2 + delta**2*(self._count*count/total)
+            self._count = total
+
+    def get_mean(self):
+        return self._mean
+
+    def get_m2(self):
+        return self._m2
+
+    def get_variance(self):
+        if self._count < 2: return numpy.zeros_like(self._mean)
+
+        return self._m2/(self._count - 1)
+
+    def get_standard_error(self):
+        """
+        Per-pixel standard error of the mean intensity
+        """
+        return numpy.sqrt(self.get_variance()/self._count)
+
+    def get_relative_standard_error(self):
+        """
+        Integrated convergence metric: L2 norm of the standard error over L2 norm of the mean intensity
+        """
+        if self._count < 2: return numpy.inf
+
+        norm = numpy.sqrt(numpy.sum(self._mean**2))
+
+        return numpy.inf if norm == 0 else numpy.sqrt(numpy.sum(self.get_variance())/self._count)/norm
+
+    def to_dictionary(self):
+        return {"count": self._count, "mean": self._mean, "m2": self._m2}
+
+    @classmethod
+    def from_dictionary(cls, dictionary):
+        accumulator = MultiElectronIntensityAccumulator()
+        accumulator._count = dictionary["count"]
+        accumulator._mean = dictionary["mean"]
+        accumulator._m2 = dictionary["m2"]
+
+        return accumulator
+
+class SRWMultiElectronCalculator(object):
+    """
+    Partially coherent propagation of a SRWLightSource through a SRWBeamline (whole beamline mode), on a local process
+    pool: every macro-electron wavefront is calculated, propagated and reduced to intensity by the workers, then
+    interpolated on the mesh of the first macro-electron and averaged incrementally.
+    If a checkpoint file is given and exists, the calculation is resumed from it, provided that it was saved for the
+    same light source, source wavefront parameters, beamline and sampling parameters.
+    """
+    CHECKPOINT_VERSION = 2
+
+    def __init__(self, srw_beamline, source_wavefront_parameters, multi_electron_parameters=MultiElectronParameters(), sampler=None):
+        self._srw_beamline = srw_beamline
+        self._source_wavefront_parameters = source_wavefront_parameters
+        self._multi_electron_parameters = multi_electron_parameters
+        if sampler is None:
+            sampler = MacroElectronSampler(srw_beamline.get_light_source().get_electron_beam(),
+                                           seed=multi_electron_parameters._seed,
+                                           sampling_mode=multi_electron_parameters._sampling_mode,
+                                           antithetic=multi_electron_parameters._antithetic)
+
+        if not multi_electron_parameters._convergence_tolerance is None and not sampler.has_independent_samples():
+            raise ValueError("Convergence tolerance requires pseudo-random, non-antithetic sampling: the standard error of correlated macro-electrons is not estimated")
+
+        self._sampler = sampler
+
+        self._mesh_arrays = None
+        self._accumulator = MultiElectronIntensityAccumulator()
+
+        checkpoint_file = multi_electron_parameters._checkpoint_file
+        if not checkpoint_file is None and os.path.exists(checkpoint_file): self.load_checkpoint(checkpoint_file)
+
+    def get_number_of_macro_electrons(self):
+        return self._accumulator.get_count()
+
+    def get_accumulator(self):
+        return self._accumulator
+
+    def get_average_intensity(self):
+        """
+        :return: (e_array, h_array, v_array, intensity_array[energy, horizontal, vertical])
+        """
+        if self._accumulator.get_count() == 0: raise ValueError("No macro-electrons calculated yet")
+
+        return self._mesh_arrays + (self._accumulator.get_mean(),)
+
+    def get_standard_error(self):
+        """
+        :return: (e_array, h_array, v_array, standard_error_array[energy, horizontal, vertical]) of the average intensity
+        """
+        if self._accumulator.get_count() == 0: raise ValueError("No macro-electrons calculated yet")
+        if not self._sampler.has_independent_samples(): raise ValueError("Standard error not available for quasi-random or antithetic sampling")
+
+        return self._mesh_arrays + (self._accumulator.get_standard_error(),)
+
+    def is_converged(self):
+        tolerance = self._multi_electron_parameters._convergence_tolerance
+
+        return not tolerance is None and \
+               self._accumulator.get_count() >= self._multi_electron_parameters._minimum_number_of_macro_electrons and \
+               self._accumulator.get_relative_standard_error() <= tolerance
+
+    def get_fingerprint(self):
+        """
+        Content hash of everything defining the average intensity, except the number of macro-electrons
+        :return: hex digest, or None if the beamline content cannot be hashed
+        """
+        source_wavefront_parameters = self._source_wavefront_parameters
+
+        beamline_fingerprint = self._srw_beamline.get_fingerprint(photon_energy=0.5*(source_wavefront_parameters._photon_energy_min +
+                                                                                   source_wavefront_parameters._photon_energy_max))
+
+        if beamline_fingerprint is None: return None
+
+        data = [SRWWavefrontDiskCache.get_key(self._srw_beamline.get_light_source(), source_wavefront_parameters),
+                beamline_fingerprint,
+                self._multi_electron_parameters._polarization_component_to_be_extracted,
+                self._multi_electron_parameters._seed,
+                self._sampler._sampling_mode,
+                self._sampler._antithetic]
+
+        return hashlib.sha1(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()
+
+    def run(self, number_of_macro_electrons=None, progress_callback=None):
+        """
+        Calculates further macro-electrons, adding them to the average, until their number is reached or the
+        average is converged
+        :param number_of_macro_electrons: total number of macro-electrons (including the ones already calculated)
+        :param progress_callback: callable(calculator), called every time a task is accumulated
+        """
+        if number_of_macro_electrons is None: number_of_macro_electrons = self._multi_electron_parameters._number_of_macro_electrons
+
+        if self._mesh_arrays is None and number_of_macro_electrons > 0: # the first macro-electron defines the output mesh
+            e, h, v, intensity = _calculate_macro_electron_intensity(self._srw_beamline,
+                                                                     self._source_wavefront_parameters,
+                                                                     self._sampler.sample(1)[0],
+                                                                     self._multi_electron_parameters._polarization_component_to_be_extracted)
+            self._mesh_arrays = (e, h, v)
+            self._accumulate(1, intensity, numpy.zeros_like(intensity), progress_callback)
+
+        remaining = number_of_macro_electrons - self._accumulator.get_count()
+
+        if remaining <= 0 or self.is_converged():
+            if not self._multi_electron_parameters._checkpoint_file is None: self.save_checkpoint(self._multi_electron_parameters._checkpoint_file)
+
+            return self.get_average_intensity()
+
+        macro_electrons_per_task = self._multi_electron_parameters._macro_electrons_per_task
+
+        number_of_processes = self._multi_electron_parameters._number_of_processes
+        if number_of_processes is None: number_of_processes = os.cpu_count()
+        number_of_processes = max(1, min(number_of_processes, int(numpy.ceil(remaining/macro_electrons_per_task))))
+
+        with ProcessPoolExecutor(max_workers=number_of_processes,
+                                 initializer=_initialize_worker,
+                                 initargs=(self._srw_beamline,
+                                           self._source_wavefront_parameters,
+                                           self._multi_electron_parameters._polarization_component_to_be_extracted,
+                                           self._mesh_arrays[1],
+                                           self._mesh_arrays[2])) as executor:
+            futures = set()
+
+            # tasks are sampled and submitted lazily, a few per process, to stop as soon as the average is converged
+            while remaining > 0 or len(futures) > 0:
+                while remaining > 0 and len(futures) < 2*number_of_processes:
+                    task_size = min(macro_electrons_per_task, remaining)
+
+                    futures.add(executor.submit(_calculate_macro_electrons_intensity_statistics, self._sampler.sample(task_size)))
+
+                    remaining -= task_size
+
+                done, futures = wait(futures, return_when=FIRST_COMPLETED)
+
+                for future in done: self._accumulate(*future.result(), progress_callback=progress_callback)
+
+                if self.is_converged():
+                    for future in futures: future.cancel()
+
+                    break
+
+        if not self._multi_electron_parameters._checkpoint_file is None: self.save_checkpoint(self._multi_electron_parameters._checkpoint_file)
+
+        return self.get_average_intensity()
+
+    def _accumulate(self, count, mean, m2, progress_callback=None):
+        checkpoint_period = self._multi_electron_parameters._checkpoint_period
+        previous_count = self._accumulator.get_count()
+
+        self._accumulator.add_batch(count, mean, m2)
+
+        if not self._multi_electron_parameters._checkpoint_file is None and \
+                self._accumulator.get_count()//checkpoint_period > previous_count//checkpoint_period:
+            self.save_checkpoint(self._multi_electron_parameters._checkpoint_file)
+
+        if not progress_callback is None: progress_callback(self)
+
+    def save_checkpoint(self, file_name):
+        """
+        Saves accumulated statistics, output mesh and sampler state: the macro-electrons in progress at the time of
+        the checkpoint are not repeated after resuming
+        """
+        checkpoint = {"version": self.CHECKPOINT_VERSION,
+                      "fingerprint": self.get_fingerprint(),
+                      "mesh_arrays": self._mesh_arrays,
+                      "accumulator": self._accumulator.to_dictionary(),
+                      "sampler_state": self._sampler.get_state()}
+
+        with open(file_name + ".tmp", "wb") as file: pickle.dump(checkpoint, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(file_name + ".tmp", file_name)
+
+    def load_checkpoint(self, file_name):
+        with open(file_name, "rb") as file: checkpoint = pickle.load(file)
+
+        if checkpoint.get("version") != self.CHECKPOINT_VERSION: raise ValueError("Checkpoint file " + file_name + " not compatible")
+
+        fingerprint = self.get_fingerprint()
+
+        if fingerprint is None: raise ValueError("Checkpoint file " + file_name + " cannot be verified: the beamline content cannot be hashed")
+        if checkpoint["fingerprint"] != fingerprint:
+            raise ValueError("Checkpoint file " + file_name + " was saved for a different light source, beamline or parameters")
+
+        self._mesh_arrays = checkpoint["mesh_arrays"]
+        self._accumulator = MultiElectronIntensityAccumulator.from_dictionary(checkpoint["accumulator"])
+        self._sampler.set_state(checkpoint["sampler_state"])
+
+###################################################################
+# WORKERS
+
+_worker_data = {}
+
+def _initialize_worker(srw_beamline, source_wavefront_parameters, polarization_component, h_array, v_array):
+    _worker_data["arguments"] = (srw_beamline, source_wavefront_parameters, polarization_component, h_array, v_array)
+    _worker_data["compiled_beamline"] = SRWCompiledBeamline()
+
+def _calculate_macro_electrons_intensity_statistics(macro_electrons):
+    srw_beamline, source_wavefront_parameters, polarization_component, h_array, v_array = _worker_data["arguments"]
+
+    accumulator = MultiElectronIntensityAccumulator()
+
+    for macro_electron in macro_electrons:
+        _, h, v, intensity = _calculate_macro_electron_intensity(srw_beamline, source_wavefront_parameters, macro_electron,
+                                                                 polarization_component, _worker_data["compiled_beamline"])
+
+        intensity = _interpolate_intensity(h, v, intensity, h_array, v_array)
+
+        accumulator.add_batch(1, intensity, numpy.zeros_like(intensity))
+
+    return accumulator.get_count(), accumulator.get_mean(), accumulator.get_m2()
+
+def _calculate_macro_electron_intensity(srw_beamline, source_wavefront_parameters, macro_electron, polarization_component, compiled_beamline=None):
+    light_source = srw_beamline.get_light_source()
+
+    part_beam = MacroElectronSampler.to_SRWLPartBeam(light_source.get_electron_beam(), macro_electron)
+
+    mesh = source_wavefront_parameters.to_SRWRadMesh()
+
+    wfr = SRWWavefront()
+    wfr.allocate(mesh.ne, mesh.nx, mesh.ny)
+    wfr.mesh = mesh
+    wfr.partBeam = part_beam
+
+    srwl.CalcElecFieldSR(wfr,
+                         0,
+                         light_source.get_magnetic_structure().get_SRWLMagFldC(),
+                         source_wavefront_parameters._wavefront_precision_parameters.to_SRW_array())
+
+    if compiled_beamline is None: compiled_beamline = SRWCompiledBeamline()
+
+    compiled_beamline.propagate(srw_beamline, wfr)
+
+    return wfr.get_intensity_from_field(polarization_component, dtype=numpy.float64)
+
+def _interpolate_intensity(h, v, intensity, h_array, v_array):
+    if numpy.array_equal(h, h_array) and numpy.array_equal(v, v_array): return intensity
+
+    points = numpy.stack(numpy.meshgrid(h_array, v_array, indexing='ij'), axis=-1)
+
+    interpolated_intensity = numpy.empty((intensity.shape[0], len(h_array), len(v_array)))
+
+    for ie in range(intensity.shape[0]):
+        interpolated_intensity[ie] = RegularGridInterpolator((h, v), intensity[ie], bounds_error=False, fill_value=0.0)(points)
+
+    return interpolated_intensity
@@ -0,0 +1,27 @@
+from syned.beamline.beamline_element import BeamlineElement
+from syned.beamline.element_coordinates import ElementCoordinates
+from syned.beamline.shape import Rectangle
+
+from wofrysrw.beamline.srw_beamline import SRWBeamline, Where
+from wofrysrw.beamline.optical_elements.absorbers.srw_aperture import SRWAperture
+from wofrysrw.propagator.wavefront2D.srw_wavefront import WavefrontPropagationParameters
+
+def get_srw_beamline(gaps=(1.6e-3, 1.2e-3, 0.8e-3), distance=1.0, light_source=None):
+    """
+    Beamline of square apertures, each one followed by a drift, for tests
+    :param gaps: size of each aperture [m]
+    :param distance: drift after each aperture [m]
+    :param light_source: SRWLightSource of the beamline (default SRWLightSource if None)
+    """
+    if light_source is None: srw_beamline = SRWBeamline(beamline_elements_list=[])
+    else: srw_beamline = SRWBeamline(light_source=light_source, beamline_elements_list=[])
+
+    for index, gap in enumerate(gaps):
+        srw_beamline.append_beamline_element(BeamlineElement(optical_element=SRWAperture(name="Aperture " + str(index),
+                                                                                         boundary_shape=Rectangle(-0.5*gap, 0.5*gap, -0.5*gap, 0.5*gap)),
+                                                             coordinates=ElementCoordinates(p=0.0, q=distance)))
+
+        for where in Where.tuple():
+            srw_beamline.append_wavefront_propagation_parameters(WavefrontPropagationParameters(), None, where)
+
+    return srw_beamline
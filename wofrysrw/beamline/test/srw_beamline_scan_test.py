@@ -0,0 +1,87 @@
+import unittest
+from unittest import mock
+
+import numpy
+
+from srwlib import srwl, SRWLOptC, SRWLOptD
+
+from wofrysrw.beamline import srw_beamline_scan
+from wofrysrw.beamline.srw_beamline_scan import SRWBeamlineScan, SRWBeamlineScanParameter
+from wofrysrw.propagator.propagators2D.srw_fresnel_native import SRWCompiledBeamline
+from wofrysrw.propagator.test.srw_wavefront_fixtures import get_srw_wavefront
+from wofrysrw.beamline.test.srw_beamline_fixtures import get_srw_beamline
+
+def _field(srw_wavefront):
+    return numpy.array(numpy.frombuffer(srw_wavefront.arEx, dtype=numpy.float32))
+
+class SRWBeamlineScanTest(unittest.TestCase):
+
+    def setUp(self):
+        self.srw_beamline = get_srw_beamline()
+        self.wavefront = get_srw_wavefront(nx=16, ny=12)
+        self.scan_parameter = SRWBeamlineScanParameter(1, "coordinates.q", display_name="Distance", unit="m")
+        self.values = [1.0, 2.0, 1.0, 0.5]
+
+    def __run(self, number_of_processes=1):
+        scan = SRWBeamlineScan(self.srw_beamline, self.scan_parameter, self.values, number_of_processes=number_of_processes)
+
+        return sorted(scan.run(self.wavefront), key=lambda wavefront: wavefront.scanned_variable_data.get_scanned_variable_value())
+
+    def __reference_field(self, value):
+        wavefront = self.wavefront.duplicate()
+        SRWCompiledBeamline().propagate(self.scan_parameter.get_scanned_beamline(self.srw_beamline, value), wavefront)
+
+        return _field(wavefront)
+
+    def test_scanned_beamline(self):
+        scanned_beamline = self.scan_parameter.get_scanned_beamline(self.srw_beamline, 2.0)
+
+        self.assertEqual(scanned_beamline.get_beamline_element_at(1).get_coordinates().q(), 2.0)
+        self.assertEqual(self.srw_beamline.get_beamline_element_at(1).get_coordinates().q(), 1.0) # not modified
+        self.assertEqual(scanned_beamline.get_element_fingerprint(0), self.srw_beamline.get_element_fingerprint(0))
+        self.assertNotEqual(scanned_beamline.get_element_fingerprint(1), self.srw_beamline.get_element_fingerprint(1))
+
+        self.assertRaises(ValueError, SRWBeamlineScanParameter(1, "coordinates.missing").get_scanned_beamline, self.srw_beamline, 2.0)
+        self.assertRaises(IndexError, SRWBeamlineScanParameter(5, "coordinates.q").get_scanned_beamline, self.srw_beamline, 2.0)
+
+    def test_results_match_per_value_propagation(self):
+        original_field = _field(self.wavefront)
+
+        scanned_wavefronts = self.__run()
+
+        self.assertEqual([wavefront.scanned_variable_data.get_scanned_variable_value() for wavefront in scanned_wavefronts], sorted(self.values))
+        for wavefront in scanned_wavefronts:
+            self.assertEqual(wavefront.scanned_variable_data.get_scanned_variable_display_name(), "Distance")
+            numpy.testing.assert_array_equal(_field(wavefront), self.__reference_field(wavefront.scanned_variable_data.get_scanned_variable_value()))
+
+        numpy.testing.assert_array_equal(_field(self.wavefront), original_field) # input left unchanged
+
+    def test_identical_beamlines_are_propagated_once(self):
+        with mock.patch.object(srw_beamline_scan, "_propagate_suffix", wraps=srw_beamline_scan._propagate_suffix) as propagate_suffix:
+            scanned_wavefronts = self.__run()
+
+        self.assertEqual(len(scanned_wavefronts), 4)
+        self.assertEqual(propagate_suffix.call_count, 3) # 1.0 is scanned twice
+
+        for suffix_beamline in [call.args[0] for call in propagate_suffix.call_args_list]:
+            self.assertEqual(suffix_beamline.get_beamline_elements_number(), 2) # the first element is the common prefix
+
+    def test_grouped_results_are_independent(self):
+        scanned_wavefronts = [wavefront for wavefront in self.__run() if wavefront.scanned_variable_data.get_scanned_variable_value() == 1.0]
+        reference_field = self.__reference_field(1.0)
+
+        self.assertEqual(len(scanned_wavefronts), 2)
+        self.assertIsNot(scanned_wavefronts[0].arEx, scanned_wavefronts[1].arEx)
+        self.assertFalse(any([wavefront.has_shared_buffers() for wavefront in scanned_wavefronts]))
+
+        # direct SRW calls ignore the copy-on-write counter
+        srwl.PropagElecField(scanned_wavefronts[0], SRWLOptC([SRWLOptD(0.5)], [[0, 0, 1.0, 0, 0, 1.0, 1.0, 1.0, 1.0, 0, 0, 0]]))
+
+        numpy.testing.assert_array_equal(_field(scanned_wavefronts[1]), reference_field)
+
+    def test_process_pool(self):
+        for wavefront, serial_wavefront in zip(self.__run(number_of_processes=2), self.__run()):
+            numpy.testing.assert_array_equal(_field(wavefront), _field(serial_wavefront))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import pickle
+import tempfile
+import unittest
+import numpy
+
+from wofrysrw.beamline.optical_elements.gratings.srw_plain_grating import SRWPlaneGrating
+from wofrysrw.beamline.optical_elements.srw_height_profile import height_errors_transmission_cache, clear_height_profile_caches
+
+class _Wavefront(object):
+    def __init__(self, photon_energy):
+        self.__photon_energy = photon_energy
+
+    def get_photon_energy(self):
+        return self.__photon_energy
+
+class SRWGratingHeightErrorsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.height_profile_data_file = os.path.join(self.directory.name, "grating.npy")
+
+        positions = numpy.linspace(-0.1, 0.1, 101)
+        numpy.save(self.height_profile_data_file, numpy.array([positions, 1e-9*numpy.sin(50*positions)]).T)
+
+        clear_height_profile_caches()
+
+    def tearDown(self):
+        clear_height_profile_caches()
+        self.directory.cleanup()
+
+    def __grating(self):
+        return SRWPlaneGrating(tangential_size=0.2, grazing_angle=0.02, height_profile_data_file=self.height_profile_data_file)
+
+    def test_elements_are_shared_per_quantized_photon_energy(self):
+        grating_1 = self.__grating()
+        grating_2 = self.__grating()
+
+        grating_1.set_photon_energy_quantum(1.0)
+        grating_2.set_photon_energy_quantum(1.0)
+
+        element = grating_1.get_optTrEr(_Wavefront(500.2))
+
+        self.assertIs(grating_1.get_optTrEr(_Wavefront(499.9)), element)
+        self.assertIs(grating_2.get_optTrEr(_Wavefront(500.1)), element) # one process-wide copy
+        self.assertIsNot(grating_1.get_optTrEr(_Wavefront(501.0)), element)
+        self.assertEqual(len(height_errors_transmission_cache), 2)
+
+    def test_grating_does_not_hold_elements(self):
+        grating = self.__grating()
+        grating.get_optTrEr(_Wavefront(500.0))
+
+        self.assertFalse(any(["cache" in name for name in vars(grating)]))
+
+        grating = pickle.loads(pickle.dumps(grating))
+
+        self.assertIs(grating.get_optTrEr(_Wavefront(500.0)), self.__grating().get_optTrEr(_Wavefront(500.0)))
+
+    def test_python_code_uses_quantized_deflection_angle(self):
+        grating = self.__grating()
+        grating.set_photon_energy_quantum(1.0)
+
+        quantized_deflection_angle = grating.get_height_errors_deflection_angle(500.3)
+
+        self.assertEqual(quantized_deflection_angle, grating.get_deflection_angle(500.0))
+        self.assertNotEqual(quantized_deflection_angle, grating.get_deflection_angle(500.3))
+
+        text_code = grating.to_python_code(["oe_0", _Wavefront(500.3)])
+
+        self.assertIn("_ang_r=" + str(quantized_deflection_angle) + ",", text_code)
+
+if __name__ == "__main__":
+    unittest.main()
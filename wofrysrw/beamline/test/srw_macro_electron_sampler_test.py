@@ -0,0 +1,97 @@
+import unittest
+import numpy
+
+from wofrysrw.storage_ring.srw_electron_beam import SRWElectronBeam
+from wofrysrw.beamline.srw_multi_electron import MacroElectronSampler, SamplingMode
+
+SAMPLING_MODES = ((SamplingMode.PSEUDO_RANDOM, False),
+                  (SamplingMode.PSEUDO_RANDOM, True),
+                  (SamplingMode.SOBOL, False),
+                  (SamplingMode.SOBOL, True),
+                  (SamplingMode.HALTON, False),
+                  (SamplingMode.HALTON, True))
+
+class MacroElectronSamplerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.electron_beam = SRWElectronBeam(energy_in_GeV=6.0,
+                                             energy_spread=1e-3,
+                                             moment_x=1e-6,
+                                             moment_xp=-2e-7,
+                                             moment_xx=(30e-6)**2,
+                                             moment_xxp=-0.5*(30e-6)*(4e-6),
+                                             moment_xpxp=(4e-6)**2,
+                                             moment_yy=(5e-6)**2,
+                                             moment_yyp=0.0,
+                                             moment_ypyp=(2e-6)**2)
+
+    def test_moments(self):
+        for sampling_mode, antithetic in SAMPLING_MODES:
+            macro_electrons = MacroElectronSampler(self.electron_beam, seed=7, sampling_mode=sampling_mode, antithetic=antithetic).sample(2**14)
+
+            deviation = macro_electrons[:, :4].mean(axis=0) - [self.electron_beam._moment_x, self.electron_beam._moment_xp, 0.0, 0.0]
+
+            self.assertTrue(numpy.all(numpy.abs(deviation) <= [1.2e-6, 1.6e-7, 2e-7, 8e-8])) # 5 standard errors
+            self.assertAlmostEqual(macro_electrons[:, 4].mean()/self.electron_beam.gamma(), 1.0, places=4)
+
+            covariance = numpy.cov(macro_electrons.T)
+            expected = numpy.array([[self.electron_beam._moment_xx, self.electron_beam._moment_xxp],
+                                    [self.electron_beam._moment_xxp, self.electron_beam._moment_xpxp]])
+
+            numpy.testing.assert_allclose(covariance[:2, :2], expected, rtol=0.05, atol=0.05*numpy.sqrt(expected[0, 0]*expected[1, 1]))
+            numpy.testing.assert_allclose(numpy.diag(covariance)[2:4], [self.electron_beam._moment_yy, self.electron_beam._moment_ypyp], rtol=0.05)
+            self.assertAlmostEqual(numpy.sqrt(covariance[4, 4])/self.electron_beam.gamma(), self.electron_beam._energy_spread, delta=5e-5)
+
+    def test_antithetic_pairs(self):
+        sampler = MacroElectronSampler(self.electron_beam, seed=7, antithetic=True)
+
+        deviates = numpy.concatenate([sampler.get_normal_deviates(n) for n in (3, 4, 1, 6)])
+
+        numpy.testing.assert_array_equal(deviates[0::2], -deviates[1::2])
+
+    def test_chunked_sampling_equals_one_shot(self):
+        for sampling_mode, antithetic in SAMPLING_MODES:
+            one_shot = MacroElectronSampler(self.electron_beam, seed=11, sampling_mode=sampling_mode, antithetic=antithetic).sample(20)
+
+            sampler = MacroElectronSampler(self.electron_beam, seed=11, sampling_mode=sampling_mode, antithetic=antithetic)
+            chunked = numpy.concatenate([sampler.sample(n) for n in (1, 3, 0, 7, 9)])
+
+            numpy.testing.assert_array_equal(chunked, one_shot)
+
+    def test_deterministic_seeding(self):
+        for sampling_mode, antithetic in SAMPLING_MODES:
+            numpy.testing.assert_array_equal(MacroElectronSampler(self.electron_beam, seed=5, sampling_mode=sampling_mode, antithetic=antithetic).sample(10),
+                                             MacroElectronSampler(self.electron_beam, seed=5, sampling_mode=sampling_mode, antithetic=antithetic).sample(10))
+
+    def test_state_round_trip(self):
+        for sampling_mode, antithetic in SAMPLING_MODES:
+            sampler = MacroElectronSampler(self.electron_beam, seed=13, sampling_mode=sampling_mode, antithetic=antithetic)
+            sampler.sample(7)
+
+            state = sampler.get_state()
+            expected = sampler.sample(9)
+
+            restored = MacroElectronSampler(self.electron_beam, seed=13, sampling_mode=sampling_mode, antithetic=antithetic)
+            restored.set_state(state)
+
+            numpy.testing.assert_array_equal(restored.sample(9), expected)
+
+        self.assertRaises(ValueError, MacroElectronSampler(self.electron_beam, seed=13, sampling_mode=SamplingMode.SOBOL).set_state, state)
+
+    def test_independent_samples(self):
+        for sampling_mode, antithetic in SAMPLING_MODES:
+            sampler = MacroElectronSampler(self.electron_beam, sampling_mode=sampling_mode, antithetic=antithetic)
+
+            self.assertEqual(sampler.has_independent_samples(), sampling_mode == SamplingMode.PSEUDO_RANDOM and not antithetic)
+
+    def test_to_SRWLPartBeam(self):
+        macro_electron = MacroElectronSampler(self.electron_beam, seed=1).sample(1)[0]
+
+        part_beam = MacroElectronSampler.to_SRWLPartBeam(self.electron_beam, macro_electron)
+
+        self.assertEqual(part_beam.partStatMom1.x, macro_electron[0])
+        self.assertEqual(part_beam.partStatMom1.yp, macro_electron[3])
+        self.assertEqual(part_beam.partStatMom1.gamma, macro_electron[4])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+
+from srwlib import SRWLRadMesh
+
+from wofrysrw.beamline.srw_beamline import Where
+from wofrysrw.beamline.srw_memory_planner import SRWMemoryPlanner, OverBudgetAction
+from wofrysrw.propagator.wavefront2D.srw_wavefront import WavefrontPropagationParameters
+from wofrysrw.beamline.test.srw_beamline_fixtures import get_srw_beamline
+
+def _is_fft_size(size):
+    if size % 2 != 0: return False
+
+    for factor in (2, 3, 5):
+        while size % factor == 0: size //= factor
+
+    return size == 1
+
+class SRWMemoryPlannerTest(unittest.TestCase):
+
+    def setUp(self):
+        # element 1 doubles the horizontal range and increases the vertical resolution by 1.5
+        self.srw_beamline = get_srw_beamline()
+        self.resizing_parameters = WavefrontPropagationParameters(horizontal_range_modification_factor_at_resizing=2.0,
+                                                                  vertical_resolution_modification_factor_at_resizing=1.5)
+        self.srw_beamline.get_wavefront_propagation_parameters(Where.OE)[1][0] = self.resizing_parameters
+
+        self.mesh = SRWLRadMesh(8000.0, 8000.0, 1, -1e-3, 1e-3, 100, -2e-3, 2e-3, 50, 10.0)
+
+    def test_fft_size(self):
+        for number_of_points in range(1, 2000):
+            size = SRWMemoryPlanner.get_fft_size(number_of_points)
+
+            self.assertGreaterEqual(size, number_of_points)
+            self.assertTrue(_is_fft_size(size))
+            self.assertFalse(any([_is_fft_size(smaller_size) for smaller_size in range(number_of_points, size)]))
+
+        self.assertEqual(SRWMemoryPlanner.get_fft_size(75), 80)
+        self.assertEqual(SRWMemoryPlanner.get_fft_size(200), 200)
+        self.assertEqual(SRWMemoryPlanner.get_fft_size(200.4), 216)
+
+    def test_steps(self):
+        plan = SRWMemoryPlanner(10**9, OverBudgetAction.REPORT).plan(self.srw_beamline, self.mesh)
+        steps = plan.get_steps()
+
+        field_100x50 = 16*100*50
+        field_200x80 = 16*200*80
+
+        # per element: optical element (no FFT), then drift after (FFT); no drift before (p = 0)
+        self.assertEqual([(step.get_index(), step.get_where()) for step in steps],
+                         [(index, where) for index in range(3) for where in (Where.OE, Where.DRIFT_AFTER)])
+        self.assertEqual([step.get_dimension() for step in steps], [(100, 50)]*2 + [(200, 80)]*4)
+        self.assertEqual([step.get_field_memory() for step in steps], [field_100x50]*2 + [field_200x80]*4)
+        self.assertEqual([step.get_fft_memory() for step in steps], [0, field_100x50, 0, field_200x80, 0, field_200x80])
+        self.assertEqual([step.get_peak_memory() for step in steps],
+                         [field_100x50, 2*field_100x50, field_100x50 + field_200x80, 2*field_200x80, field_200x80, 2*field_200x80])
+
+        self.assertAlmostEqual(steps[2].get_ranges()[0], 4e-3)
+        self.assertAlmostEqual(steps[2].get_ranges()[1], 4e-3)
+        self.assertFalse(any([step.is_auto_resize() for step in steps]))
+
+        self.assertEqual(plan.get_peak_memory(), 2*field_200x80)
+        self.assertTrue(plan.is_within_budget())
+        self.assertFalse(plan.is_downscaled())
+        self.assertIs(plan.get_srw_beamline(), self.srw_beamline)
+
+    def test_multiple_energies(self):
+        self.mesh.ne = 10
+
+        steps = SRWMemoryPlanner(10**9, OverBudgetAction.REPORT).plan(self.srw_beamline, self.mesh).get_steps()
+
+        self.assertEqual(steps[1].get_field_memory(), 10*16*100*50)
+        self.assertEqual(steps[1].get_fft_memory(), 16*100*50) # one photon energy at a time
+
+    def test_report(self):
+        plan = SRWMemoryPlanner(400000, OverBudgetAction.REPORT).plan(self.srw_beamline, self.mesh)
+
+        self.assertFalse(plan.is_within_budget())
+        self.assertFalse(plan.is_downscaled())
+        self.assertIn("Element 1 (after)", plan.to_info())
+
+    def test_refuse(self):
+        with self.assertRaisesRegex(ValueError, "Element 1 \\(after\\)"):
+            SRWMemoryPlanner(400000, OverBudgetAction.REFUSE).plan(self.srw_beamline, self.mesh)
+
+        with self.assertRaisesRegex(ValueError, "Initial wavefront"):
+            SRWMemoryPlanner(1000, OverBudgetAction.REFUSE).plan(self.srw_beamline, self.mesh)
+
+        self.assertRaises(ValueError, SRWMemoryPlanner, 0)
+        self.assertRaises(ValueError, SRWMemoryPlanner, 400000, 5)
+
+    def test_downscale(self):
+        original_parameters = [[list(element) for element in self.srw_beamline.get_wavefront_propagation_parameters(where)] for where in Where.tuple()]
+
+        plan = SRWMemoryPlanner(400000, OverBudgetAction.DOWNSCALE).plan(self.srw_beamline, self.mesh)
+
+        self.assertTrue(plan.is_within_budget())
+        self.assertTrue(plan.is_downscaled())
+
+        planned_beamline = plan.get_srw_beamline()
+        self.assertIsNot(planned_beamline, self.srw_beamline)
+
+        downscaled_steps = [step for step in plan.get_steps() if step.get_resolution_scaling_factor() < 1.0]
+        self.assertTrue(len(downscaled_steps) > 0)
+
+        for step in downscaled_steps:
+            downscaled_parameters = planned_beamline.get_wavefront_propagation_parameters_at(step.get_index(), step.get_where())[0]
+            original_parameter = self.srw_beamline.get_wavefront_propagation_parameters_at(step.get_index(), step.get_where())[0]
+
+            self.assertAlmostEqual(downscaled_parameters._horizontal_resolution_modification_factor_at_resizing,
+                                   original_parameter._horizontal_resolution_modification_factor_at_resizing*step.get_resolution_scaling_factor())
+
+        # the caller's beamline is not modified
+        self.assertEqual([[list(element) for element in self.srw_beamline.get_wavefront_propagation_parameters(where)] for where in Where.tuple()], original_parameters)
+        for element in self.srw_beamline.get_wavefront_propagation_parameters(Where.DRIFT_AFTER):
+            self.assertEqual(element[0]._horizontal_resolution_modification_factor_at_resizing, 1.0)
+        self.assertEqual(self.resizing_parameters._vertical_resolution_modification_factor_at_resizing, 1.5)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+import numpy
+
+from wofrysrw.propagator.wavefront2D.srw_wavefront import WavefrontParameters
+from wofrysrw.storage_ring.srw_electron_beam import SRWElectronBeam
+from wofrysrw.storage_ring.magnetic_structures.srw_undulator import SRWUndulator
+from wofrysrw.storage_ring.light_sources.srw_undulator_light_source import SRWUndulatorLightSource
+from wofrysrw.beamline.srw_multi_electron import MultiElectronIntensityAccumulator, MultiElectronParameters, MacroElectronSampler, SamplingMode, SRWMultiElectronCalculator
+from wofrysrw.beamline.test.srw_beamline_fixtures import get_srw_beamline
+
+class MultiElectronIntensityAccumulatorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.intensities = numpy.random.default_rng(0).random((37, 2, 5, 4))*1e12
+
+    def __accumulate(self, batch_sizes):
+        accumulator = MultiElectronIntensityAccumulator()
+
+        start = 0
+        for batch_size in batch_sizes:
+            batch = self.intensities[start:start + batch_size]
+            if batch_size > 0: accumulator.add_batch(batch_size, batch.mean(axis=0), ((batch - batch.mean(axis=0))**2).sum(axis=0))
+            else: accumulator.add_batch(0, None, None)
+            start += batch_size
+
+        return accumulator
+
+    def test_batches_match_one_shot_statistics(self):
+        for batch_sizes in ([37], [1]*37, [1, 10, 0, 7, 19]):
+            accumulator = self.__accumulate(batch_sizes)
+
+            self.assertEqual(accumulator.get_count(), 37)
+            numpy.testing.assert_allclose(accumulator.get_mean(), self.intensities.mean(axis=0), rtol=1e-12)
+            numpy.testing.assert_allclose(accumulator.get_variance(), self.intensities.var(axis=0, ddof=1), rtol=1e-9)
+            numpy.testing.assert_allclose(accumulator.get_standard_error(), numpy.sqrt(self.intensities.var(axis=0, ddof=1)/37), rtol=1e-9)
+
+    def test_relative_standard_error(self):
+        accumulator = self.__accumulate([37])
+        mean = self.intensities.mean(axis=0)
+
+        self.assertAlmostEqual(accumulator.get_relative_standard_error(),
+                               numpy.sqrt(self.intensities.var(axis=0, ddof=1).sum()/37)/numpy.sqrt((mean**2).sum()))
+
+        self.assertEqual(self.__accumulate([1]).get_relative_standard_error(), numpy.inf)
+
+    def test_dictionary_round_trip(self):
+        accumulator = MultiElectronIntensityAccumulator.from_dictionary(self.__accumulate([20]).to_dictionary())
+        accumulator.add_batch(17, self.intensities[20:].mean(axis=0), ((self.intensities[20:] - self.intensities[20:].mean(axis=0))**2).sum(axis=0))
+
+        numpy.testing.assert_allclose(accumulator.get_mean(), self.intensities.mean(axis=0), rtol=1e-12)
+        numpy.testing.assert_allclose(accumulator.get_variance(), self.intensities.var(axis=0, ddof=1), rtol=1e-9)
+
+class ConvergenceCriterionTest(unittest.TestCase):
+
+    def test_convergence_requires_independent_samples(self):
+        electron_beam = SRWElectronBeam(energy_in_GeV=6.0, energy_spread=1e-3, moment_xx=1e-10, moment_xpxp=1e-12, moment_yy=1e-12, moment_ypyp=1e-12)
+
+        for sampling_mode, antithetic in ((SamplingMode.SOBOL, False), (SamplingMode.HALTON, False), (SamplingMode.PSEUDO_RANDOM, True)):
+            sampler = MacroElectronSampler(electron_beam, seed=1, sampling_mode=sampling_mode, antithetic=antithetic)
+
+            self.assertRaises(ValueError, SRWMultiElectronCalculator, None, None, MultiElectronParameters(convergence_tolerance=0.01), sampler)
+
+            calculator = SRWMultiElectronCalculator(None, None, MultiElectronParameters(), sampler)
+            calculator._mesh_arrays = (None, None, None)
+            calculator.get_accumulator().add_batch(2, numpy.ones((1, 2, 2)), numpy.ones((1, 2, 2)))
+
+            self.assertRaises(ValueError, calculator.get_standard_error)
+
+        calculator = SRWMultiElectronCalculator(None, None, MultiElectronParameters(convergence_tolerance=0.01),
+                                                MacroElectronSampler(electron_beam, seed=1))
+
+        self.assertFalse(calculator.is_converged())
+
+    def test_checkpoint_round_trip(self):
+        electron_beam = SRWElectronBeam(energy_in_GeV=6.0, energy_spread=1e-3, moment_xx=1e-10, moment_xpxp=1e-12, moment_yy=1e-12, moment_ypyp=1e-12)
+        srw_beamline = get_srw_beamline(light_source=SRWUndulatorLightSource("U", electron_beam, SRWUndulator(K_vertical=1.5, period_length=0.02, number_of_periods=75)))
+        source_wavefront_parameters = WavefrontParameters()
+
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint_file = os.path.join(directory, "checkpoint.pkl")
+
+            calculator = SRWMultiElectronCalculator(srw_beamline, source_wavefront_parameters, MultiElectronParameters(seed=3), MacroElectronSampler(electron_beam, seed=3))
+            calculator._mesh_arrays = (numpy.zeros(1), numpy.zeros(2), numpy.zeros(2))
+            calculator.get_accumulator().add_batch(2, numpy.ones((1, 2, 2)), numpy.ones((1, 2, 2)))
+            calculator._sampler.sample(7)
+            calculator.save_checkpoint(checkpoint_file)
+
+            expected = calculator._sampler.sample(5)
+
+            resumed = SRWMultiElectronCalculator(srw_beamline, source_wavefront_parameters, MultiElectronParameters(seed=3, checkpoint_file=checkpoint_file), MacroElectronSampler(electron_beam, seed=3))
+
+            self.assertEqual(resumed.get_number_of_macro_electrons(), 2)
+            numpy.testing.assert_array_equal(resumed._sampler.sample(5), expected)
+
+if __name__ == "__main__":
+    unittest.main()
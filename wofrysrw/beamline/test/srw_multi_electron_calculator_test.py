@@ -0,0 +1,135 @@
+import os
+import tempfile
+import unittest
+import numpy
+
+from wofrysrw.propagator.wavefront2D.srw_wavefront import WavefrontParameters, PolarizationComponent
+from wofrysrw.storage_ring.srw_electron_beam import SRWElectronBeam
+from wofrysrw.storage_ring.magnetic_structures.srw_undulator import SRWUndulator
+from wofrysrw.storage_ring.light_sources.srw_undulator_light_source import SRWUndulatorLightSource
+from wofrysrw.beamline.srw_multi_electron import SRWMultiElectronCalculator, MultiElectronParameters, MacroElectronSampler, \
+    _calculate_macro_electron_intensity, _interpolate_intensity
+from wofrysrw.beamline.test.srw_beamline_fixtures import get_srw_beamline
+
+def _light_source():
+    return SRWUndulatorLightSource("U",
+                                   SRWElectronBeam(energy_in_GeV=2.0, current=0.4, energy_spread=1e-3,
+                                                   moment_xx=(50e-6)**2, moment_xpxp=(5e-6)**2, moment_yy=(5e-6)**2, moment_ypyp=(2e-6)**2),
+                                   SRWUndulator(K_vertical=1.5, period_length=0.02, number_of_periods=75))
+
+class SRWMultiElectronCalculatorTest(unittest.TestCase):
+
+    def setUp(self):
+        light_source = _light_source()
+
+        self.srw_beamline = get_srw_beamline(light_source=light_source)
+        self.source_wavefront_parameters = WavefrontParameters(photon_energy_min=light_source.get_resonance_energy(),
+                                                               photon_energy_max=light_source.get_resonance_energy(),
+                                                               photon_energy_points=1,
+                                                               h_slit_gap=0.002, h_slit_points=24,
+                                                               v_slit_gap=0.002, v_slit_points=16,
+                                                               distance=10.0)
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.checkpoint_file = os.path.join(self.directory.name, "checkpoint.pkl")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def __parameters(self, checkpoint_file=None, seed=0):
+        return MultiElectronParameters(number_of_macro_electrons=7,
+                                       macro_electrons_per_task=2,
+                                       number_of_processes=1,
+                                       seed=seed,
+                                       checkpoint_file=checkpoint_file,
+                                       checkpoint_period=100)
+
+    def __reference_intensities(self, number_of_macro_electrons, macro_electrons_per_task=2):
+        # same sequence of macro-electrons as the calculator: the first one alone, then one task at a time
+        sampler = MacroElectronSampler(self.srw_beamline.get_light_source().get_electron_beam(), seed=0)
+
+        macro_electrons = [sampler.sample(1)[0]]
+        while len(macro_electrons) < number_of_macro_electrons:
+            macro_electrons.extend(sampler.sample(min(macro_electrons_per_task, number_of_macro_electrons - len(macro_electrons))))
+
+        intensities = []
+        for macro_electron in macro_electrons:
+            e, h, v, intensity = _calculate_macro_electron_intensity(self.srw_beamline, self.source_wavefront_parameters, macro_electron, PolarizationComponent.TOTAL)
+            if len(intensities) == 0: mesh_arrays = (e, h, v)
+            intensities.append(_interpolate_intensity(h, v, intensity, mesh_arrays[1], mesh_arrays[2]))
+
+        return mesh_arrays, numpy.array(intensities)
+
+    def test_run(self):
+        calculator = SRWMultiElectronCalculator(self.srw_beamline, self.source_wavefront_parameters, self.__parameters())
+
+        progress = []
+        e, h, v, intensity = calculator.run(progress_callback=lambda calculator: progress.append(calculator.get_number_of_macro_electrons()))
+
+        mesh_arrays, reference_intensities = self.__reference_intensities(7)
+
+        self.assertEqual(calculator.get_number_of_macro_electrons(), 7)
+        self.assertEqual(progress, [1, 3, 5, 7])
+        numpy.testing.assert_array_equal(h, mesh_arrays[1])
+        numpy.testing.assert_array_equal(v, mesh_arrays[2])
+        self.assertEqual(intensity.shape, (1, len(h), len(v)))
+        self.assertGreater(intensity.max(), 0.0)
+        numpy.testing.assert_allclose(intensity, reference_intensities.mean(axis=0), rtol=1e-10, atol=1e-10*intensity.max())
+        numpy.testing.assert_allclose(calculator.get_standard_error()[3]**2*7, reference_intensities.var(axis=0, ddof=1),
+                                      rtol=1e-8, atol=1e-8*intensity.max()**2)
+
+    def test_interpolate_intensity(self):
+        h = numpy.linspace(-1.0, 1.0, 5)
+        v = numpy.linspace(-2.0, 2.0, 9)
+        intensity = (3.0 + h[:, numpy.newaxis] + 2*v[numpy.newaxis, :])[numpy.newaxis, :, :]
+
+        self.assertIs(_interpolate_intensity(h, v, intensity, h, v), intensity)
+
+        h_array = numpy.linspace(-1.5, 0.5, 9)
+        v_array = numpy.linspace(-1.0, 1.0, 3)
+
+        interpolated_intensity = _interpolate_intensity(h, v, intensity, h_array, v_array)
+
+        self.assertEqual(interpolated_intensity.shape, (1, 9, 3))
+        inside = h_array >= -1.0
+        numpy.testing.assert_allclose(interpolated_intensity[0, inside], 3.0 + h_array[inside, numpy.newaxis] + 2*v_array[numpy.newaxis, :])
+        numpy.testing.assert_array_equal(interpolated_intensity[0, ~inside], 0.0) # outside the calculated mesh
+
+    def test_resume_from_checkpoint(self):
+        calculator = SRWMultiElectronCalculator(self.srw_beamline, self.source_wavefront_parameters, self.__parameters(self.checkpoint_file))
+        calculator.run(number_of_macro_electrons=3)
+
+        self.assertTrue(os.path.exists(self.checkpoint_file))
+
+        resumed_calculator = SRWMultiElectronCalculator(self.srw_beamline, self.source_wavefront_parameters, self.__parameters(self.checkpoint_file))
+
+        self.assertEqual(resumed_calculator.get_number_of_macro_electrons(), 3)
+
+        _, _, _, intensity = resumed_calculator.run()
+
+        _, reference_intensities = self.__reference_intensities(7)
+
+        self.assertEqual(resumed_calculator.get_number_of_macro_electrons(), 7)
+        numpy.testing.assert_allclose(intensity, reference_intensities.mean(axis=0), rtol=1e-10, atol=1e-10*intensity.max())
+
+    def test_checkpoint_of_different_calculation_is_rejected(self):
+        SRWMultiElectronCalculator(self.srw_beamline, self.source_wavefront_parameters, self.__parameters(self.checkpoint_file)).run(number_of_macro_electrons=1)
+
+        other_beamline = get_srw_beamline(gaps=(1.6e-3, 1.0e-3, 0.8e-3), light_source=self.srw_beamline.get_light_source())
+        self.assertRaises(ValueError, SRWMultiElectronCalculator, other_beamline, self.source_wavefront_parameters, self.__parameters(self.checkpoint_file))
+
+        self.source_wavefront_parameters._h_slit_points = 20
+        self.assertRaises(ValueError, SRWMultiElectronCalculator, self.srw_beamline, self.source_wavefront_parameters, self.__parameters(self.checkpoint_file))
+        self.source_wavefront_parameters._h_slit_points = 24
+
+        self.assertRaises(ValueError, SRWMultiElectronCalculator, self.srw_beamline, self.source_wavefront_parameters, self.__parameters(self.checkpoint_file, seed=1))
+
+        other_light_source = get_srw_beamline(light_source=_light_source())
+        other_light_source.get_light_source().get_electron_beam()._energy_spread = 2e-3
+        self.assertRaises(ValueError, SRWMultiElectronCalculator, other_light_source, self.source_wavefront_parameters, self.__parameters(self.checkpoint_file))
+
+        # the same calculation is resumed
+        self.assertEqual(SRWMultiElectronCalculator(self.srw_beamline, self.source_wavefront_parameters, self.__parameters(self.checkpoint_file)).get_number_of_macro_electrons(), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import contextlib
+import io
+import unittest
+import numpy
+
+from srwlib import srwl_opt_setup_CRL
+
+from wofrysrw.beamline.optical_elements.srw_refractive_transmission import CRL_to_SRWLOptT
+
+class SRWRefractiveTransmissionTest(unittest.TestCase):
+
+    def __compare(self, plane_of_focusing, shape, radius_of_curvature=50e-6, void_center_coordinates=None):
+        parameters = dict(plane_of_focusing=plane_of_focusing,
+                          refractive_index=4.2e-6,
+                          attenuation_length=7.3e-3,
+                          shape=shape,
+                          horizontal_aperture_size=1e-3,
+                          vertical_aperture_size=0.8e-3,
+                          radius_of_curvature=radius_of_curvature,
+                          number_of_lenses=5,
+                          wall_thickness=30e-6,
+                          horizontal_center_coordinate=1e-5,
+                          vertical_center_coordinate=-2e-5,
+                          void_center_coordinates=void_center_coordinates,
+                          initial_photon_energy=8000.0,
+                          final_photon_energy=8000.0,
+                          horizontal_points=41,
+                          vertical_points=31)
+
+        with contextlib.redirect_stdout(io.StringIO()): # srwl_opt_setup_CRL prints the focal length
+            expected = srwl_opt_setup_CRL(*parameters.values())
+
+        transmission = CRL_to_SRWLOptT(**parameters)
+
+        self.assertEqual(transmission.extTr, expected.extTr)
+        self.assertEqual(transmission.Fx, expected.Fx)
+        self.assertEqual(transmission.Fy, expected.Fy)
+        self.assertEqual((transmission.mesh.nx, transmission.mesh.ny, transmission.mesh.ne), (expected.mesh.nx, expected.mesh.ny, expected.mesh.ne))
+        for attribute in ("xStart", "xFin", "yStart", "yFin", "eStart", "eFin"):
+            self.assertAlmostEqual(getattr(transmission.mesh, attribute), getattr(expected.mesh, attribute), places=15)
+
+        numpy.testing.assert_allclose(numpy.array(transmission.arTr), numpy.array(expected.arTr), rtol=1e-12, atol=1e-18)
+
+    def test_parabolic(self):
+        for plane_of_focusing in (1, 2, 3):
+            with self.subTest(plane_of_focusing=plane_of_focusing):
+                self.__compare(plane_of_focusing, shape=1)
+
+    def test_circular(self):
+        for plane_of_focusing in (1, 2, 3):
+            for radius_of_curvature in (50e-6, 1e-3): # half aperture larger and smaller than the radius
+                with self.subTest(plane_of_focusing=plane_of_focusing, radius_of_curvature=radius_of_curvature):
+                    self.__compare(plane_of_focusing, shape=2, radius_of_curvature=radius_of_curvature)
+
+    def test_voids(self):
+        self.__compare(3, shape=1, void_center_coordinates=[1e-4, 0.0, 2e-5, -5e-5, 1e-4, 1e-5])
+
+if __name__ == "__main__":
+    unittest.main()
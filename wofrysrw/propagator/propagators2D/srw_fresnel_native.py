@@ -1,3 +1,6 @@
+import time
+import hashlib
+import weakref
 import scipy.constants as codata
 angstroms_to_eV = codata.h*codata.c/codata.e*1e10
 
@@ -6,20 +9,234 @@ from wofry.propagator.propagator import PropagationManager, PropagationParameter
 
 from wofrysrw.beamline.srw_beamline import Where
 from wofrysrw.propagator.wavefront2D.srw_wavefront import WavefrontPropagationParameters, WavefrontPropagationOptionalParameters
-from wofrysrw.propagator.wavefront2D.srw_wavefront import SRWWavefront
+from wofrysrw.propagator.wavefront2D.srw_wavefront import SRWWavefront, SRWLazyGenericWavefront2D, PolarizationComponent
 from wofrysrw.propagator.propagators2D.srw_propagation_mode import SRWPropagationMode
+from wofrysrw.srw_cache import SRWLRUCache
 
 from srwlib import *
 
 SRW_APPLICATION = "SRW"
 
+class SRWCompiledBeamline(object):
+    """
+    SRW native optical container built from a SRWBeamline, rebuilt only when the content fingerprint of the beamline
+    (elements, coordinates, propagation parameters and, for the elements depending on it, photon energy) changes
+    """
+    def __init__(self):
+        self.__fingerprint = None
+        self.__optBL = None
+
+    def get_fingerprint(self):
+        return self.__fingerprint
+
+    def is_compiled(self):
+        return not self.__optBL is None
+
+    def invalidate(self):
+        self.__fingerprint = None
+        self.__optBL = None
+
+    def get_SRWLOptC(self, srw_beamline, wavefront):
+        fingerprint = srw_beamline.get_fingerprint(photon_energy=wavefront.get_photon_energy())
+
+        if self.__optBL is None or fingerprint is None or fingerprint != self.__fingerprint:
+            srw_oe_array = []
+            srw_pp_array = []
+
+            propagator = FresnelSRWNative()
+            for index in range(srw_beamline.get_beamline_elements_number()):
+                propagator.add_optical_element_from_beamline(srw_beamline, index, srw_oe_array, srw_pp_array, wavefront)
+
+            self.__optBL = SRWLOptC(srw_oe_array, srw_pp_array)
+            self.__fingerprint = fingerprint
+
+        return self.__optBL
+
+    def propagate(self, srw_beamline, wavefront):
+        optBL = self.get_SRWLOptC(srw_beamline, wavefront)
+
+        if len(optBL.arOpt) > 0:
+            wavefront.detach_buffers()
+
+            srwl.PropagElecField(wavefront, optBL)
+
+        return wavefront
+
+class SRWPropagationStep(object):
+    """
+    Result of the propagation through a single beamline element (drifts included): either the wavefront after
+    the element or, to keep memory bounded, only its intensity (e_array, h_array, v_array, intensity_array)
+    """
+    def __init__(self, index, wavefront=None, intensity=None, setup_time=0.0, propagation_time=0.0):
+        self.__index = index
+        self.__wavefront = wavefront
+        self.__intensity = intensity
+        self.__setup_time = setup_time
+        self.__propagation_time = propagation_time
+
+    def get_index(self):
+        return self.__index
+
+    def get_wavefront(self):
+        return self.__wavefront
+
+    def get_intensity(self):
+        return self.__intensity
+
+    def get_setup_time(self):
+        return self.__setup_time
+
+    def get_propagation_time(self):
+        return self.__propagation_time
+
+class SRWWavefrontMemoization(object):
+    """
+    Wavefronts after each beamline element, keyed on the content of the input wavefront and on the fingerprint of the
+    beamline prefix (elements, coordinates, propagation parameters): propagating a beamline whose upstream elements
+    are unchanged restarts from the last cached wavefront.
+    Wavefronts are kept in memory (independent copies) and, if a SRWWavefrontDiskCache is given, the ones
+    evicted from memory are spilled to disk.
+    """
+    def __init__(self, max_size=8, wavefront_disk_cache=None):
+        """
+        :param max_size: maximum number of wavefronts in memory
+        :param wavefront_disk_cache: optional SRWWavefrontDiskCache
+        """
+        self.__wavefront_disk_cache = wavefront_disk_cache
+        self.__wavefronts = SRWLRUCache(max_size, on_evict=None if wavefront_disk_cache is None else self.__spill)
+
+    def get_max_size(self):
+        return self.__wavefronts.get_max_size()
+
+    def get_wavefront_disk_cache(self):
+        return self.__wavefront_disk_cache
+
+    def get_statistics(self):
+        return self.__wavefronts.get_statistics()
+
+    def clear(self):
+        self.__wavefronts.clear()
+
+    @classmethod
+    def get_wavefront_fingerprint(cls, wavefront):
+        fingerprint = hashlib.sha1()
+
+        fingerprint.update(repr(sorted([(name, value) for name, value in vars(wavefront.mesh).items()
+                                        if not name.startswith("_") and not name == "arSurf"])).encode())
+        fingerprint.update(repr([wavefront.numTypeElFld, wavefront.Rx, wavefront.Ry, wavefront.dRx, wavefront.dRy,
+                                 wavefront.xc, wavefront.yc, wavefront.presCA, wavefront.presFT]).encode())
+        fingerprint.update(memoryview(wavefront.arEx))
+        fingerprint.update(memoryview(wavefront.arEy))
+
+        return fingerprint.hexdigest()
+
+    def get_prefix_keys(self, srw_beamline, wavefront):
+        """
+        :return: list of keys of the wavefronts after each beamline element (None for the elements following an
+                 element whose content cannot be hashed)
+        """
+        wavefront_fingerprint = self.get_wavefront_fingerprint(wavefront)
+        photon_energy = wavefront.get_photon_energy()
+
+        keys = []
+        key = hashlib.sha1(wavefront_fingerprint.encode())
+
+        for index in range(srw_beamline.get_beamline_elements_number()):
+            element_fingerprint = srw_beamline.get_element_fingerprint(index, photon_energy)
+
+            if element_fingerprint is None:
+                keys.extend([None]*(srw_beamline.get_beamline_elements_number() - index))
+                break
+
+            key.update(element_fingerprint.encode())
+            keys.append(key.hexdigest())
+
+        return keys
+
+    def get_wavefront(self, key):
+        """
+        :return: an independent copy of the cached wavefront, or None
+        """
+        if key is None: return None
+
+        wavefront = self.__wavefronts.get(key)
+
+        if wavefront is None and not self.__wavefront_disk_cache is None:
+            wavefront = self.__wavefront_disk_cache.get_wavefront(key)
+
+            if not wavefront is None: self.__wavefronts.put(key, wavefront)
+
+        return None if wavefront is None else wavefront.duplicate()
+
+    def put_wavefront(self, key, wavefront):
+        if not key is None: self.__wavefronts.put(key, wavefront.duplicate())
+
+    def propagate(self, srw_beamline, wavefront, propagator=None):
+        """
+        Propagates the wavefront through the beamline, computing only the elements downstream of the longest cached prefix
+        :return: the propagated wavefront (a new object not sharing buffers with the cache, unless no element is present)
+        """
+        number_of_elements = srw_beamline.get_beamline_elements_number()
+
+        if number_of_elements == 0: return wavefront
+
+        partBeam = wavefront.partBeam
+        keys = self.get_prefix_keys(srw_beamline, wavefront)
+
+        start_index = 0
+        for index in reversed(range(number_of_elements)):
+            cached_wavefront = self.get_wavefront(keys[index])
+
+            if not cached_wavefront is None:
+                cached_wavefront.partBeam = partBeam
+                cached_wavefront.scanned_variable_data = wavefront.scanned_variable_data
+
+                wavefront = cached_wavefront
+                start_index = index + 1
+                break
+
+        if start_index == 0: wavefront = wavefront.duplicate(copy_on_write=True) # the input wavefront is left unchanged
+
+        if propagator is None: propagator = FresnelSRWNative()
+
+        for step in propagator.propagate_element_by_element(srw_beamline, wavefront, start_index=start_index):
+            if not keys[step.get_index()] is None: self.__wavefronts.put(keys[step.get_index()], step.get_wavefront())
+
+        wavefront.detach_buffers() # the returned wavefront does not share buffers with the cached ones
+
+        return wavefront
+
+    def __spill(self, key, wavefront):
+        self.__wavefront_disk_cache.put_wavefront(key, wavefront)
+
 class FresnelSRWNative(Propagator2D):
 
     HANDLER_NAME = "FRESNEL_SRW_NATIVE"
 
+    def __init__(self):
+        super().__init__()
+
+        self.__compiled_beamlines = weakref.WeakKeyDictionary()
+        self.__wavefront_memoization = SRWWavefrontMemoization()
+
     def get_handler_name(self):
         return self.HANDLER_NAME
 
+    def get_compiled_beamline(self, srw_beamline):
+        try:
+            compiled_beamline = self.__compiled_beamlines[srw_beamline]
+        except KeyError:
+            compiled_beamline = SRWCompiledBeamline()
+            self.__compiled_beamlines[srw_beamline] = compiled_beamline
+
+        return compiled_beamline
+
+    def get_wavefront_memoization(self):
+        return self.__wavefront_memoization
+
+    def set_wavefront_memoization(self, wavefront_memoization=None):
+        self.__wavefront_memoization = SRWWavefrontMemoization() if wavefront_memoization is None else wavefront_memoization
+
     """
     2D Fresnel propagator using convolution via Fourier transform
     :param wavefront:
@@ -34,31 +251,36 @@ class FresnelSRWNative(Propagator2D):
         is_generic_wavefront = isinstance(wavefront, GenericWavefront2D)
 
         if is_generic_wavefront:
-            wavefront = SRWWavefront.fromGenericWavefront(wavefront)
+            wavefront = SRWWavefront._fromGenericWavefrontCopyOnWrite(wavefront)
         else:
             if not isinstance(wavefront, SRWWavefront): raise ValueError("wavefront cannot be managed by this propagator")
 
-        srw_oe_array = []
-        srw_pp_array = []
-
         propagation_mode = PropagationManager.Instance().get_propagation_mode(SRW_APPLICATION)
 
         if propagation_mode == SRWPropagationMode.STEP_BY_STEP:
+            srw_oe_array = []
+            srw_pp_array = []
+
             self.add_optical_element(parameters, 0, srw_oe_array, srw_pp_array, wavefront)
+
+            if len(srw_oe_array) > 0:
+                wavefront.detach_buffers()
+
+                optBL = SRWLOptC(srw_oe_array, srw_pp_array)
+                srwl.PropagElecField(wavefront, optBL)
         elif propagation_mode == SRWPropagationMode.WHOLE_BEAMLINE:
             srw_beamline = parameters.get_additional_parameter("working_beamline")
 
-            for index in range(srw_beamline.get_beamline_elements_number()):
-                self.add_optical_element_from_beamline(srw_beamline, index, srw_oe_array, srw_pp_array, wavefront)
+            self.get_compiled_beamline(srw_beamline).propagate(srw_beamline, wavefront)
+        elif propagation_mode == SRWPropagationMode.WHOLE_BEAMLINE_MEMOIZED:
+            srw_beamline = parameters.get_additional_parameter("working_beamline")
+
+            wavefront = self.__wavefront_memoization.propagate(srw_beamline, wavefront, self)
         else:
             raise ValueError("Propagation Mode not supported by this Propagator")
 
-        if len(srw_oe_array) > 0:
-            optBL = SRWLOptC(srw_oe_array, srw_pp_array)
-            srwl.PropagElecField(wavefront, optBL)
-
         if is_generic_wavefront:
-            return wavefront.toGenericWavefront()
+            return SRWLazyGenericWavefront2D(wavefront)
         else:
             return wavefront
 
@@ -79,6 +301,46 @@ class FresnelSRWNative(Propagator2D):
             srw_oe_array.append(SRWLOptD(coordinates.q()))
             srw_pp_array.append(self.__get_drift_wavefront_propagation_parameters_from_beamline(srw_beamline, index, Where.DRIFT_AFTER))
 
+    def propagate_element_by_element(self,
+                                     srw_beamline,
+                                     wavefront,
+                                     start_index=0,
+                                     intensity_only=False,
+                                     polarization_component_to_be_extracted=PolarizationComponent.TOTAL):
+        """
+        Generator propagating the wavefront (in place) through the beamline elements, one at a time: after every
+        element it yields a SRWPropagationStep, so the intermediate screens cost a single propagation
+        :param start_index: index of the first element, for wavefronts already propagated through the previous ones
+        :param intensity_only: if True the steps contain only the intensity, otherwise an independent copy of the wavefront
+        """
+        for index in range(start_index, srw_beamline.get_beamline_elements_number()):
+            start_time = time.perf_counter()
+
+            srw_oe_array = []
+            srw_pp_array = []
+
+            self.add_optical_element_from_beamline(srw_beamline, index, srw_oe_array, srw_pp_array, wavefront)
+
+            setup_time = time.perf_counter() - start_time
+
+            if len(srw_oe_array) > 0:
+                wavefront.detach_buffers()
+
+                srwl.PropagElecField(wavefront, SRWLOptC(srw_oe_array, srw_pp_array))
+
+            propagation_time = time.perf_counter() - start_time - setup_time
+
+            if intensity_only:
+                yield SRWPropagationStep(index,
+                                         intensity=wavefront.get_intensity_from_field(polarization_component_to_be_extracted),
+                                         setup_time=setup_time,
+                                         propagation_time=propagation_time)
+            else:
+                yield SRWPropagationStep(index,
+                                         wavefront=wavefront.duplicate(), # callers may modify it with direct SRW calls
+                                         setup_time=setup_time,
+                                         propagation_time=propagation_time)
+
     ########################################################
     # ELEMENT BY ELEMENT
 
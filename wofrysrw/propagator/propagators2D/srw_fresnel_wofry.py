@@ -5,7 +5,7 @@ from wofry.propagator.wavefront2D.generic_wavefront import GenericWavefront2D
 from wofry.propagator.propagator import Propagator2D
 
 from wofrysrw.propagator.wavefront2D.srw_wavefront import WavefrontPropagationParameters, WavefrontPropagationOptionalParameters
-from wofrysrw.propagator.wavefront2D.srw_wavefront import SRWWavefront
+from wofrysrw.propagator.wavefront2D.srw_wavefront import SRWWavefront, SRWLazyGenericWavefront2D
 
 from srwlib import *
 
@@ -35,7 +35,7 @@ class FresnelSRWWofry(Propagator2D):
         is_generic_wavefront = isinstance(wavefront, GenericWavefront2D)
 
         if is_generic_wavefront:
-            wavefront = SRWWavefront.fromGenericWavefront(wavefront)
+            wavefront = SRWWavefront._fromGenericWavefrontCopyOnWrite(wavefront)
         else:
             if not isinstance(wavefront, SRWWavefront): raise ValueError("wavefront cannot be managed by this propagator")
 
@@ -46,10 +46,12 @@ class FresnelSRWWofry(Propagator2D):
         optBL = SRWLOptC([SRWLOptD(propagation_distance)], # drift space
                          [self.__get_drift_wavefront_propagation_parameters(parameters, prefix)])
 
+        wavefront.detach_buffers()
+
         srwl.PropagElecField(wavefront, optBL)
 
         if is_generic_wavefront:
-            return wavefront.toGenericWavefront()
+            return SRWLazyGenericWavefront2D(wavefront)
         else:
             return wavefront
 
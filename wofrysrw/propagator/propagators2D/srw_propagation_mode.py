@@ -3,3 +3,4 @@ from wofry.propagator.propagator import PropagationMode
 
 class SRWPropagationMode(PropagationMode):
     STEP_BY_STEP_WOFRY = 2
+    WHOLE_BEAMLINE_MEMOIZED = 3 # whole beamline, reusing the wavefronts after the unchanged upstream elements
@@ -0,0 +1,61 @@
+import time
+import tracemalloc
+import numpy
+
+from srwlib import array as srw_array
+
+from wofrysrw.propagator.wavefront2D.srw_wavefront import numpyArrayToSRWArray, SRWArrayToNumpy
+
+# previous (loop based) implementations, kept here as reference
+
+def numpyArrayToSRWArray_loop(numpy_array):
+    elements_size = numpy_array.size
+
+    r_horizontal_field = numpy_array[:, :].real.transpose().flatten().astype(float)
+    i_horizontal_field = numpy_array[:, :].imag.transpose().flatten().astype(float)
+
+    tmp = numpy.zeros(elements_size * 2, dtype=numpy.float32)
+    for i in range(elements_size):
+        tmp[2*i] = r_horizontal_field[i]
+        tmp[2*i+1] = i_horizontal_field[i]
+
+    return srw_array('f', tmp)
+
+def SRWArrayToNumpy_copies(srw_array, dim_x, dim_y, number_energies):
+    re = numpy.array(srw_array[::2], dtype=float)
+    im = numpy.array(srw_array[1::2], dtype=float)
+
+    e = re + 1j * im
+    e = e.reshape((dim_y, dim_x, number_energies, 1))
+    e = e.swapaxes(0, 2)
+
+    return e.copy()
+
+def measure(function, *args):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return result, elapsed, peak/1024**2
+
+print("%8s | %-28s | %-28s | %-28s | %-28s" % ("grid",
+                                              "to SRW: loop / vectorized [s]", "to SRW: loop / vectorized peak [MB]",
+                                              "to numpy: old / new [s]", "to numpy: old / new peak [MB]"))
+
+for n in [128, 256, 512, 1024, 2048]:
+    field = (numpy.random.rand(n, n) + 1j*numpy.random.rand(n, n)).astype(numpy.complex64)
+
+    if n <= 512: _, t_loop, m_loop = measure(numpyArrayToSRWArray_loop, field)
+    else: t_loop, m_loop = numpy.nan, numpy.nan
+
+    srw_field, t_vec, m_vec = measure(numpyArrayToSRWArray, field)
+
+    _, t_old, m_old = measure(SRWArrayToNumpy_copies, srw_field, n, n, 1)
+    _, t_new, m_new = measure(SRWArrayToNumpy, srw_field, n, n, 1)
+
+    print("%8s | %12.4f / %12.4f | %12.1f / %12.1f | %12.4f / %12.4f | %12.1f / %12.1f" % (str(n) + "x" + str(n),
+                                                                                             t_loop, t_vec, m_loop, m_vec,
+                                                                                             t_old, t_new, m_old, m_new))
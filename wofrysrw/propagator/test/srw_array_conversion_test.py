@@ -0,0 +1,75 @@
+import unittest
+import numpy
+
+from srwlib import array as srw_array
+
+from wofrysrw.propagator.wavefront2D.srw_wavefront import numpyArrayToSRWArray, SRWArrayToNumpy, SRWArrayAllocate
+
+def _loop_numpyArrayToSRWArray(numpy_array): # previous implementation, as reference
+    r_horizontal_field = numpy_array.real.transpose().flatten().astype(float)
+    i_horizontal_field = numpy_array.imag.transpose().flatten().astype(float)
+
+    tmp = numpy.zeros(numpy_array.size*2, dtype=numpy.float32)
+    for i in range(numpy_array.size):
+        tmp[2*i] = r_horizontal_field[i]
+        tmp[2*i+1] = i_horizontal_field[i]
+
+    return srw_array('f', tmp)
+
+class SRWArrayConversionTest(unittest.TestCase):
+
+    def setUp(self):
+        random_generator = numpy.random.default_rng(0)
+
+        self.field = (random_generator.random((12, 7)) + 1j*random_generator.random((12, 7))).astype(numpy.complex64)
+
+    def test_numpy_to_SRW_matches_loop(self):
+        converted = numpyArrayToSRWArray(self.field)
+
+        self.assertEqual(converted.typecode, 'f')
+        self.assertEqual(converted, _loop_numpyArrayToSRWArray(self.field))
+
+    def test_round_trip(self):
+        nx, ny = self.field.shape
+
+        field = SRWArrayToNumpy(numpyArrayToSRWArray(self.field), nx, ny, 1)
+
+        self.assertEqual(field.shape, (1, nx, ny, 1))
+        self.assertEqual(field.dtype, numpy.complex128)
+        numpy.testing.assert_array_equal(field[0, :, :, 0], self.field)
+
+    def test_round_trip_complex128_input(self):
+        nx, ny = self.field.shape
+
+        field = SRWArrayToNumpy(numpyArrayToSRWArray(self.field.astype(numpy.complex128)), nx, ny, 1)
+
+        numpy.testing.assert_array_equal(field[0, :, :, 0], self.field)
+
+    def test_multiple_energies(self):
+        ne, nx, ny = 3, 4, 5
+        srw_field = SRWArrayAllocate('f', 2*ne*nx*ny)
+
+        # SRW order: energy fastest, then x, then y
+        values = numpy.arange(ne*nx*ny, dtype=numpy.float32)
+        numpy.frombuffer(srw_field, dtype=numpy.float32)[0::2] = values
+        numpy.frombuffer(srw_field, dtype=numpy.float32)[1::2] = -values
+
+        field = SRWArrayToNumpy(srw_field, nx, ny, ne)
+
+        for ie in range(ne):
+            for ix in range(nx):
+                for iy in range(ny):
+                    index = ie + ne*(ix + nx*iy)
+
+                    self.assertEqual(field[ie, ix, iy, 0], values[index] - 1j*values[index])
+
+    def test_allocate(self):
+        for typecode in ('f', 'd'):
+            allocated = SRWArrayAllocate(typecode, 10)
+
+            self.assertEqual(allocated.typecode, typecode)
+            self.assertEqual(len(allocated), 10)
+            self.assertFalse(any(allocated))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+import numpy
+
+from wofrysrw.propagator.wavefront2D.srw_wavefront import SRWEFieldAsNumpy, SRWArrayToNumpy, SRWArrayAsField, SRWArrayAsComplex, SRWArrayAllocate
+from wofrysrw.propagator.test.srw_wavefront_fixtures import get_srw_wavefront
+
+class SRWElectricFieldViewsTest(unittest.TestCase):
+
+    def test_views_share_memory(self):
+        wavefront = get_srw_wavefront()
+        Ex, Ey = wavefront.get_electric_field_views()
+
+        self.assertEqual(Ex.shape, (1, wavefront.mesh.ny, wavefront.mesh.nx))
+        self.assertEqual(Ex.dtype, numpy.complex64)
+        self.assertTrue(numpy.shares_memory(Ex, numpy.frombuffer(wavefront.arEx, dtype=numpy.float32)))
+        self.assertTrue(numpy.shares_memory(Ey, numpy.frombuffer(wavefront.arEy, dtype=numpy.float32)))
+
+        e_field = SRWEFieldAsNumpy(wavefront)
+        numpy.testing.assert_array_equal(Ex[0].transpose(), e_field[0, :, :, 0])
+        numpy.testing.assert_array_equal(Ey[0].transpose(), e_field[0, :, :, 1])
+
+        Ex[0, 1, 2] = 3.0 - 4.0j
+
+        self.assertEqual(SRWEFieldAsNumpy(wavefront)[0, 2, 1, 0], 3.0 - 4.0j)
+
+    def test_SRW_array_to_numpy_without_copy(self):
+        ne, nx, ny = 2, 4, 3
+        srw_field = SRWArrayAllocate('f', 2*ne*nx*ny)
+
+        view = SRWArrayToNumpy(srw_field, nx, ny, ne, copy=False)
+        view[1, 2, 0, 0] = 1.0 + 2.0j
+
+        self.assertEqual(view.shape, (ne, nx, ny, 1))
+        self.assertEqual(SRWArrayToNumpy(srw_field, nx, ny, ne)[1, 2, 0, 0], 1.0 + 2.0j)
+        self.assertEqual(SRWArrayAsField(srw_field, nx, ny, ne)[1, 0, 2], 1.0 + 2.0j)
+
+    def test_SRW_array_as_complex(self):
+        self.assertEqual(SRWArrayAsComplex(SRWArrayAllocate('f', 4)).dtype, numpy.complex64)
+        self.assertEqual(SRWArrayAsComplex(SRWArrayAllocate('d', 4)).dtype, numpy.complex128)
+        self.assertRaises(ValueError, SRWArrayAsComplex, SRWArrayAllocate('i', 4))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import numpy
+
+from srwlib import srwl, SRWLOptC, SRWLOptD
+
+from wofrysrw.propagator.propagators2D.srw_fresnel_native import FresnelSRWNative, SRWCompiledBeamline
+from wofrysrw.propagator.test.srw_wavefront_fixtures import get_srw_wavefront
+from wofrysrw.beamline.test.srw_beamline_fixtures import get_srw_beamline
+
+def _field(srw_wavefront):
+    return numpy.array(numpy.frombuffer(srw_wavefront.arEx, dtype=numpy.float32))
+
+class SRWElementByElementTest(unittest.TestCase):
+
+    def setUp(self):
+        self.srw_beamline = get_srw_beamline()
+        self.wavefront = get_srw_wavefront(nx=16, ny=12)
+
+    def __reference_fields(self):
+        fields = []
+        for index in range(self.srw_beamline.get_beamline_elements_number()):
+            wavefront = self.wavefront.duplicate()
+            SRWCompiledBeamline().propagate(self.srw_beamline.get_sub_beamline(0, index + 1), wavefront)
+            fields.append(_field(wavefront))
+
+        return fields
+
+    def test_steps_match_whole_beamline(self):
+        reference_fields = self.__reference_fields()
+
+        steps = list(FresnelSRWNative().propagate_element_by_element(self.srw_beamline, self.wavefront.duplicate()))
+
+        self.assertEqual([step.get_index() for step in steps], [0, 1, 2])
+        for step, reference_field in zip(steps, reference_fields):
+            numpy.testing.assert_array_equal(_field(step.get_wavefront()), reference_field)
+
+    def test_modified_step_does_not_affect_next_steps(self):
+        reference_fields = self.__reference_fields()
+
+        wavefront = self.wavefront.duplicate()
+        steps = FresnelSRWNative().propagate_element_by_element(self.srw_beamline, wavefront)
+
+        step = next(steps)
+        step_wavefront = step.get_wavefront()
+
+        self.assertFalse(step_wavefront.has_shared_buffers())
+        self.assertIsNot(step_wavefront.arEx, wavefront.arEx)
+
+        # direct SRW calls ignore the copy-on-write counter
+        srwl.PropagElecField(step_wavefront, SRWLOptC([SRWLOptD(0.5)], [[0, 0, 1.0, 0, 0, 1.0, 1.0, 1.0, 1.0, 0, 0, 0]]))
+        numpy.frombuffer(step_wavefront.arEx, dtype=numpy.float32)[:] = 0.0
+
+        numpy.testing.assert_array_equal(_field(wavefront), reference_fields[0])
+
+        for step, reference_field in zip(steps, reference_fields[1:]):
+            numpy.testing.assert_array_equal(_field(step.get_wavefront()), reference_field)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import copy
+import unittest
+import numpy
+
+from wofrysrw.propagator.wavefront2D.srw_wavefront import WavefrontParameters, FluxCalculationParameters, CalculationType, PolarizationComponent, TypeOfDependence
+from wofrysrw.storage_ring.srw_electron_beam import SRWElectronBeam
+from wofrysrw.storage_ring.magnetic_structures.srw_undulator import SRWUndulator
+from wofrysrw.storage_ring.light_sources.srw_undulator_light_source import SRWUndulatorLightSource
+
+POLARIZATION_COMPONENTS = (PolarizationComponent.LINEAR_HORIZONTAL,
+                           PolarizationComponent.LINEAR_VERTICAL,
+                           PolarizationComponent.CIRCULAR_LEFT,
+                           PolarizationComponent.TOTAL)
+
+class SRWIntensityExtractionTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        undulator = SRWUndulatorLightSource("U",
+                                            SRWElectronBeam(energy_in_GeV=2.0, current=0.4, energy_spread=1e-3,
+                                                            moment_xx=(50e-6)**2, moment_xpxp=(5e-6)**2, moment_yy=(5e-6)**2, moment_ypyp=(2e-6)**2),
+                                            SRWUndulator(K_vertical=1.5, period_length=0.02, number_of_periods=75))
+        resonance_energy = undulator.get_resonance_energy()
+
+        cls.wavefront = undulator.get_SRW_Wavefront(WavefrontParameters(photon_energy_min=0.98*resonance_energy,
+                                                                        photon_energy_max=1.02*resonance_energy,
+                                                                        photon_energy_points=3,
+                                                                        h_slit_gap=0.002, h_slit_points=24,
+                                                                        v_slit_gap=0.002, v_slit_points=16,
+                                                                        distance=10.0))
+
+    def __compare(self, type, calculation_type, type_of_dependence=TypeOfDependence.VS_XY):
+        for polarization_component in POLARIZATION_COMPONENTS:
+            flux_calculation_parameters = FluxCalculationParameters(calculation_type=calculation_type,
+                                                                    polarization_component_to_be_extracted=polarization_component,
+                                                                    type_of_dependence=type_of_dependence)
+
+            if type_of_dependence == TypeOfDependence.VS_XY: get_distribution = self.wavefront.get_2D_intensity_distribution
+            else: get_distribution = self.wavefront.get_1D_intensity_distribution
+
+            batched = get_distribution(type, copy.copy(flux_calculation_parameters), batched=True)
+            per_energy = get_distribution(type, copy.copy(flux_calculation_parameters), batched=False)
+
+            for batched_array, per_energy_array in zip(batched, per_energy):
+                numpy.testing.assert_array_equal(batched_array, per_energy_array)
+
+    def test_2D_single_electron_intensity(self):
+        self.__compare('f', CalculationType.SINGLE_ELECTRON_INTENSITY)
+
+    def test_2D_multi_electron_intensity(self):
+        self.__compare('f', CalculationType.MULTI_ELECTRON_INTENSITY)
+
+    def test_2D_phase(self):
+        self.__compare('d', CalculationType.SINGLE_ELECTRON_PHASE)
+
+    def test_1D_single_electron_intensity(self):
+        for type_of_dependence in (TypeOfDependence.VS_X, TypeOfDependence.VS_Y):
+            self.__compare('f', CalculationType.SINGLE_ELECTRON_INTENSITY, type_of_dependence)
+
+    def test_1D_multi_electron_intensity(self):
+        for type_of_dependence in (TypeOfDependence.VS_X, TypeOfDependence.VS_Y):
+            self.__compare('f', CalculationType.MULTI_ELECTRON_INTENSITY, type_of_dependence)
+
+if __name__ == "__main__":
+    unittest.main()
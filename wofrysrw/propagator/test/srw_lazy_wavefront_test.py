@@ -0,0 +1,72 @@
+import unittest
+import numpy
+
+from srwlib import srwl
+
+from wofry.propagator.polarization import Polarization
+
+from wofrysrw.propagator.wavefront2D.srw_wavefront import SRWWavefront, SRWLazyGenericWavefront2D
+from wofrysrw.propagator.test.srw_wavefront_fixtures import get_srw_wavefront
+
+def _field(srw_wavefront):
+    return numpy.array(numpy.frombuffer(srw_wavefront.arEx, dtype=numpy.float32))
+
+class SRWLazyGenericWavefront2DTest(unittest.TestCase):
+
+    def test_from_generic_wavefront_is_independent(self):
+        source = get_srw_wavefront()
+        original_field = _field(source)
+
+        wavefront = SRWWavefront.fromGenericWavefront(SRWLazyGenericWavefront2D(source))
+
+        self.assertFalse(wavefront.has_shared_buffers())
+        self.assertFalse(numpy.shares_memory(numpy.frombuffer(wavefront.arEx, dtype=numpy.float32), numpy.frombuffer(source.arEx, dtype=numpy.float32)))
+
+        # a direct SRW call, ignoring the copy-on-write counter, does not change the source
+        srwl.ResizeElecField(wavefront, 'c', [0, 2.0, 1.0, 2.0, 1.0])
+
+        numpy.testing.assert_array_equal(_field(source), original_field)
+
+    def test_copy_on_write_conversion_shares_until_detached(self):
+        source = get_srw_wavefront()
+        original_field = _field(source)
+
+        wavefront = SRWWavefront._fromGenericWavefrontCopyOnWrite(SRWLazyGenericWavefront2D(source))
+
+        self.assertTrue(wavefront.has_shared_buffers())
+        self.assertIs(wavefront.arEx, source.arEx)
+
+        Ex, _ = wavefront.get_electric_field_views(writable=True)
+        Ex[...] = 0.0
+
+        self.assertFalse(wavefront.has_shared_buffers())
+        numpy.testing.assert_array_equal(_field(source), original_field)
+
+    def test_modified_wavefront_is_converted(self):
+        lazy_wavefront = SRWLazyGenericWavefront2D(get_srw_wavefront())
+
+        self.assertFalse(lazy_wavefront.is_materialized())
+
+        amplitude = lazy_wavefront.get_complex_amplitude(polarization=Polarization.SIGMA)
+
+        self.assertTrue(lazy_wavefront.is_materialized())
+        self.assertFalse(lazy_wavefront.is_modified())
+
+        lazy_wavefront.set_complex_amplitude(2*amplitude, lazy_wavefront.get_complex_amplitude(polarization=Polarization.PI))
+
+        self.assertTrue(lazy_wavefront.is_modified())
+
+        wavefront = SRWWavefront._fromGenericWavefrontCopyOnWrite(lazy_wavefront)
+        Ex, _ = wavefront.get_electric_field_views(writable=False)
+
+        self.assertFalse(wavefront.has_shared_buffers())
+        numpy.testing.assert_allclose(Ex[0].transpose(), 2*amplitude, rtol=1e-6)
+
+    def test_get_SRW_wavefront_of_duplicate_is_detached(self):
+        lazy_wavefront = SRWLazyGenericWavefront2D(get_srw_wavefront())
+        duplicate = lazy_wavefront.duplicate()
+
+        self.assertIsNot(duplicate.get_SRW_wavefront().arEx, lazy_wavefront.get_SRW_wavefront().arEx)
+
+if __name__ == "__main__":
+    unittest.main()
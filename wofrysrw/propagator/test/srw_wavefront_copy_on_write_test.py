@@ -0,0 +1,80 @@
+import unittest
+import numpy
+
+from wofrysrw.propagator.test.srw_wavefront_fixtures import get_srw_wavefront
+
+class SRWWavefrontCopyOnWriteTest(unittest.TestCase):
+
+    def test_duplicate_is_independent(self):
+        wavefront = get_srw_wavefront()
+        original_field = numpy.array(wavefront.arEx)
+        duplicate = wavefront.duplicate()
+
+        self.assertIsNot(duplicate.arEx, wavefront.arEx)
+        self.assertFalse(wavefront.has_shared_buffers())
+        self.assertFalse(duplicate.has_shared_buffers())
+
+        numpy.frombuffer(duplicate.arEx, dtype=numpy.float32)[:] = 0.0
+
+        numpy.testing.assert_array_equal(numpy.array(wavefront.arEx), original_field)
+
+    def test_copy_on_write_duplicate_shares_buffers(self):
+        wavefront = get_srw_wavefront()
+        duplicate = wavefront.duplicate(copy_on_write=True)
+
+        self.assertIs(duplicate.arEx, wavefront.arEx)
+        self.assertIs(duplicate.arEy, wavefront.arEy)
+        self.assertTrue(wavefront.has_shared_buffers())
+        self.assertTrue(duplicate.has_shared_buffers())
+
+        for attribute in ("xStart", "xFin", "nx", "yStart", "yFin", "ny", "eStart", "eFin", "ne"):
+            self.assertEqual(getattr(duplicate.mesh, attribute), getattr(wavefront.mesh, attribute))
+        self.assertEqual((duplicate.Rx, duplicate.Ry, duplicate.dRx, duplicate.dRy), (wavefront.Rx, wavefront.Ry, wavefront.dRx, wavefront.dRy))
+
+        duplicate.mesh.xStart *= 2 # the mesh is never shared
+
+        self.assertNotEqual(duplicate.mesh.xStart, wavefront.mesh.xStart)
+
+    def test_writing_a_duplicate_leaves_the_original_unchanged(self):
+        wavefront = get_srw_wavefront()
+        original_field = numpy.array(wavefront.arEx)
+        duplicate = wavefront.duplicate(copy_on_write=True)
+
+        Ex, _ = duplicate.get_electric_field_views(writable=True)
+        Ex[:] = 0.0
+
+        self.assertFalse(duplicate.has_shared_buffers())
+        self.assertFalse(wavefront.has_shared_buffers())
+        numpy.testing.assert_array_equal(numpy.array(wavefront.arEx), original_field)
+        self.assertFalse(numpy.any(numpy.array(duplicate.arEx)))
+
+    def test_writing_the_original_leaves_the_duplicates_unchanged(self):
+        wavefront = get_srw_wavefront()
+        original_field = numpy.array(wavefront.arEx)
+        duplicate_1 = wavefront.duplicate(copy_on_write=True)
+        duplicate_2 = wavefront.duplicate(copy_on_write=True)
+
+        Ex, _ = wavefront.get_electric_field_views(writable=True)
+        Ex[:] = 0.0
+
+        self.assertIs(duplicate_1.arEx, duplicate_2.arEx) # still shared between the two duplicates
+        self.assertTrue(duplicate_1.has_shared_buffers())
+        numpy.testing.assert_array_equal(numpy.array(duplicate_1.arEx), original_field)
+
+        duplicate_1.detach_buffers()
+
+        self.assertFalse(duplicate_1.has_shared_buffers())
+        self.assertFalse(duplicate_2.has_shared_buffers()) # last owner of the buffers
+        self.assertIsNot(duplicate_1.arEx, duplicate_2.arEx)
+
+    def test_read_only_views_do_not_detach(self):
+        wavefront = get_srw_wavefront()
+        duplicate = wavefront.duplicate(copy_on_write=True)
+
+        Ex, _ = duplicate.get_electric_field_views(writable=False)
+
+        self.assertTrue(duplicate.has_shared_buffers())
+        self.assertTrue(numpy.shares_memory(Ex, numpy.frombuffer(wavefront.arEx, dtype=numpy.float32)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,12 @@
+import numpy
+
+from wofrysrw.propagator.wavefront2D.srw_wavefront import SRWWavefrontFromElectricField
+
+def get_srw_wavefront(nx=8, ny=6):
+    """
+    Small single-energy SRWWavefront with a random electric field, for tests
+    """
+    return SRWWavefrontFromElectricField(horizontal_start=-1e-3, horizontal_end=1e-3, horizontal_efield=numpy.random.rand(nx, ny) + 1j*numpy.random.rand(nx, ny),
+                                         vertical_start=-2e-3, vertical_end=2e-3, vertical_efield=numpy.random.rand(nx, ny) + 1j*numpy.random.rand(nx, ny),
+                                         energy_min=8000.0, energy_max=8000.0, energy_points=1,
+                                         z=10.0, Rx=10.0, dRx=0.01, Ry=10.0, dRy=0.01)
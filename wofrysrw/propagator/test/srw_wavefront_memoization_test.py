@@ -0,0 +1,39 @@
+import unittest
+import numpy
+
+from wofrysrw.propagator.propagators2D.srw_fresnel_native import FresnelSRWNative, SRWWavefrontMemoization
+from wofrysrw.propagator.test.srw_wavefront_fixtures import get_srw_wavefront
+
+class SRWWavefrontMemoizationTest(unittest.TestCase):
+
+    def test_default_memoization_is_not_shared(self):
+        propagator_1 = FresnelSRWNative()
+        propagator_2 = FresnelSRWNative()
+
+        propagator_1.set_wavefront_memoization()
+        propagator_2.set_wavefront_memoization()
+
+        self.assertIsNot(propagator_1.get_wavefront_memoization(), propagator_2.get_wavefront_memoization())
+
+    def test_cached_wavefronts_are_independent(self):
+        memoization = SRWWavefrontMemoization()
+        wavefront = get_srw_wavefront()
+        original_field = numpy.array(wavefront.arEx)
+
+        memoization.put_wavefront("key", wavefront)
+
+        self.assertIsNot(memoization.get_wavefront("key").arEx, wavefront.arEx)
+
+        # direct modifications, ignoring the copy-on-write counter, touch neither the cache nor the caller
+        cached_wavefront = memoization.get_wavefront("key")
+        numpy.frombuffer(cached_wavefront.arEx, dtype=numpy.float32)[:] = 0.0
+        numpy.frombuffer(wavefront.arEx, dtype=numpy.float32)[:] = 1.0
+
+        self.assertFalse(cached_wavefront.has_shared_buffers())
+        numpy.testing.assert_array_equal(numpy.array(memoization.get_wavefront("key").arEx), original_field)
+
+        self.assertIsNone(memoization.get_wavefront("missing"))
+        self.assertIsNone(memoization.get_wavefront(None))
+
+if __name__ == "__main__":
+    unittest.main()
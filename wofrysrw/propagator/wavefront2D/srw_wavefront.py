@@ -364,6 +364,7 @@ class SRWWavefront(SRWLWfr, WavefrontDecorator):
                          _partBeam=_partBeam)
 
         self.scanned_variable_data = None
+        self._buffers_share = None
 
     def get_wavelength(self):
         if (self.mesh.eFin + self.mesh.eStart) == 0:
@@ -389,14 +390,46 @@ class SRWWavefront(SRWLWfr, WavefrontDecorator):
                                                                        wavelength=self.get_wavelength(),
                                                                        polarization=Polarization.TOTAL)
 
-        wavefront.set_complex_amplitude(SRWEFieldAsNumpy(srwwf=self)[0, :, :, 0],
-                                        SRWEFieldAsNumpy(srwwf=self)[0, :, :, 1])
+        Ex, Ey = self.get_electric_field_views(writable=False)
+
+        wavefront.set_complex_amplitude(numpy.array(Ex[0].transpose(), dtype=numpy.complex128),
+                                        numpy.array(Ey[0].transpose(), dtype=numpy.complex128))
 
         return wavefront
 
+    def get_electric_field_views(self, writable=True):
+        """
+        Returns complex views over the arEx and arEy buffers, without copying them:
+        modifying the views modifies the wavefront. The views refer to the current buffers, so they
+        have to be requested again after any operation that reallocates the field (e.g. a propagation).
+        :param writable: if True, buffers shared with copy-on-write duplicates are detached first
+        :return: (Ex, Ey) complex64 numpy arrays, shaped (ne, ny, nx)
+        """
+        if writable: self.detach_buffers()
+
+        return SRWArrayAsField(self.arEx, self.mesh.nx, self.mesh.ny, self.mesh.ne), \
+               SRWArrayAsField(self.arEy, self.mesh.nx, self.mesh.ny, self.mesh.ne)
+
     @classmethod
     def fromGenericWavefront(cls, wavefront):
+        if isinstance(wavefront, SRWLazyGenericWavefront2D) and not wavefront.is_modified():
+            return wavefront._srw_wavefront.duplicate()
+
+        return cls.__fromGenericWavefrontData(wavefront)
+
+    @classmethod
+    def _fromGenericWavefrontCopyOnWrite(cls, wavefront):
+        """
+        As fromGenericWavefront, but an unmodified SRWLazyGenericWavefront2D is converted to a copy-on-write
+        duplicate sharing its buffers: for propagators only, as they detach the buffers before any SRW call.
+        """
+        if isinstance(wavefront, SRWLazyGenericWavefront2D) and not wavefront.is_modified():
+            return wavefront._srw_wavefront.duplicate(copy_on_write=True)
 
+        return cls.__fromGenericWavefrontData(wavefront)
+
+    @classmethod
+    def __fromGenericWavefrontData(cls, wavefront):
         if wavefront.is_polarized():
             return SRWWavefrontFromElectricField(horizontal_start  = wavefront.get_coordinate_x()[0],
                                                  horizontal_end    = wavefront.get_coordinate_x()[-1],
@@ -434,8 +467,8 @@ class SRWWavefront(SRWLWfr, WavefrontDecorator):
         dim_y = srwwf.mesh.ny
         number_energies = srwwf.mesh.ne
 
-        x_polarization = SRWArrayToNumpy(srwwf.arEx, dim_x, dim_y, number_energies)
-        y_polarization = SRWArrayToNumpy(srwwf.arEy, dim_x, dim_y, number_energies)
+        x_polarization = SRWArrayToNumpy(srwwf.arEx, dim_x, dim_y, number_energies, copy=False)
+        y_polarization = SRWArrayToNumpy(srwwf.arEy, dim_x, dim_y, number_energies, copy=False)
 
         wavefront = SRWWavefrontFromElectricField(horizontal_start=srwwf.mesh.xStart,
                                                   horizontal_end=srwwf.mesh.xFin,
@@ -463,9 +496,26 @@ class SRWWavefront(SRWLWfr, WavefrontDecorator):
         return wavefront
 
 
-    def duplicate(self):
-        wavefront = SRWWavefront(_arEx=copy.deepcopy(self.arEx),
-                                 _arEy=copy.deepcopy(self.arEy),
+    def duplicate(self, copy_on_write=False):
+        """
+        Duplicates the wavefront.
+        :param copy_on_write: if True, the field and moments buffers are shared with the original
+                              wavefront until one of the two is going to be modified (see detach_buffers),
+                              otherwise they are copied immediately.
+        :return: the duplicated wavefront
+        """
+        if copy_on_write:
+            if self._buffers_share is None: self._buffers_share = _BuffersShare()
+            self._buffers_share.count += 1
+
+            arEx = self.arEx
+            arEy = self.arEy
+        else:
+            arEx = _copy_buffer(self.arEx)
+            arEy = _copy_buffer(self.arEy)
+
+        wavefront = SRWWavefront(_arEx=arEx,
+                                 _arEy=arEy,
                                  _typeE=self.numTypeElFld,
                                  _eStart=self.mesh.eStart,
                                  _eFin=self.mesh.eFin,
@@ -490,15 +540,44 @@ class SRWWavefront(SRWLWfr, WavefrontDecorator):
         wavefront.presCA = self.presCA
         wavefront.presFT  = self.presFT
         wavefront.unitElFld  = self.unitElFld
-        wavefront.arElecPropMatr  = copy.deepcopy(self.arElecPropMatr)
-        wavefront.arMomX  = copy.deepcopy(self.arMomX)
-        wavefront.arMomY  = copy.deepcopy(self.arMomY)
-        wavefront.arWfrAuxData  = copy.deepcopy(self.arWfrAuxData)
+
+        if copy_on_write:
+            wavefront.arElecPropMatr  = self.arElecPropMatr
+            wavefront.arMomX  = self.arMomX
+            wavefront.arMomY  = self.arMomY
+            wavefront.arWfrAuxData  = self.arWfrAuxData
+
+            wavefront._buffers_share = self._buffers_share
+        else:
+            wavefront.arElecPropMatr  = _copy_buffer(self.arElecPropMatr)
+            wavefront.arMomX  = _copy_buffer(self.arMomX)
+            wavefront.arMomY  = _copy_buffer(self.arMomY)
+            wavefront.arWfrAuxData  = _copy_buffer(self.arWfrAuxData)
 
         wavefront.scanned_variable_data = self.scanned_variable_data
 
         return wavefront
 
+    def has_shared_buffers(self):
+        return not self._buffers_share is None and self._buffers_share.count > 1
+
+    def detach_buffers(self):
+        """
+        To be called before any in-place modification of the wavefront (propagation, field editing):
+        if the buffers are shared with a copy-on-write duplicate, this wavefront takes its own copy of them.
+        """
+        if self.has_shared_buffers():
+            self.arEx           = _copy_buffer(self.arEx)
+            self.arEy           = _copy_buffer(self.arEy)
+            self.arElecPropMatr = _copy_buffer(self.arElecPropMatr)
+            self.arMomX         = _copy_buffer(self.arMomX)
+            self.arMomY         = _copy_buffer(self.arMomY)
+            self.arWfrAuxData   = _copy_buffer(self.arWfrAuxData)
+
+            self._buffers_share.count -= 1
+
+        self._buffers_share = None
+
     def setScanningData(self, scanned_variable_data=ScanningData(None, None, None, None)):
         self.scanned_variable_data=scanned_variable_data
 
@@ -542,60 +621,68 @@ class SRWWavefront(SRWLWfr, WavefrontDecorator):
                                                                   fixed_horizontal_position=self.mesh.xStart,
                                                                   fixed_vertical_position=self.mesh.yStart)
 
-        output_array = srw_array('f', [0]*self.mesh.ne)
+        output_array = SRWArrayAllocate('f', self.mesh.ne)
 
         SRWWavefront.get_intensity_from_electric_field(output_array, self, flux_calculation_parameters)
-        
-        data = numpy.ndarray(buffer=output_array, shape=self.mesh.ne, dtype=output_array.typecode)
 
         energy_array=numpy.linspace(self.mesh.eStart,
                                     self.mesh.eFin,
                                     self.mesh.ne)
-        spectral_flux_array = numpy.zeros(energy_array.size)
-
-        for ie in range(energy_array.size):
-            spectral_flux_array[ie] = data[ie]
+        spectral_flux_array = numpy.array(numpy.frombuffer(output_array, dtype=output_array.typecode), dtype=numpy.float64)
 
         return (energy_array, spectral_flux_array)
 
-    def get_2D_intensity_distribution(self, type='f', flux_calculation_parameters=FluxCalculationParameters()):
+    def get_2D_intensity_distribution(self, type='f', flux_calculation_parameters=FluxCalculationParameters(), batched=True):
+        """
+        :param batched: if True, all the photon energies are extracted with a single SRW call (dependence vs e&x&y),
+                        otherwise SRW is called once per photon energy. Batching applies only to single-electron
+                        intensity in single precision (see _is_batched_extraction_supported)
+        :return: (e_array, h_array, v_array, intensity_array[energy, horizontal, vertical])
+        """
         mesh = copy.deepcopy(self.mesh)
 
         h_array = numpy.linspace(mesh.xStart, mesh.xFin, mesh.nx)
         v_array = numpy.linspace(mesh.yStart, mesh.yFin, mesh.ny)
         e_array = numpy.linspace(mesh.eStart, mesh.eFin, mesh.ne)
 
-        intensity_array = numpy.zeros((e_array.size, h_array.size, v_array.size))
+        if batched and _is_batched_extraction_supported(type, flux_calculation_parameters):
+            batched_flux_calculation_parameters = copy.copy(flux_calculation_parameters)
+            batched_flux_calculation_parameters._type_of_dependence = TypeOfDependence.VS_EXY
+            batched_flux_calculation_parameters._fixed_input_photon_energy_or_time = mesh.eStart
+
+            output_array = SRWArrayAllocate(type, mesh.ne * mesh.nx * mesh.ny)
 
-        for ie in range(e_array.size):
-            output_array = srw_array(type, [0] * mesh.nx * mesh.ny)  # "flat" array to take 2D intensity data
+            SRWWavefront.get_intensity_from_electric_field(output_array, self, batched_flux_calculation_parameters)
 
-            flux_calculation_parameters._fixed_input_photon_energy_or_time = e_array[ie]
+            # SRW order is [vertical, horizontal, energy]
+            intensity_array = numpy.array(numpy.frombuffer(output_array, dtype=output_array.typecode).reshape(mesh.ny, mesh.nx, mesh.ne).transpose(),
+                                          dtype=numpy.float64)
+        else:
+            intensity_array = numpy.zeros((e_array.size, h_array.size, v_array.size))
 
-            SRWWavefront.get_intensity_from_electric_field(output_array, self, flux_calculation_parameters)
+            for ie in range(e_array.size):
+                output_array = SRWArrayAllocate(type, mesh.nx * mesh.ny)  # "flat" array to take 2D intensity data
 
-            # FROM UTI_PLOT in SRW
-            tot_len = int(mesh.ny * mesh.nx)
-            len_output_array = len(output_array)
+                flux_calculation_parameters._fixed_input_photon_energy_or_time = e_array[ie]
 
-            if len_output_array > tot_len:
-                output_array = numpy.array(output_array[0:tot_len])
-            elif len_output_array < tot_len:
-                aux_array = srw_array('d', [0] * len_output_array)
-                for i in range(len_output_array): aux_array[i] = output_array[i]
-                output_array = numpy.array(srw_array(aux_array))
-            else:
-                output_array = numpy.array(output_array)
+                SRWWavefront.get_intensity_from_electric_field(output_array, self, flux_calculation_parameters)
 
-            output_array = output_array.reshape(mesh.ny, mesh.nx)
+                # FROM UTI_PLOT in SRW: trims or pads with zeros the output
+                data = numpy.zeros(mesh.ny * mesh.nx)
+                length = min(len(output_array), data.size)
+                data[:length] = numpy.frombuffer(output_array, dtype=output_array.typecode)[:length]
 
-            for ix in range(mesh.nx):
-                for iy in range(mesh.ny):
-                    intensity_array[ie, ix, iy] = output_array[iy, ix]
+                intensity_array[ie, :, :] = data.reshape(mesh.ny, mesh.nx).transpose()
 
         return (e_array, h_array, v_array, intensity_array)
 
-    def get_1D_intensity_distribution(self, type='f', flux_calculation_parameters=FluxCalculationParameters()):
+    def get_1D_intensity_distribution(self, type='f', flux_calculation_parameters=FluxCalculationParameters(), batched=True):
+        """
+        :param batched: if True, all the photon energies are extracted with a single SRW call (dependence vs e&x or e&y),
+                        otherwise SRW is called once per photon energy. Batching applies only to single-electron
+                        intensity in single precision (see _is_batched_extraction_supported)
+        :return: (e_array, pos_array, intensity_array[energy, position])
+        """
         mesh = copy.deepcopy(self.mesh)
 
         if flux_calculation_parameters._type_of_dependence == TypeOfDependence.VS_X:
@@ -605,30 +692,32 @@ class SRWWavefront(SRWLWfr, WavefrontDecorator):
 
         e_array = numpy.linspace(mesh.eStart, mesh.eFin, mesh.ne)
 
-        intensity_array = numpy.zeros((e_array.size, pos_array.size))
+        if batched and _is_batched_extraction_supported(type, flux_calculation_parameters):
+            batched_flux_calculation_parameters = copy.copy(flux_calculation_parameters)
+            batched_flux_calculation_parameters._type_of_dependence = TypeOfDependence.VS_EX if flux_calculation_parameters._type_of_dependence == TypeOfDependence.VS_X else TypeOfDependence.VS_EY
+            batched_flux_calculation_parameters._fixed_input_photon_energy_or_time = mesh.eStart
+
+            output_array = SRWArrayAllocate(type, mesh.ne * pos_array.size)
+
+            SRWWavefront.get_intensity_from_electric_field(output_array, self, batched_flux_calculation_parameters)
 
-        for ie in range(e_array.size):
-            output_array = srw_array(type, [0] * len(pos_array))  # "flat" array to take 2D intensity data
+            # SRW order is [position, energy]
+            intensity_array = numpy.array(numpy.frombuffer(output_array, dtype=output_array.typecode).reshape(pos_array.size, mesh.ne).transpose(),
+                                          dtype=numpy.float64)
+        else:
+            intensity_array = numpy.zeros((e_array.size, pos_array.size))
 
-            flux_calculation_parameters._fixed_input_photon_energy_or_time = e_array[ie]
+            for ie in range(e_array.size):
+                output_array = SRWArrayAllocate(type, pos_array.size)  # "flat" array to take 1D intensity data
 
-            SRWWavefront.get_intensity_from_electric_field(output_array, self, flux_calculation_parameters)
+                flux_calculation_parameters._fixed_input_photon_energy_or_time = e_array[ie]
 
-            # FROM UTI_PLOT in SRW
-            tot_len = len(pos_array)
-            len_output_array = len(output_array)
+                SRWWavefront.get_intensity_from_electric_field(output_array, self, flux_calculation_parameters)
 
-            if len_output_array > tot_len:
-                output_array = numpy.array(output_array[0:tot_len])
-            elif len_output_array < tot_len:
-                aux_array = srw_array('d', [0] * len_output_array)
-                for i in range(len_output_array): aux_array[i] = output_array[i]
-                output_array = numpy.array(srw_array(aux_array))
-            else:
-                output_array = numpy.array(output_array)
+                # FROM UTI_PLOT in SRW: trims or pads with zeros the output
+                length = min(len(output_array), pos_array.size)
 
-            for i in range(len(pos_array)):
-                intensity_array[ie, i] = output_array[i]
+                intensity_array[ie, :length] = numpy.frombuffer(output_array, dtype=output_array.typecode)[:length]
 
         return (e_array, pos_array, intensity_array)
 
@@ -649,6 +738,124 @@ class SRWWavefront(SRWLWfr, WavefrontDecorator):
 
         return output_array
 
+    # ------------------------------------------------------------------
+    # NUMPY ENGINE: computed directly from the electric field buffers, without SRW calls
+
+    def get_intensity_from_field(self, polarization_component_to_be_extracted=PolarizationComponent.TOTAL, dtype=numpy.float32):
+        """
+        Single-electron intensity, computed with numpy from the electric field buffers
+        :param dtype: accumulation type, numpy.float32 or numpy.float64
+        :return: (e_array, h_array, v_array, intensity_array[energy, horizontal, vertical])
+        """
+        Ex, Ey = self.__get_transposed_electric_field_views()
+
+        return self.__get_mesh_arrays() + (SRWEFieldIntensity(Ex, Ey, polarization_component_to_be_extracted, dtype),)
+
+    def get_phase_from_field(self, polarization_component_to_be_extracted=PolarizationComponent.LINEAR_HORIZONTAL, dtype=numpy.float32):
+        """
+        Single-electron phase, computed with numpy from the electric field buffers
+        :param dtype: accumulation type, numpy.float32 or numpy.float64
+        :return: (e_array, h_array, v_array, phase_array[energy, horizontal, vertical])
+        """
+        Ex, Ey = self.__get_transposed_electric_field_views()
+
+        return self.__get_mesh_arrays() + (SRWEFieldPhase(Ex, Ey, polarization_component_to_be_extracted, dtype),)
+
+    def get_stokes_parameters_from_field(self, dtype=numpy.float32):
+        """
+        Single-electron Stokes parameters, computed with numpy from the electric field buffers
+        :param dtype: accumulation type, numpy.float32 or numpy.float64
+        :return: (e_array, h_array, v_array, stokes_array[S0-S3, energy, horizontal, vertical])
+        """
+        Ex, Ey = self.__get_transposed_electric_field_views()
+
+        return self.__get_mesh_arrays() + (SRWEFieldStokes(Ex, Ey, dtype),)
+
+    def __get_transposed_electric_field_views(self):
+        Ex, Ey = self.get_electric_field_views(writable=False)
+
+        return Ex.transpose((0, 2, 1)), Ey.transpose((0, 2, 1))
+
+    def __get_mesh_arrays(self):
+        return (numpy.linspace(self.mesh.eStart, self.mesh.eFin, self.mesh.ne),
+                numpy.linspace(self.mesh.xStart, self.mesh.xFin, self.mesh.nx),
+                numpy.linspace(self.mesh.yStart, self.mesh.yFin, self.mesh.ny))
+
+class SRWLazyGenericWavefront2D(GenericWavefront2D):
+    """
+    GenericWavefront2D interface over a SRWWavefront, which remains the source of truth: the conversion to the
+    wofry representation is done only when the wofry-side data are accessed for the first time, and the conversion
+    back to SRW (see SRWWavefront._fromGenericWavefrontCopyOnWrite) only if those data have been modified in the meantime.
+    """
+    def __init__(self, srw_wavefront):
+        # GenericWavefront2D.__init__ is not called: its attributes are created at the first access
+        self.__dict__["_srw_wavefront"] = srw_wavefront
+        self.__dict__["_is_materialized"] = False
+
+    def __getattr__(self, name): # called only for attributes not yet existing
+        if name.startswith("__") or self.__dict__.get("_is_materialized", True): raise AttributeError(name)
+
+        self.__materialize()
+
+        return getattr(self, name)
+
+    def __materialize(self):
+        generic_wavefront = self._srw_wavefront.toGenericWavefront()
+
+        for key, value in generic_wavefront.__dict__.items(): self.__dict__.setdefault(key, value)
+
+        self.__dict__["_is_materialized"] = True
+
+    def is_materialized(self):
+        return self._is_materialized
+
+    def is_modified(self):
+        if not self._is_materialized: return False
+
+        srw_wavefront = self._srw_wavefront
+        Ex, Ey = srw_wavefront.get_electric_field_views(writable=False)
+
+        x = self.get_coordinate_x()
+        y = self.get_coordinate_y()
+
+        return not (self.is_polarized() and
+                    numpy.isclose(self.get_wavelength(), srw_wavefront.get_wavelength(), rtol=1e-12, atol=0.0) and
+                    _is_same_range(x, srw_wavefront.mesh.xStart, srw_wavefront.mesh.xFin, srw_wavefront.mesh.nx) and
+                    _is_same_range(y, srw_wavefront.mesh.yStart, srw_wavefront.mesh.yFin, srw_wavefront.mesh.ny) and
+                    numpy.array_equal(self.get_complex_amplitude(polarization=Polarization.SIGMA), Ex[0].transpose()) and
+                    numpy.array_equal(self.get_complex_amplitude(polarization=Polarization.PI), Ey[0].transpose()))
+
+    def get_SRW_wavefront(self):
+        self._srw_wavefront.detach_buffers() # it could be used by direct SRW calls
+
+        return self._srw_wavefront
+
+    def duplicate(self):
+        if self._is_materialized: return super().duplicate()
+        else: return SRWLazyGenericWavefront2D(self._srw_wavefront.duplicate(copy_on_write=True))
+
+def _is_batched_extraction_supported(type, flux_calculation_parameters):
+    # the energy-dependent extraction of SRW matches the per-energy one only for single-electron intensity in
+    # single precision: multi-electron intensity differs and phase crashes
+    return type == 'f' and flux_calculation_parameters._calculation_type == CalculationType.SINGLE_ELECTRON_INTENSITY
+
+def _is_same_range(coordinates, start, end, points):
+    # wofry coordinates are accumulated from the step: the last one can differ from the SRW mesh by a rounding error
+    if coordinates.size != points: return False
+
+    tolerance = 1e-6*abs(end - start)/max(points - 1, 1)
+
+    return abs(coordinates[0] - start) <= tolerance and abs(coordinates[-1] - end) <= tolerance
+
+class _BuffersShare(object):
+    def __init__(self):
+        self.count = 1
+
+def _copy_buffer(buffer):
+    if buffer is None: return None
+    elif isinstance(buffer, srw_array): return buffer[:] # single memory copy
+    else: return copy.deepcopy(buffer)
+
 # ------------------------------------------------------------------
 # ------------------------------------------------------------------
 # ------------------------------------------------------------------
@@ -667,13 +874,112 @@ def SRWEFieldAsNumpy(srwwf):
     dim_y = srwwf.mesh.ny
     number_energies = srwwf.mesh.ne
 
-    x_polarization = SRWArrayToNumpy(srwwf.arEx, dim_x, dim_y, number_energies)
-    y_polarization = SRWArrayToNumpy(srwwf.arEy, dim_x, dim_y, number_energies)
+    e_field = numpy.empty((number_energies, dim_x, dim_y, 2), dtype=numpy.complex128)
 
-    e_field = numpy.concatenate((x_polarization, y_polarization), 3)
+    e_field[:, :, :, 0:1] = SRWArrayToNumpy(srwwf.arEx, dim_x, dim_y, number_energies, copy=False)
+    e_field[:, :, :, 1:2] = SRWArrayToNumpy(srwwf.arEy, dim_x, dim_y, number_energies, copy=False)
 
     return e_field
 
+def SRWEFieldIntensity(Ex, Ey, polarization_component=PolarizationComponent.TOTAL, dtype=numpy.float32):
+    """
+    Computes the single-electron intensity of a polarization component, with the same definitions of SRW.
+    :param Ex: complex horizontal electric field (any shape)
+    :param Ey: complex vertical electric field (same shape as Ex)
+    :param polarization_component: one of PolarizationComponent
+    :param dtype: accumulation type, numpy.float32 or numpy.float64
+    :return: intensity array, same shape of the fields
+    """
+    if polarization_component == PolarizationComponent.LINEAR_HORIZONTAL:
+        return _squared_modulus(Ex, dtype)
+    elif polarization_component == PolarizationComponent.LINEAR_VERTICAL:
+        return _squared_modulus(Ey, dtype)
+    elif polarization_component == PolarizationComponent.TOTAL:
+        intensity = _squared_modulus(Ex, dtype)
+        intensity += _squared_modulus(Ey, dtype)
+    else:
+        intensity = _squared_modulus(_polarization_component_field(Ex, Ey, polarization_component, dtype), dtype)
+        intensity *= 0.5
+
+    return intensity
+
+def SRWEFieldPhase(Ex, Ey, polarization_component=PolarizationComponent.LINEAR_HORIZONTAL, dtype=numpy.float32):
+    """
+    Computes the single-electron phase of a polarization component.
+    :param Ex: complex horizontal electric field (any shape)
+    :param Ey: complex vertical electric field (same shape as Ex)
+    :param polarization_component: one of PolarizationComponent, except TOTAL
+    :param dtype: accumulation type, numpy.float32 or numpy.float64
+    :return: phase array [rad], same shape of the fields
+    """
+    if polarization_component == PolarizationComponent.TOTAL:
+        raise ValueError("Phase is not defined for the Total polarization component")
+    elif polarization_component == PolarizationComponent.LINEAR_HORIZONTAL:
+        field = Ex
+    elif polarization_component == PolarizationComponent.LINEAR_VERTICAL:
+        field = Ey
+    else:
+        field = _polarization_component_field(Ex, Ey, polarization_component, dtype)
+
+    return numpy.arctan2(field.imag, field.real, dtype=dtype)
+
+def SRWEFieldStokes(Ex, Ey, dtype=numpy.float32):
+    """
+    Computes the four single-electron Stokes parameters:
+    S0 = I(total), S1 = I(horizontal) - I(vertical), S2 = I(45) - I(135), S3 = I(circular right) - I(circular left)
+    :param Ex: complex horizontal electric field (any shape)
+    :param Ey: complex vertical electric field (same shape as Ex)
+    :param dtype: accumulation type, numpy.float32 or numpy.float64
+    :return: stokes array [S0-S3, shape of the fields]
+    """
+    stokes = numpy.empty((4,) + Ex.shape, dtype=dtype)
+    buffer = numpy.empty(Ex.shape, dtype=dtype)
+
+    S0, S1, S2, S3 = stokes
+
+    _squared_modulus(Ex, dtype, out=S1)
+    _squared_modulus(Ey, dtype, out=buffer)
+    numpy.add(S1, buffer, out=S0)
+    numpy.subtract(S1, buffer, out=S1)
+
+    # S2 = 2 Re(Ex Ey*)
+    numpy.multiply(Ex.real, Ey.real, out=S2, dtype=dtype)
+    numpy.multiply(Ex.imag, Ey.imag, out=buffer, dtype=dtype)
+    S2 += buffer
+    S2 *= 2
+
+    # S3 = -2 Im(Ex Ey*)
+    numpy.multiply(Ex.real, Ey.imag, out=S3, dtype=dtype)
+    numpy.multiply(Ex.imag, Ey.real, out=buffer, dtype=dtype)
+    S3 -= buffer
+    S3 *= 2
+
+    return stokes
+
+def _squared_modulus(field, dtype, out=None):
+    out = numpy.square(field.real, out=out, dtype=dtype)
+    out += numpy.square(field.imag, dtype=dtype)
+
+    return out
+
+def _polarization_component_field(Ex, Ey, polarization_component, dtype):
+    complex_dtype = numpy.complex64 if numpy.dtype(dtype) == numpy.float32 else numpy.complex128
+
+    if polarization_component == PolarizationComponent.LINEAR_45_DEGREES:
+        return numpy.add(Ex, Ey, dtype=complex_dtype)
+    elif polarization_component == PolarizationComponent.LINEAR_135_DEGREES:
+        return numpy.subtract(Ex, Ey, dtype=complex_dtype)
+    elif polarization_component == PolarizationComponent.CIRCULAR_RIGHT:
+        field = numpy.multiply(Ey, -1j, dtype=complex_dtype)
+    elif polarization_component == PolarizationComponent.CIRCULAR_LEFT:
+        field = numpy.multiply(Ey, 1j, dtype=complex_dtype)
+    else:
+        raise ValueError("Polarization component not recognized: " + str(polarization_component))
+
+    field += Ex
+
+    return field
+
 def SRWWavefrontFromElectricField(horizontal_start,
                                   horizontal_end,
                                   horizontal_efield,
@@ -740,41 +1046,69 @@ def SRWWavefrontFromElectricField(horizontal_start,
 def numpyArrayToSRWArray(numpy_array):
     """
     Converts a numpy.array to an array usable by SRW.
+    The real and imaginary parts are interleaved in a single pass, by writing the transposed field
+    into a complex64 view of a preallocated float32 SRW buffer.
     :param numpy_array: a 2D numpy array
     :return: a 2D complex SRW array
     """
-    elements_size = numpy_array.size
+    numpy_array = numpy.asarray(numpy_array)
 
-    r_horizontal_field = numpy_array[:, :].real.transpose().flatten().astype(numpy.float)
-    i_horizontal_field = numpy_array[:, :].imag.transpose().flatten().astype(numpy.float)
+    output_array = SRWArrayAllocate('f', 2*numpy_array.size)
 
-    tmp = numpy.zeros(elements_size * 2, dtype=numpy.float32)
-    for i in range(elements_size):
-        tmp[2*i] = r_horizontal_field[i]
-        tmp[2*i+1] = i_horizontal_field[i]
+    SRWArrayAsComplex(output_array).reshape(numpy_array.shape[::-1])[...] = numpy_array.transpose()
 
-    return srw_array('f', tmp)
+    return output_array
 
-def SRWArrayToNumpy(srw_array, dim_x, dim_y, number_energies):
+def SRWArrayToNumpy(srw_array, dim_x, dim_y, number_energies, copy=True):
     """
     Converts a SRW array to a numpy.array.
     :param srw_array: SRW array
     :param dim_x: size of horizontal dimension
     :param dim_y: size of vertical dimension
     :param number_energies: Size of energy dimension
+    :param copy: if True returns a complex128 copy, otherwise a complex view sharing the SRW buffer
     :return: 4D numpy array: [energy, horizontal, vertical, polarisation={0:horizontal, 1: vertical}]
     """
-    re = numpy.array(srw_array[::2], dtype=numpy.float)
-    im = numpy.array(srw_array[1::2], dtype=numpy.float)
-
-    e = re + 1j * im
-    e = e.reshape((dim_y,
-                   dim_x,
-                   number_energies,
-                   1)
-                  )
+    e = SRWArrayAsComplex(srw_array).reshape((dim_y,
+                                              dim_x,
+                                              number_energies,
+                                              1)
+                                             )
 
     e = e.swapaxes(0, 2)
 
-    return e.copy()
+    if copy: return numpy.array(e, dtype=numpy.complex128)
+    else: return e
+
+def SRWArrayAsField(srw_array, dim_x, dim_y, number_energies):
+    """
+    Views a SRW electric field array as a complex numpy array, without copying.
+    :param srw_array: SRW array
+    :param dim_x: size of horizontal dimension
+    :param dim_y: size of vertical dimension
+    :param number_energies: Size of energy dimension
+    :return: 3D writable complex numpy array sharing memory with the SRW array: [energy, vertical, horizontal]
+    """
+    return SRWArrayAsComplex(srw_array).reshape((dim_y, dim_x, number_energies)).transpose((2, 0, 1))
+
+def SRWArrayAllocate(typecode, size):
+    """
+    Allocates a zero-filled SRW array, without building an intermediate python list or buffer.
+    :param typecode: 'f' or 'd'
+    :param size: number of elements
+    :return: SRW array
+    """
+    return srw_array(typecode, [0])*int(size)
+
+def SRWArrayAsComplex(srw_array):
+    """
+    Views an interleaved (re, im) SRW array as a flat complex numpy array, without copying.
+    :param srw_array: SRW array ('f' or 'd')
+    :return: 1D complex64 (or complex128) numpy array sharing memory with the SRW array
+    """
+    if srw_array.typecode == 'f': dtype = numpy.complex64
+    elif srw_array.typecode == 'd': dtype = numpy.complex128
+    else: raise ValueError("SRW array type not supported: " + srw_array.typecode)
+
+    return numpy.frombuffer(srw_array, dtype=dtype)
 
@@ -0,0 +1,106 @@
+import threading
+from collections import OrderedDict
+
+class SRWLRUCache(object):
+    """
+    Thread-safe dictionary with least-recently-used eviction, used for the process-wide caches of native SRW objects
+    """
+    def __init__(self, max_size=16, on_evict=None):
+        """
+        :param on_evict: optional callable(key, value), called (outside the lock) for every evicted entry
+        """
+        if max_size < 0: raise ValueError("max_size should be >= 0")
+
+        self.__max_size = max_size
+        self.__on_evict = on_evict
+        self.__data = OrderedDict()
+        self.__lock = threading.RLock()
+        self.__hits = 0
+        self.__misses = 0
+
+    def get_max_size(self):
+        return self.__max_size
+
+    def set_max_size(self, max_size):
+        if max_size < 0: raise ValueError("max_size should be >= 0")
+
+        with self.__lock:
+            self.__max_size = max_size
+            evicted = self.__evict()
+
+        self.__notify_evicted(evicted)
+
+    def get(self, key, default=None):
+        with self.__lock:
+            try:
+                value = self.__data[key]
+            except KeyError:
+                self.__misses += 1
+                return default
+
+            self.__data.move_to_end(key)
+            self.__hits += 1
+
+            return value
+
+    def put(self, key, value):
+        with self.__lock:
+            self.__data[key] = value
+            self.__data.move_to_end(key)
+            evicted = self.__evict()
+
+        self.__notify_evicted(evicted)
+
+    def get_or_compute(self, key, function):
+        """
+        :param function: no-arguments callable computing the value when key is not cached
+        """
+        with self.__lock:
+            try:
+                value = self.__data[key]
+                self.__data.move_to_end(key)
+                self.__hits += 1
+
+                return value
+            except KeyError:
+                self.__misses += 1
+
+        value = function() # computed outside the lock: it can be very slow
+
+        self.put(key, value)
+
+        return value
+
+    def remove(self, key):
+        with self.__lock:
+            self.__data.pop(key, None)
+
+    def clear(self):
+        with self.__lock:
+            self.__data.clear()
+            self.__hits = 0
+            self.__misses = 0
+
+    def get_statistics(self):
+        with self.__lock:
+            return self.__hits, self.__misses
+
+    def __evict(self):
+        evicted = []
+
+        while len(self.__data) > self.__max_size:
+            evicted.append(self.__data.popitem(last=False))
+
+        return evicted
+
+    def __notify_evicted(self, evicted):
+        if not self.__on_evict is None:
+            for key, value in evicted: self.__on_evict(key, value)
+
+    def __contains__(self, key):
+        with self.__lock:
+            return key in self.__data
+
+    def __len__(self):
+        with self.__lock:
+            return len(self.__data)
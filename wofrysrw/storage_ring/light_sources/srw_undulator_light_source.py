@@ -1,7 +1,8 @@
+import os
 import numpy
+from concurrent.futures import ProcessPoolExecutor
 
-from srwlib import srwl
-
+from srwlib import srwl, SRWLStokes
 
 from wofrysrw.propagator.wavefront2D.srw_wavefront import WavefrontParameters
 from wofrysrw.storage_ring.srw_light_source import SRWLightSource, PhotonSourceProperties
@@ -32,6 +33,15 @@ class FluxPrecisionParameters(object):
                 float(self._azimuthal_integration_precision_parameter),
                 int(self._calculation_type)]
 
+def _calculate_stokes_UR(mesh, part_beam, magnetic_structure, flux_precision_array):
+    stk = SRWLStokes()
+    stk.allocate(mesh.ne, mesh.nx, mesh.ny)
+    stk.mesh = mesh
+
+    srwl.CalcStokesUR(stk, part_beam, magnetic_structure, flux_precision_array)
+
+    return numpy.array(numpy.frombuffer(stk.arS, dtype=stk.arS.typecode, count=mesh.ne), dtype=float)
+
 class SRWUndulatorLightSource(SRWLightSource):
 
     def __init__(self,
@@ -81,21 +91,46 @@ class SRWUndulatorLightSource(SRWLightSource):
 
     def get_undulator_flux(self,
                            source_wavefront_parameters = WavefrontParameters(),
-                           flux_precision_parameters = FluxPrecisionParameters()):
-
+                           flux_precision_parameters = FluxPrecisionParameters(),
+                           number_of_processes = 1):
+        """
+        :param number_of_processes: processes sharing the calculation (None: one per CPU, 1: serial calculation).
+                                    In parallel the partial fluxes of each harmonic are summed in harmonic order: the
+                                    result does not depend on the number of processes and differs from the serial one
+                                    by single precision rounding (energy points are not split: SRW results depend on
+                                    the first energy of the mesh)
+        """
         stkF = source_wavefront_parameters.to_SRWLStokes()
 
-        srwl.CalcStokesUR(stkF,
-                          self._electron_beam.to_SRWLPartBeam(),
-                          self._magnetic_structure.get_SRWMagneticStructure(),
-                          flux_precision_parameters.to_SRW_array())
+        if number_of_processes is None: number_of_processes = os.cpu_count()
 
-        eArray = numpy.zeros(stkF.mesh.ne)
-        intensArray = numpy.zeros(stkF.mesh.ne)
+        if number_of_processes <= 1:
+            srwl.CalcStokesUR(stkF,
+                              self._electron_beam.to_SRWLPartBeam(),
+                              self._magnetic_structure.get_SRWMagneticStructure(),
+                              flux_precision_parameters.to_SRW_array())
 
-        for i in range(source_wavefront_parameters._photon_energy_points):
-            eArray[i] = stkF.mesh.eStart+i*(stkF.mesh.eFin-stkF.mesh.eStart)/numpy.array((stkF.mesh.ne-1)).clip(min=1)
-            intensArray[i] = stkF.arS[i]
+            intensArray = numpy.array(numpy.frombuffer(stkF.arS, dtype=stkF.arS.typecode, count=stkF.mesh.ne), dtype=float)
+        else:
+            intensArray = self.__get_undulator_flux_parallel(stkF.mesh, flux_precision_parameters, number_of_processes)
+
+        eArray = stkF.mesh.eStart + numpy.arange(stkF.mesh.ne)*(stkF.mesh.eFin-stkF.mesh.eStart)/numpy.array((stkF.mesh.ne-1)).clip(min=1)
 
         return (eArray, intensArray)
 
+    def __get_undulator_flux_parallel(self, mesh, flux_precision_parameters, number_of_processes):
+        flux_precision_array = flux_precision_parameters.to_SRW_array()
+
+        harmonics = range(flux_precision_array[0], flux_precision_array[1] + 1)
+
+        with ProcessPoolExecutor(max_workers=min(number_of_processes, len(harmonics))) as executor:
+            partial_fluxes = executor.map(_calculate_stokes_UR,
+                                          [mesh]*len(harmonics),
+                                          [self._electron_beam.to_SRWLPartBeam()]*len(harmonics),
+                                          [self._magnetic_structure.get_SRWMagneticStructure()]*len(harmonics),
+                                          [[harmonic, harmonic] + flux_precision_array[2:] for harmonic in harmonics])
+
+            intensArray = numpy.zeros(mesh.ne)
+            for partial_flux in partial_fluxes: intensArray += partial_flux # fixed order
+
+        return intensArray
@@ -1,6 +1,11 @@
 import numpy
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
 
-from srwlib import srwl
+from scipy.integrate import trapezoid, simpson
+
+from srwlib import srwl, SRWLRadMesh
 
 from syned.storage_ring.light_source import LightSource
 
@@ -8,7 +13,7 @@ from wofry.beamline.decorators import LightSourceDecorator
 from wofrysrw.srw_object import SRWObject
 from wofrysrw.storage_ring.srw_magnetic_structure import SRWMagneticStructure
 from wofrysrw.storage_ring.srw_electron_beam import SRWElectronBeam, SRWElectronBeamGeometricalProperties
-from wofrysrw.propagator.wavefront2D.srw_wavefront import SRWWavefront, WavefrontParameters
+from wofrysrw.propagator.wavefront2D.srw_wavefront import SRWWavefront, WavefrontParameters, SRWArrayAllocate, SRWArrayAsComplex
 
 class PowerDensityPrecisionParameters(object):
     def __init__(self,
@@ -31,6 +36,115 @@ class PowerDensityPrecisionParameters(object):
                 float(self._final_longitudinal_position),
                 int(self._number_of_points_for_trajectory_calculation)]
 
+class WavefrontSplitMode:
+    ENERGY = 0     # each process computes a contiguous range of photon energies
+    TRANSVERSE = 1 # each process computes a horizontal strip (contiguous range of vertical positions)
+
+NUMBER_OF_MOMENTS = 11 # per photon energy, in SRWLWfr.arMomX/arMomY: total flux + first and second order moments
+
+def _calculate_electric_field_SR(mesh, part_beam, magnetic_field_container, precision_array):
+    wfr = SRWWavefront()
+    wfr.allocate(mesh.ne, mesh.nx, mesh.ny)
+    wfr.mesh = mesh
+    wfr.partBeam = part_beam
+
+    srwl.CalcElecFieldSR(wfr, 0, magnetic_field_container, precision_array)
+
+    return wfr
+
+def _split_mesh(mesh, number_of_chunks, split_mode):
+    meshes = []
+
+    if split_mode == WavefrontSplitMode.ENERGY:
+        energies = mesh.eStart + numpy.arange(mesh.ne)*(mesh.eFin - mesh.eStart)/max(mesh.ne - 1, 1)
+
+        for indexes in numpy.array_split(numpy.arange(mesh.ne), min(number_of_chunks, mesh.ne)):
+            meshes.append(SRWLRadMesh(float(energies[indexes[0]]), float(energies[indexes[-1]]), len(indexes),
+                                      mesh.xStart, mesh.xFin, mesh.nx,
+                                      mesh.yStart, mesh.yFin, mesh.ny,
+                                      mesh.zStart))
+    elif split_mode == WavefrontSplitMode.TRANSVERSE:
+        positions = mesh.yStart + numpy.arange(mesh.ny)*(mesh.yFin - mesh.yStart)/max(mesh.ny - 1, 1)
+
+        for indexes in numpy.array_split(numpy.arange(mesh.ny), min(number_of_chunks, mesh.ny)):
+            meshes.append(SRWLRadMesh(mesh.eStart, mesh.eFin, mesh.ne,
+                                      mesh.xStart, mesh.xFin, mesh.nx,
+                                      float(positions[indexes[0]]), float(positions[indexes[-1]]), len(indexes),
+                                      mesh.zStart))
+    else:
+        raise ValueError("Split mode not recognized")
+
+    return meshes
+
+def _check_partial_wavefronts(partial_meshes, partial_wavefronts):
+    for expected, partial in zip(partial_meshes, partial_wavefronts):
+        if (partial.mesh.ne, partial.mesh.nx, partial.mesh.ny) != (expected.ne, expected.nx, expected.ny) or \
+            not numpy.allclose([partial.mesh.eStart, partial.mesh.eFin, partial.mesh.xStart, partial.mesh.xFin, partial.mesh.yStart, partial.mesh.yFin],
+                               [expected.eStart, expected.eFin, expected.xStart, expected.xFin, expected.yStart, expected.yFin], rtol=1e-9, atol=1e-12):
+            raise ValueError("Partial wavefront mesh does not match the expected sub-mesh: SRW changed the mesh of a chunk")
+
+    for name in ("Rx", "Ry", "dRx", "dRy"):
+        values = numpy.array([getattr(partial, name) for partial in partial_wavefronts], dtype=float)
+
+        if not numpy.allclose(values, values[0], rtol=1e-9, atol=0.0):
+            raise ValueError("Partial wavefronts have different " + name + ": " + str(values))
+
+def _merge_partial_wavefronts(mesh, partial_wavefronts, split_mode, partial_meshes=None):
+    if partial_meshes is None: partial_meshes = _split_mesh(mesh, len(partial_wavefronts), split_mode)
+
+    _check_partial_wavefronts(partial_meshes, partial_wavefronts)
+
+    wfr = SRWWavefront()
+    wfr.mesh = mesh
+
+    first = partial_wavefronts[0]
+
+    for name in ("numTypeElFld", "Rx", "Ry", "dRx", "dRy", "xc", "yc", "presCA", "presFT", "unitElFld"):
+        setattr(wfr, name, getattr(first, name))
+
+    wfr.avgPhotEn = 0.5*(mesh.eStart + mesh.eFin) # over the whole energy range, not the first chunk
+
+    wfr.arElecPropMatr = first.arElecPropMatr[:]
+    wfr.arWfrAuxData = first.arWfrAuxData[:]
+
+    size = mesh.ne*mesh.nx*mesh.ny
+
+    wfr.arEx = SRWArrayAllocate(first.arEx.typecode, 2*size)
+    wfr.arEy = SRWArrayAllocate(first.arEy.typecode, 2*size)
+
+    for field_name in ("arEx", "arEy"):
+        # SRW order: energy fastest, then x, then y
+        fields = [SRWArrayAsComplex(getattr(partial, field_name)).reshape((partial.mesh.ny, partial.mesh.nx, partial.mesh.ne)) for partial in partial_wavefronts]
+
+        numpy.concatenate(fields,
+                          axis=2 if split_mode == WavefrontSplitMode.ENERGY else 0,
+                          out=SRWArrayAsComplex(getattr(wfr, field_name)).reshape((mesh.ny, mesh.nx, mesh.ne)))
+
+    for moments_name in ("arMomX", "arMomY"):
+        moments = [numpy.frombuffer(getattr(partial, moments_name), dtype=float, count=NUMBER_OF_MOMENTS*partial.mesh.ne).reshape((partial.mesh.ne, NUMBER_OF_MOMENTS)) for partial in partial_wavefronts]
+
+        if split_mode == WavefrontSplitMode.ENERGY:
+            merged_moments = numpy.concatenate(moments, axis=0)
+        else:
+            # moments of the strips are averages weighted by their flux: the whole wavefront moments are the
+            # flux-weighted average of them (angular moments of the strips are an approximation)
+            moments = numpy.array(moments)
+            total = moments[:, :, 0].sum(axis=0)
+            weights = moments[:, :, 0]/numpy.where(total == 0, 1, total)
+
+            merged_moments = numpy.empty_like(moments[0])
+            merged_moments[:, 0] = total
+            merged_moments[:, 1:] = (moments[:, :, 1:]*weights[:, :, numpy.newaxis]).sum(axis=0)
+
+        setattr(wfr, moments_name, array('d', merged_moments.tobytes()))
+
+    return wfr
+
+class PowerIntegrationMethod:
+    SUM = 0 # power density sum times the cell area
+    TRAPEZOID = 1
+    SIMPSON = 2
+
 class PhotonSourceProperties(object):
 
     def __init__(self,
@@ -79,20 +193,56 @@ class SRWLightSource(LightSource, LightSourceDecorator, SRWObject):
     def get_wavefront(self, wavefront_parameters):
         return self.get_SRW_Wavefront(source_wavefront_parameters=wavefront_parameters).toGenericWavefront()
 
-    def get_SRW_Wavefront(self, source_wavefront_parameters = WavefrontParameters()):
+    def get_SRW_Wavefront(self, source_wavefront_parameters = WavefrontParameters(), wavefront_cache=None, number_of_processes=1, split_mode=WavefrontSplitMode.ENERGY):
+        """
+        :param wavefront_cache: optional SRWWavefrontDiskCache, where calculated wavefronts are stored and looked up
+        :param number_of_processes: processes sharing the calculation (None: one per CPU, 1: serial calculation);
+                                    serial anyway when the sampling factor for adjusting nx, ny is > 0
+        :param split_mode: WavefrontSplitMode.ENERGY (exact moments) or WavefrontSplitMode.TRANSVERSE, for monochromatic meshes
+        """
         self.__source_wavefront_parameters = source_wavefront_parameters
 
+        if not wavefront_cache is None:
+            key = wavefront_cache.get_key(self, source_wavefront_parameters)
+
+            wfr = wavefront_cache.get_wavefront(key)
+
+            if not wfr is None:
+                wfr.partBeam = self._electron_beam.to_SRWLPartBeam()
+
+                return wfr
+
         mesh = source_wavefront_parameters.to_SRWRadMesh()
 
-        wfr = SRWWavefront()
-        wfr.allocate(mesh.ne, mesh.nx, mesh.ny)
-        wfr.mesh = mesh
-        wfr.partBeam = self._electron_beam.to_SRWLPartBeam()
+        if number_of_processes is None: number_of_processes = os.cpu_count()
+
+        # with a sampling factor SRW adjusts nx, ny of each chunk independently: partial wavefronts could not be merged
+        if source_wavefront_parameters._wavefront_precision_parameters._sampling_factor_for_adjusting_nx_ny > 0: number_of_processes = 1
 
-        srwl.CalcElecFieldSR(wfr,
-                             0,
-                             self._magnetic_structure.get_SRWLMagFldC(),
-                             source_wavefront_parameters._wavefront_precision_parameters.to_SRW_array())
+        if number_of_processes <= 1:
+            wfr = SRWWavefront()
+            wfr.allocate(mesh.ne, mesh.nx, mesh.ny)
+            wfr.mesh = mesh
+            wfr.partBeam = self._electron_beam.to_SRWLPartBeam()
+
+            srwl.CalcElecFieldSR(wfr,
+                                 0,
+                                 self._magnetic_structure.get_SRWLMagFldC(),
+                                 source_wavefront_parameters._wavefront_precision_parameters.to_SRW_array())
+        else:
+            meshes = _split_mesh(mesh, number_of_processes, split_mode)
+
+            with ProcessPoolExecutor(max_workers=len(meshes)) as executor:
+                partial_wavefronts = list(executor.map(_calculate_electric_field_SR,
+                                                       meshes,
+                                                       [self._electron_beam.to_SRWLPartBeam()]*len(meshes),
+                                                       [self._magnetic_structure.get_SRWLMagFldC()]*len(meshes),
+                                                       [source_wavefront_parameters._wavefront_precision_parameters.to_SRW_array()]*len(meshes)))
+
+            wfr = _merge_partial_wavefronts(mesh, partial_wavefronts, split_mode, meshes)
+            wfr.partBeam = self._electron_beam.to_SRWLPartBeam()
+
+        if not wavefront_cache is None: wavefront_cache.put_wavefront(key, wfr)
 
         return wfr
 
@@ -138,30 +288,38 @@ class SRWLightSource(LightSource, LightSourceDecorator, SRWObject):
                           self._magnetic_structure.get_SRWLMagFldC(),
                           power_density_precision_parameters.to_SRW_array())
 
-        hArray = numpy.zeros(stkP.mesh.nx)
-        vArray = numpy.zeros(stkP.mesh.ny)
-        powerArray = numpy.zeros((stkP.mesh.nx,stkP.mesh.ny))
-
-        # fill arrays
-        ij = -1
-        for j in range(stkP.mesh.ny):
-            for i in range(stkP.mesh.nx):
-                ij += 1
-                xx = stkP.mesh.xStart + i*(stkP.mesh.xFin-stkP.mesh.xStart)/(stkP.mesh.nx-1)
-                yy = stkP.mesh.yStart + j*(stkP.mesh.yFin-stkP.mesh.yStart)/(stkP.mesh.ny-1)
-                powerArray[i,j] = stkP.arS[ij]
-                hArray[i] = xx # mm
-                vArray[j] = yy # mm
+        hArray = numpy.linspace(stkP.mesh.xStart, stkP.mesh.xFin, stkP.mesh.nx)
+        vArray = numpy.linspace(stkP.mesh.yStart, stkP.mesh.yFin, stkP.mesh.ny)
+
+        # SRW order: x fastest
+        powerArray = numpy.array(numpy.frombuffer(stkP.arS, dtype=stkP.arS.typecode, count=stkP.mesh.nx*stkP.mesh.ny).reshape((stkP.mesh.ny, stkP.mesh.nx)).T, dtype=float)
 
         return (hArray, vArray, powerArray)
 
     @classmethod
-    def get_total_power_from_power_density(cls, h_array, v_array, power_density_matrix):
-        area = (numpy.abs(h_array[1]-h_array[0])*numpy.abs(v_array[1]-v_array[0]))*1e6
-        total_power = 0
-        for i in range(0, len(h_array)):
-            for j in range(0, len(v_array)):
-                total_power += power_density_matrix[i, j]*area
-
-        return total_power
+    def get_total_power_from_power_density(cls, h_array, v_array, power_density_matrix, integration_method=PowerIntegrationMethod.SUM, aperture_mask=None):
+        """
+        :param integration_method: one of PowerIntegrationMethod
+        :param aperture_mask: optional array (h, v) of weights (or booleans) multiplying the power density
+        """
+        power_density_matrix = numpy.asarray(power_density_matrix)
+
+        if not aperture_mask is None:
+            aperture_mask = numpy.asarray(aperture_mask)
+
+            if aperture_mask.shape != power_density_matrix.shape:
+                raise ValueError("Aperture mask shape " + str(aperture_mask.shape) + " does not match power density shape " + str(power_density_matrix.shape))
+
+            power_density_matrix = power_density_matrix*aperture_mask
+
+        if integration_method == PowerIntegrationMethod.SUM:
+            area = (numpy.abs(h_array[1]-h_array[0])*numpy.abs(v_array[1]-v_array[0]))*1e6
+
+            return power_density_matrix.sum()*area
+        elif integration_method == PowerIntegrationMethod.TRAPEZOID:
+            return numpy.abs(trapezoid(trapezoid(power_density_matrix, v_array, axis=1), h_array))*1e6
+        elif integration_method == PowerIntegrationMethod.SIMPSON:
+            return numpy.abs(simpson(simpson(power_density_matrix, x=v_array, axis=1), x=h_array))*1e6
+        else:
+            raise ValueError("Integration method not recognized")
 
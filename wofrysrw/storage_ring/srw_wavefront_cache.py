@@ -0,0 +1,173 @@
+import os
+import json
+import pickle
+import hashlib
+import tempfile
+import numpy
+from array import array
+
+from srwlib import SRWLRadMesh
+
+from wofrysrw.propagator.wavefront2D.srw_wavefront import SRWWavefront, SRWArrayAllocate
+
+class SRWWavefrontDiskCache(object):
+    """
+    Content-addressed disk cache of the wavefronts calculated by SRWLightSource.get_SRW_Wavefront: each entry is
+    a binary .npy file with the electric field (memory mapped when loaded) and a .json file with the other data.
+    When the total size exceeds max_size, the least recently used entries are deleted.
+    """
+    VERSION = 1
+
+    FIELDS_EXTENSION = ".npy"
+    DATA_EXTENSION = ".json"
+
+    SCALAR_ATTRIBUTES = ("numTypeElFld", "Rx", "Ry", "dRx", "dRy", "xc", "yc", "avgPhotEn", "presCA", "presFT", "unitElFld", "unitElFldAng")
+    ARRAY_ATTRIBUTES = ("arElecPropMatr", "arMomX", "arMomY", "arWfrAuxData")
+
+    def __init__(self, directory, max_size=2*1024**3):
+        """
+        :param directory: cache directory, created if not existing
+        :param max_size: maximum size of the cache in bytes
+        """
+        if max_size <= 0: raise ValueError("max_size should be > 0")
+
+        os.makedirs(directory, exist_ok=True)
+
+        self.__directory = directory
+        self.__max_size = max_size
+
+    def get_directory(self):
+        return self.__directory
+
+    def get_max_size(self):
+        return self.__max_size
+
+    @classmethod
+    def get_key(cls, light_source, source_wavefront_parameters):
+        """
+        Hash of all the SRW native data used by srwl.CalcElecFieldSR: electron beam moments, magnetic field, mesh and
+        precision parameters
+        """
+        data = [cls.VERSION,
+                light_source.get_electron_beam().to_SRWLPartBeam(),
+                light_source.get_magnetic_structure().get_SRWLMagFldC(),
+                source_wavefront_parameters.to_SRWRadMesh(),
+                source_wavefront_parameters._wavefront_precision_parameters.to_SRW_array()]
+
+        return hashlib.sha256(pickle.dumps(data, protocol=4)).hexdigest()
+
+    def has_wavefront(self, key):
+        return os.path.exists(self.__data_file(key)) and os.path.exists(self.__fields_file(key))
+
+    def get_wavefront(self, key):
+        """
+        :return: a new SRWWavefront, or None if key is not in the cache
+        """
+        try:
+            with open(self.__data_file(key), "r") as file: data = json.load(file)
+
+            fields = numpy.load(self.__fields_file(key), mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+
+        if data.get("version") != self.VERSION: return None
+
+        wavefront = SRWWavefront(_typeE=data["numTypeElFld"])
+
+        wavefront.mesh = SRWLRadMesh()
+        for name, value in data["mesh"].items(): setattr(wavefront.mesh, name, value)
+
+        for name in self.SCALAR_ATTRIBUTES: setattr(wavefront, name, data[name])
+        for name in self.ARRAY_ATTRIBUTES: setattr(wavefront, name, array('d', data[name]))
+
+        wavefront.arEx = SRWArrayAllocate(data["numTypeElFld"], fields.shape[1])
+        wavefront.arEy = SRWArrayAllocate(data["numTypeElFld"], fields.shape[1])
+
+        numpy.frombuffer(wavefront.arEx, dtype=fields.dtype)[:] = fields[0]
+        numpy.frombuffer(wavefront.arEy, dtype=fields.dtype)[:] = fields[1]
+
+        del fields
+
+        try:
+            os.utime(self.__fields_file(key)) # least recently used is the entry with the oldest fields file
+        except OSError:
+            pass # evicted by another process in the meantime: the loaded wavefront is still valid
+
+        return wavefront
+
+    def put_wavefront(self, key, wavefront):
+        mesh = {name: value for name, value in vars(wavefront.mesh).items() if not name.startswith("_")}
+        if not mesh.get("arSurf") is None: mesh["arSurf"] = list(mesh["arSurf"])
+
+        data = {"version": self.VERSION, "mesh": mesh}
+
+        for name in self.SCALAR_ATTRIBUTES: data[name] = getattr(wavefront, name, 0)
+        for name in self.ARRAY_ATTRIBUTES: data[name] = list(getattr(wavefront, name))
+
+        fields = numpy.empty((2, len(wavefront.arEx)), dtype=wavefront.arEx.typecode)
+        fields[0] = numpy.frombuffer(wavefront.arEx, dtype=fields.dtype)
+        fields[1] = numpy.frombuffer(wavefront.arEy, dtype=fields.dtype)
+
+        # temporary files + rename: concurrent readers never see incomplete entries
+        self.__write_file(self.__fields_file(key), "wb", lambda file: numpy.save(file, fields))
+        self.__write_file(self.__data_file(key), "w", lambda file: json.dump(data, file, default=lambda value: value.item())) # numpy scalars
+
+        self.__evict()
+
+    def remove_wavefront(self, key):
+        for file_name in (self.__data_file(key), self.__fields_file(key)):
+            try: os.remove(file_name)
+            except FileNotFoundError: pass
+
+    def get_size(self):
+        return sum([size for _, _, size in self.__get_entries()])
+
+    def clear(self):
+        for key, _, _ in self.__get_entries(): self.remove_wavefront(key)
+
+    def __get_entries(self):
+        entries = []
+
+        for file_name in os.listdir(self.__directory):
+            key, extension = os.path.splitext(file_name)
+
+            if extension == self.FIELDS_EXTENSION:
+                try:
+                    fields_stat = os.stat(self.__fields_file(key))
+                    data_size = os.path.getsize(self.__data_file(key)) if os.path.exists(self.__data_file(key)) else 0
+                except FileNotFoundError:
+                    continue
+
+                entries.append((key, fields_stat.st_mtime, fields_stat.st_size + data_size))
+
+        return entries
+
+    def __evict(self):
+        entries = sorted(self.__get_entries(), key=lambda entry: entry[1])
+        total_size = sum([size for _, _, size in entries])
+
+        # the last entry is never evicted, even if bigger than max size
+        for key, _, size in entries[:-1]:
+            if total_size <= self.__max_size: break
+
+            self.remove_wavefront(key)
+            total_size -= size
+
+    def __write_file(self, file_name, mode, write_function):
+        # unique temporary file for every writer (processes and threads)
+        file_descriptor, temporary_file_name = tempfile.mkstemp(prefix=os.path.basename(file_name) + ".", suffix=".tmp", dir=self.__directory)
+
+        try:
+            with os.fdopen(file_descriptor, mode) as file: write_function(file)
+            os.replace(temporary_file_name, file_name)
+        except BaseException:
+            try: os.remove(temporary_file_name)
+            except FileNotFoundError: pass
+
+            raise
+
+    def __fields_file(self, key):
+        return os.path.join(self.__directory, key + self.FIELDS_EXTENSION)
+
+    def __data_file(self, key):
+        return os.path.join(self.__directory, key + self.DATA_EXTENSION)
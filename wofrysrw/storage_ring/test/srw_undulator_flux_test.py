@@ -0,0 +1,47 @@
+import unittest
+import numpy
+
+from wofrysrw.propagator.wavefront2D.srw_wavefront import WavefrontParameters
+from wofrysrw.storage_ring.srw_electron_beam import SRWElectronBeam
+from wofrysrw.storage_ring.magnetic_structures.srw_undulator import SRWUndulator
+from wofrysrw.storage_ring.light_sources.srw_undulator_light_source import SRWUndulatorLightSource, FluxPrecisionParameters
+
+class SRWUndulatorFluxTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.undulator = SRWUndulatorLightSource("U",
+                                                SRWElectronBeam(energy_in_GeV=2.0, current=0.4, energy_spread=1e-3,
+                                                                moment_xx=(50e-6)**2, moment_xpxp=(5e-6)**2, moment_yy=(5e-6)**2, moment_ypyp=(2e-6)**2),
+                                                SRWUndulator(K_vertical=1.5, period_length=0.02, number_of_periods=75))
+        resonance_energy = cls.undulator.get_resonance_energy()
+
+        cls.wavefront_parameters = WavefrontParameters(photon_energy_min=0.5*resonance_energy,
+                                                       photon_energy_max=5.5*resonance_energy,
+                                                       photon_energy_points=60,
+                                                       h_slit_gap=0.001,
+                                                       v_slit_gap=0.001,
+                                                       distance=10.0)
+        cls.flux_precision_parameters = FluxPrecisionParameters(final_UR_harmonic=7)
+
+    def __get_undulator_flux(self, number_of_processes):
+        return self.undulator.get_undulator_flux(self.wavefront_parameters, self.flux_precision_parameters, number_of_processes=number_of_processes)
+
+    def test_parallel_matches_serial(self):
+        energies, flux = self.__get_undulator_flux(1)
+        parallel_energies, parallel_flux = self.__get_undulator_flux(2)
+
+        self.assertEqual(flux.size, 60)
+        numpy.testing.assert_array_equal(parallel_energies, energies)
+        numpy.testing.assert_allclose(parallel_flux, flux, rtol=1e-6, atol=1e-6*flux.max())
+
+    def test_parallel_is_deterministic(self):
+        _, flux_2 = self.__get_undulator_flux(2)
+        _, flux_3 = self.__get_undulator_flux(3)
+        _, flux_2_again = self.__get_undulator_flux(2)
+
+        numpy.testing.assert_array_equal(flux_3, flux_2)
+        numpy.testing.assert_array_equal(flux_2_again, flux_2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import numpy
+
+from wofrysrw.propagator.test.srw_wavefront_fixtures import get_srw_wavefront
+from wofrysrw.storage_ring.srw_wavefront_cache import SRWWavefrontDiskCache
+
+class SRWWavefrontDiskCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = SRWWavefrontDiskCache(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        wavefront = get_srw_wavefront()
+
+        self.cache.put_wavefront("key", wavefront)
+        cached_wavefront = self.cache.get_wavefront("key")
+
+        numpy.testing.assert_array_equal(numpy.array(cached_wavefront.arEx), numpy.array(wavefront.arEx))
+        numpy.testing.assert_array_equal(numpy.array(cached_wavefront.arEy), numpy.array(wavefront.arEy))
+        self.assertEqual((cached_wavefront.mesh.nx, cached_wavefront.mesh.ny), (wavefront.mesh.nx, wavefront.mesh.ny))
+        self.assertEqual(cached_wavefront.Rx, wavefront.Rx)
+
+        self.assertIsNone(self.cache.get_wavefront("missing"))
+
+    def test_entry_evicted_while_loading(self):
+        self.cache.put_wavefront("key", get_srw_wavefront())
+
+        with mock.patch("wofrysrw.storage_ring.srw_wavefront_cache.os.utime", side_effect=FileNotFoundError):
+            self.assertIsNotNone(self.cache.get_wavefront("key"))
+
+    def test_concurrent_writers(self):
+        wavefronts = [get_srw_wavefront() for _ in range(8)]
+        errors = []
+
+        def put_wavefront(wavefront):
+            try:
+                for _ in range(5): self.cache.put_wavefront("key", wavefront)
+            except Exception as exception:
+                errors.append(exception)
+
+        threads = [threading.Thread(target=put_wavefront, args=(wavefront,)) for wavefront in wavefronts]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ["key.json", "key.npy"]) # no temporary files left
+
+        cached_field = numpy.array(self.cache.get_wavefront("key").arEx)
+
+        self.assertTrue(any([numpy.array_equal(cached_field, numpy.array(wavefront.arEx)) for wavefront in wavefronts]))
+
+if __name__ == "__main__":
+    unittest.main()
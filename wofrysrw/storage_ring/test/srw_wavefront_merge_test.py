@@ -0,0 +1,96 @@
+import unittest
+import numpy
+
+from srwlib import SRWLRadMesh
+
+from wofrysrw.propagator.wavefront2D.srw_wavefront import SRWWavefront, SRWArrayAsField
+from wofrysrw.storage_ring.srw_light_source import WavefrontSplitMode, NUMBER_OF_MOMENTS, _split_mesh, _merge_partial_wavefronts
+
+def _random_field(ne, ny, nx):
+    return (numpy.random.rand(ne, ny, nx) + 1j*numpy.random.rand(ne, ny, nx)).astype(numpy.complex64)
+
+def _partial_wavefront(mesh, Ex, Ey):
+    wfr = SRWWavefront()
+    wfr.allocate(mesh.ne, mesh.nx, mesh.ny)
+    wfr.mesh = mesh
+    wfr.Rx = wfr.Ry = 10.0
+    wfr.dRx = wfr.dRy = 0.01
+    wfr.avgPhotEn = mesh.eStart
+
+    views = wfr.get_electric_field_views()
+    views[0][...] = Ex
+    views[1][...] = Ey
+
+    return wfr
+
+class SRWWavefrontMergeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.mesh = SRWLRadMesh(1000.0, 1900.0, 10, -1e-3, 1e-3, 7, -2e-3, 2e-3, 9, 10.0)
+        self.Ex = _random_field(self.mesh.ne, self.mesh.ny, self.mesh.nx)
+        self.Ey = _random_field(self.mesh.ne, self.mesh.ny, self.mesh.nx)
+
+    def __partial_wavefronts(self, meshes, split_mode):
+        partial_wavefronts = []
+        start = 0
+
+        for mesh in meshes:
+            if split_mode == WavefrontSplitMode.ENERGY:
+                indexes = (slice(start, start + mesh.ne), slice(None), slice(None))
+                start += mesh.ne
+            else:
+                indexes = (slice(None), slice(start, start + mesh.ny), slice(None))
+                start += mesh.ny
+
+            partial_wavefronts.append(_partial_wavefront(mesh, self.Ex[indexes], self.Ey[indexes]))
+
+        return partial_wavefronts
+
+    def test_merge(self):
+        for split_mode in (WavefrontSplitMode.ENERGY, WavefrontSplitMode.TRANSVERSE):
+            meshes = _split_mesh(self.mesh, 3, split_mode)
+
+            wfr = _merge_partial_wavefronts(self.mesh, self.__partial_wavefronts(meshes, split_mode), split_mode, meshes)
+
+            Ex, Ey = wfr.get_electric_field_views(writable=False)
+
+            numpy.testing.assert_array_equal(Ex, self.Ex)
+            numpy.testing.assert_array_equal(Ey, self.Ey)
+
+            self.assertEqual(len(wfr.arMomX), NUMBER_OF_MOMENTS*self.mesh.ne)
+            self.assertAlmostEqual(wfr.avgPhotEn, 1450.0)
+
+    def test_split_mesh_covers_mesh(self):
+        meshes = _split_mesh(self.mesh, 4, WavefrontSplitMode.ENERGY)
+
+        self.assertEqual(sum([mesh.ne for mesh in meshes]), self.mesh.ne)
+        self.assertEqual(meshes[0].eStart, self.mesh.eStart)
+        self.assertAlmostEqual(meshes[-1].eFin, self.mesh.eFin)
+
+        meshes = _split_mesh(self.mesh, 4, WavefrontSplitMode.TRANSVERSE)
+
+        self.assertEqual(sum([mesh.ny for mesh in meshes]), self.mesh.ny)
+        self.assertEqual(meshes[0].yStart, self.mesh.yStart)
+        self.assertAlmostEqual(meshes[-1].yFin, self.mesh.yFin)
+
+    def test_resampled_chunk_is_rejected(self):
+        meshes = _split_mesh(self.mesh, 2, WavefrontSplitMode.ENERGY)
+        partial_wavefronts = self.__partial_wavefronts(meshes, WavefrontSplitMode.ENERGY)
+
+        # as SRW does when adjusting nx, ny with a sampling factor
+        resampled_mesh = SRWLRadMesh(meshes[1].eStart, meshes[1].eFin, meshes[1].ne, meshes[1].xStart, meshes[1].xFin, 2*meshes[1].nx, meshes[1].yStart, meshes[1].yFin, meshes[1].ny, meshes[1].zStart)
+        partial_wavefronts[1] = _partial_wavefront(resampled_mesh,
+                                                   _random_field(resampled_mesh.ne, resampled_mesh.ny, resampled_mesh.nx),
+                                                   _random_field(resampled_mesh.ne, resampled_mesh.ny, resampled_mesh.nx))
+
+        self.assertRaises(ValueError, _merge_partial_wavefronts, self.mesh, partial_wavefronts, WavefrontSplitMode.ENERGY, meshes)
+
+    def test_different_radius_is_rejected(self):
+        meshes = _split_mesh(self.mesh, 2, WavefrontSplitMode.TRANSVERSE)
+        partial_wavefronts = self.__partial_wavefronts(meshes, WavefrontSplitMode.TRANSVERSE)
+        partial_wavefronts[1].Ry = 11.0
+
+        self.assertRaises(ValueError, _merge_partial_wavefronts, self.mesh, partial_wavefronts, WavefrontSplitMode.TRANSVERSE, meshes)
+
+if __name__ == "__main__":
+    unittest.main()